@@ -5,7 +5,7 @@ from rest_framework import status
 from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
-from pedidos_servicio.models import PedidoServicio
+from pedidos_servicio.models import HistorialEstadoPedido, PedidoServicio
 from clientes.models import Cliente
 import logging
 
@@ -127,16 +127,20 @@ def dashboard_metrics(request):
                     'count': retrasados
                 })
         
-        # Actividad reciente (últimos 10 cambios de estado)
+        # Actividad reciente (últimos 10 cambios de estado, desde el historial
+        # de transiciones: lectura del índice por fecha)
         recent_activity = []
-        recent_pedidos = pedidos_qs.order_by('-updated_at')[:10]
-        for pedido in recent_pedidos:
+        transiciones = HistorialEstadoPedido.objects.filter(
+            pedido__in=pedidos_qs
+        ).select_related('pedido', 'usuario').order_by('-fecha')[:10]
+        for transicion in transiciones:
+            usuario = transicion.usuario
             recent_activity.append({
-                'id': str(pedido.id),
+                'id': str(transicion.id),
                 'type': 'estado_change',
-                'description': f'Pedido {pedido.numero_pedido} - {pedido.get_estado_display()}',
-                'timestamp': pedido.updated_at.isoformat(),
-                'user': None  # El modelo no tiene campo updated_by
+                'description': f'Pedido {transicion.pedido.numero_pedido} - {transicion.get_estado_nuevo_display()}',
+                'timestamp': transicion.fecha.isoformat(),
+                'user': (usuario.get_full_name() or usuario.username) if usuario else None,
             })
         
         return Response({
@@ -193,10 +197,10 @@ def mis_pedidos(request):
             'detail': 'No tienes permiso para ver pedidos de servicio.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    # Obtener pedidos con relaciones
+    # Obtener pedidos con relaciones (total_items contado en SQL)
     queryset = PedidoServicio.objects.select_related(
-        'cliente', 'manufacturador', 'instalador'
-    ).order_by('-created_at')
+        'cliente', 'manufacturador', 'instalador', 'usuario_creacion'
+    ).annotate(total_items=Count('items')).order_by('-created_at')
     
     # Filtrar según el rol del usuario
     if not user.is_superuser:
@@ -25,6 +25,7 @@ urlpatterns = [
     path('', include('core.urls')),
     path('', include('clientes.urls')),
     path('', include('pedidos_servicio.urls')),
+    path('', include('common.urls')),
     path('manufactura/', include('manufactura.urls')),
 
     # Dashboard
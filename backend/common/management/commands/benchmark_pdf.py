@@ -0,0 +1,102 @@
+# common/management/commands/benchmark_pdf.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.pdf_benchmark import (
+    IDIOMAS, TAMANOS, TOLERANCIAS, cargar_linea_base, comparar, ejecutar_suite, informe, medir_registro,
+)
+
+
+def _lista(valor, tipo=str):
+    return tuple(tipo(v.strip()) for v in valor.split(',') if v.strip())
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark del render de PDFs (cotizaciones y pedidos de tamaño creciente, por idioma): '
+        'tiempo, pico de memoria, consultas y bytes. Puede guardar una línea base JSON o compararse con una.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanos', default=','.join(map(str, TAMANOS)),
+            help='Ítems por documento, separados por coma (ej: 10,100,500)',
+        )
+        parser.add_argument(
+            '--idiomas', default=','.join(IDIOMAS),
+            help='Idiomas a medir, separados por coma (ej: es,pt,en)',
+        )
+        parser.add_argument('--repeticiones', type=int, default=3, help='Renders por escenario (mediana)')
+        parser.add_argument('--salida', help='Guarda los resultados como JSON en este archivo')
+        parser.add_argument('--comparar', metavar='LINEA_BASE', help='JSON de línea base con el que comparar')
+        parser.add_argument(
+            '--tolerancia-tiempo', type=float, default=TOLERANCIAS['ms'],
+            help='Margen admitido sobre el tiempo de la línea base (0.25 = +25%%)',
+        )
+        parser.add_argument(
+            '--sin-tiempo', action='store_true',
+            help='No compara tiempo ni memoria (máquinas distintas a la de la línea base)',
+        )
+        parser.add_argument(
+            '--registro', action='store_true',
+            help='Compara el render con el registro de recursos (estilos, logo, textos) vacío y cargado',
+        )
+
+    def handle(self, *args, **options):
+        tamanos = _lista(options['tamanos'], int)
+        idiomas = _lista(options['idiomas'])
+        if not tamanos or not idiomas:
+            raise CommandError('Se necesita al menos un tamaño y un idioma')
+
+        if options['registro']:
+            if options['salida'] or options['comparar']:
+                raise CommandError('--registro no admite --salida ni --comparar')
+            return self._medir_registro(tamanos, idiomas, options['repeticiones'])
+
+        linea_base = None
+        if options['comparar']:
+            try:
+                linea_base = cargar_linea_base(options['comparar'])
+            except (OSError, ValueError) as e:
+                raise CommandError(f"No se pudo leer la línea base: {e}")
+
+        self.stdout.write(f"{'documento':<11}{'ítems':>6} {'idioma':<7}{'ms':>10}{'pico KB':>11}{'consultas':>10}{'KB PDF':>10}")
+
+        def progreso(r):
+            self.stdout.write(
+                f"{r['documento']:<11}{r['items']:>6} {r['idioma']:<7}{r['ms']:>10.1f}"
+                f"{r['pico_kb']:>11.1f}{r['consultas']:>10}{r['bytes'] / 1024:>10.1f}"
+            )
+
+        resultados = ejecutar_suite(tamanos, idiomas, options['repeticiones'], progreso=progreso)
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as f:
+                json.dump(informe(resultados), f, indent=2, ensure_ascii=False)
+                f.write('\n')
+            self.stdout.write(self.style.SUCCESS(f"✅ Resultados guardados en {options['salida']}"))
+
+        if linea_base is None:
+            return
+
+        tolerancias = dict(TOLERANCIAS, ms=options['tolerancia_tiempo'])
+        if options['sin_tiempo']:
+            tolerancias.update(ms=None, pico_kb=None)
+
+        regresiones = comparar(resultados, linea_base, tolerancias)
+        if regresiones:
+            for regresion in regresiones:
+                self.stderr.write(f'  ✗ {regresion}')
+            raise CommandError(f'{len(regresiones)} regresiones respecto de la línea base')
+        self.stdout.write(self.style.SUCCESS('✅ Sin regresiones respecto de la línea base'))
+
+    def _medir_registro(self, tamanos, idiomas, repeticiones):
+        self.stdout.write(f"{'documento':<11}{'ítems':>6} {'idioma':<7}{'ms frío':>10}{'ms caliente':>13}{'ahorro':>9}")
+        for r in medir_registro(tamanos, idiomas, repeticiones):
+            ahorro = (1 - r['ms_caliente'] / r['ms_frio']) * 100 if r['ms_frio'] else 0
+            self.stdout.write(
+                f"{r['documento']:<11}{r['items']:>6} {r['idioma']:<7}{r['ms_frio']:>10.1f}"
+                f"{r['ms_caliente']:>13.1f}{ahorro:>8.1f}%"
+            )
+        self.stdout.write(self.style.SUCCESS('✅ Ahorro por render con el registro de recursos cargado'))
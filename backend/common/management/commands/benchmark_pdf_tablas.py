@@ -0,0 +1,47 @@
+# common/management/commands/benchmark_pdf_tablas.py
+from django.core.management.base import BaseCommand
+
+from common.pdf_benchmark import documentos_de_prueba, medir
+from cotizaciones.models import Cotizacion
+from cotizaciones.pdf_generator import generate_cotizacion_pdf, prefetch_cotizacion_pdf
+from pedidos_servicio.models import PedidoServicio
+from pedidos_servicio.pdf_generator import generate_pedido_pdf
+
+
+class Command(BaseCommand):
+    help = 'Compara el modo estándar y el denso de las tablas de ítems (tiempo y tamaño del PDF)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000, help='Ítems por documento')
+        parser.add_argument('--repeticiones', type=int, default=3, help='Renders por escenario')
+
+    def handle(self, *args, **options):
+        num_items = options['items']
+        repeticiones = options['repeticiones']
+
+        with documentos_de_prueba(num_items) as (cotizacion_id, pedido_id):
+            cotizacion = prefetch_cotizacion_pdf(Cotizacion.objects.filter(pk=cotizacion_id)).get()
+            pedido = PedidoServicio.objects.select_related(
+                'cliente', 'manufacturador', 'instalador', 'usuario_creacion'
+            ).prefetch_related('items').get(pk=pedido_id)
+
+            escenarios = [
+                ('Cotización', lambda dense: generate_cotizacion_pdf(cotizacion, language='es', dense=dense)),
+                ('Pedido', lambda dense: generate_pedido_pdf(pedido, language='es', dense=dense)),
+            ]
+
+            self.stdout.write(f'{num_items} ítems por documento - mediana de {repeticiones} renders')
+            for nombre, render in escenarios:
+                self.stdout.write(f'\n{nombre}')
+                resultados = {}
+                for modo, dense in (('estándar', False), ('denso', True)):
+                    ms, buffer = medir(lambda: render(dense), repeticiones)
+                    tamano = len(buffer.getvalue())
+                    resultados[modo] = (ms, tamano)
+                    self.stdout.write(f'  {modo:<9} {ms:9.1f} ms  {tamano / 1024:9.1f} KB')
+
+                (ms_std, kb_std), (ms_den, kb_den) = resultados['estándar'], resultados['denso']
+                self.stdout.write(self.style.SUCCESS(
+                    f'  ✅ denso: {(1 - ms_den / ms_std) * 100:.1f}% menos tiempo, '
+                    f'{(1 - kb_den / kb_std) * 100:.1f}% menos tamaño'
+                ))
@@ -0,0 +1,82 @@
+# common/management/commands/procesar_trabajos_pdf.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from common.models import TrabajoRenderPDF
+from common.pdf_jobs import precargar_recursos, procesar_siguiente, reiniciar_atascados
+
+
+class Command(BaseCommand):
+    help = (
+        'Consumidor de la cola de render PDF: reclama los trabajos pendientes y los '
+        'genera en la caché. Proceso de larga duración (uno por servidor, junto a '
+        'gunicorn); con --una-vez vacía la cola y termina.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reintentar-atascados',
+            type=int,
+            default=None,
+            metavar='MINUTOS',
+            help=(
+                'Vuelve a PENDIENTE los trabajos en PROCESANDO desde hace más de MINUTOS '
+                '(por defecto PDF_TRABAJO_ATASCADO_MINUTOS; 0 = no reintentar)'
+            ),
+        )
+        parser.add_argument(
+            '--limite',
+            type=int,
+            default=0,
+            help='Termina tras procesar este número de trabajos (0 = sin límite)',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=None,
+            metavar='SEGUNDOS',
+            help='Espera entre consultas con la cola vacía (por defecto PDF_CONSUMIDOR_INTERVALO)',
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa los trabajos pendientes y termina (ej: cron o tras un reinicio)',
+        )
+
+    def handle(self, *args, **options):
+        minutos = options['reintentar_atascados']
+        limite = options['limite']
+        intervalo = options['intervalo']
+        if intervalo is None:
+            intervalo = settings.PDF_CONSUMIDOR_INTERVALO
+        if intervalo <= 0:
+            raise CommandError('--intervalo debe ser mayor que 0')
+
+        precargar_recursos()
+        procesados = errores = 0
+        try:
+            while True:
+                reiniciados = reiniciar_atascados(minutos)
+                if reiniciados:
+                    self.stdout.write(self.style.WARNING(f'↺ {reiniciados} trabajos atascados vueltos a la cola'))
+
+                estado = procesar_siguiente()
+                if estado is None:
+                    if options['una_vez']:
+                        break
+                    time.sleep(intervalo)
+                    # El consumidor vive días: descarta conexiones caídas o vencidas
+                    close_old_connections()
+                    continue
+
+                procesados += 1
+                errores += estado == TrabajoRenderPDF.Estado.ERROR
+                if 0 < limite <= procesados:
+                    break
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {procesados} trabajos procesados ({errores} con error)'))
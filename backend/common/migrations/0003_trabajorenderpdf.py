@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoRenderPDF',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Activo')),
+                ('tipo_documento', models.CharField(choices=[('COTIZACION', 'Cotización'), ('PEDIDO', 'Pedido de Servicio')], max_length=20, verbose_name='Tipo de Documento')),
+                ('objeto_id', models.PositiveBigIntegerField(verbose_name='ID del Documento')),
+                ('idioma', models.CharField(default='es', max_length=2, verbose_name='Idioma')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESANDO', 'Procesando'), ('COMPLETADO', 'Completado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=20, verbose_name='Estado')),
+                ('clave_cache', models.CharField(blank=True, help_text='Huella del PDF generado dentro de la caché en disco', max_length=64, verbose_name='Clave en Caché')),
+                ('nombre_archivo', models.CharField(blank=True, max_length=150, verbose_name='Nombre de Archivo')),
+                ('error', models.TextField(blank=True, verbose_name='Detalle del Error')),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Inicio de Proceso')),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin de Proceso')),
+                ('usuario_creacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_creados', to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+                ('usuario_modificacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_modificados', to=settings.AUTH_USER_MODEL, verbose_name='Modificado por')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Render PDF',
+                'verbose_name_plural': 'Trabajos de Render PDF',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['estado', 'created_at'], name='common_trab_estado_07577e_idx'), models.Index(fields=['tipo_documento', 'objeto_id', 'idioma'], name='common_trab_tipo_do_9af4ef_idx')],
+            },
+        ),
+    ]
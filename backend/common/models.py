@@ -181,9 +181,103 @@ class TablaCorrelativos(SoftDeleteMixin, BaseModel):
             obj.save()
             # Retornar el código generado
             return obj.generar_codigo_documento()
+
+    def obtener_siguientes_codigos(self, cantidad):
+        """
+        Reserva `cantidad` códigos consecutivos con un solo bloqueo y un solo
+        UPDATE (para altas masivas, en lugar de llamar N veces a
+        obtener_siguiente_codigo).
+
+        Returns:
+            list: Códigos reservados, en orden
+        """
+        from django.db import transaction
+
+        with transaction.atomic():
+            obj = TablaCorrelativos.objects.select_for_update().get(id=self.id)
+            inicio = obj.numero + 1
+            obj.numero += cantidad
+            obj.save()
+            return [f"{obj.prefijo}-{str(n).zfill(obj.longitud)}" for n in range(inicio, obj.numero + 1)]
     
     class Meta:
         db_table = "common_tabla_correlativos"
         verbose_name = "Tabla de Correlativos"
         verbose_name_plural = "Tablas de Correlativos"
         ordering = ['nombre']
+
+
+class TrabajoRenderPDF(BaseModel):
+    """
+    Trabajo de renderizado de PDF en segundo plano.
+
+    La tabla actúa como cola persistente: el request web crea el trabajo y
+    responde de inmediato; un proceso del pool local lo toma, genera el PDF
+    en la caché en disco y deja aquí la clave para descargarlo.
+    """
+
+    class TipoDocumento(models.TextChoices):
+        COTIZACION = 'COTIZACION', 'Cotización'
+        PEDIDO = 'PEDIDO', 'Pedido de Servicio'
+
+    class Estado(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        PROCESANDO = 'PROCESANDO', 'Procesando'
+        COMPLETADO = 'COMPLETADO', 'Completado'
+        ERROR = 'ERROR', 'Error'
+
+    tipo_documento = models.CharField(
+        max_length=20,
+        choices=TipoDocumento.choices,
+        verbose_name="Tipo de Documento"
+    )
+
+    objeto_id = models.PositiveBigIntegerField(
+        verbose_name="ID del Documento"
+    )
+
+    idioma = models.CharField(
+        max_length=2,
+        default='es',
+        verbose_name="Idioma"
+    )
+
+    estado = models.CharField(
+        max_length=20,
+        choices=Estado.choices,
+        default=Estado.PENDIENTE,
+        verbose_name="Estado"
+    )
+
+    clave_cache = models.CharField(
+        max_length=64,
+        blank=True,
+        verbose_name="Clave en Caché",
+        help_text="Huella del PDF generado dentro de la caché en disco"
+    )
+
+    nombre_archivo = models.CharField(
+        max_length=150,
+        blank=True,
+        verbose_name="Nombre de Archivo"
+    )
+
+    error = models.TextField(
+        blank=True,
+        verbose_name="Detalle del Error"
+    )
+
+    fecha_inicio = models.DateTimeField(null=True, blank=True, verbose_name="Inicio de Proceso")
+    fecha_fin = models.DateTimeField(null=True, blank=True, verbose_name="Fin de Proceso")
+
+    def __str__(self):
+        return f"{self.get_tipo_documento_display()} #{self.objeto_id} ({self.estado})"
+
+    class Meta:
+        verbose_name = "Trabajo de Render PDF"
+        verbose_name_plural = "Trabajos de Render PDF"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['estado', 'created_at']),
+            models.Index(fields=['tipo_documento', 'objeto_id', 'idioma']),
+        ]
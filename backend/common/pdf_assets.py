@@ -0,0 +1,132 @@
+"""
+Recursos estáticos compartidos por los generadores de PDF.
+
+Construir estilos, decodificar el logo y parsear bloques de texto fijos en
+cada render cuesta más que el propio documento en las cotizaciones cortas.
+Estos helpers los preparan una sola vez por proceso (worker de gunicorn o
+proceso del pool de render) y los reutilizan en todos los renders:
+
+- `load_image`: decodifica una imagen una vez (opcionalmente reducida a la
+  resolución de impresión) y la comparte vía `SharedImage`.
+- `parse_paragraph`: parsea el marcado de un Paragraph una vez; los renders
+  crean Paragraphs nuevos a partir de los fragmentos ya parseados. Usa el
+  parser de reportlab.platypus.paragraph (reportlab fijado en
+  requirements.txt); tests/test_pdf_assets.py verifica que el resultado sea
+  idéntico a un Paragraph parseado por reportlab.
+
+`get_pdf_language` resuelve el idioma del PDF según el usuario del request
+(común a todos los generadores).
+
+Los registros por documento (estilos, bloques traducidos) viven en cada
+pdf_generator y se construyen con functools.lru_cache sobre estos helpers.
+"""
+
+import functools
+import logging
+import os
+
+from PIL import Image as PILImage
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable, Paragraph
+from reportlab.platypus.paragraph import ParaParser, cleanBlockQuotedText, textTransformFrags
+
+logger = logging.getLogger(__name__)
+
+# Resolución con la que se guarda una imagen reducida (suficiente para imprimir)
+PRINT_DPI = 300
+
+
+@functools.lru_cache(maxsize=None)
+def load_image(path, draw_width=None, draw_height=None):
+    """
+    Decodifica la imagen de `path` una sola vez por proceso.
+
+    Si se indica el tamaño de dibujo (en puntos), la imagen se reduce a
+    PRINT_DPI para ese tamaño: el logo original (1024x1024 RGBA) pesa varios
+    MB sin comprimir y se dibuja a 2.5 cm.
+
+    Retorna un ImageReader con los datos RGB ya extraídos, o None si el
+    archivo no existe.
+    """
+    if not os.path.exists(path):
+        logger.warning(f"Imagen para PDF no encontrada: {path}")
+        return None
+
+    with PILImage.open(path) as image:
+        image.load()
+    if draw_width and draw_height:
+        max_size = (
+            round(draw_width / 72 * PRINT_DPI),
+            round(draw_height / 72 * PRINT_DPI),
+        )
+        if image.size[0] > max_size[0] or image.size[1] > max_size[1]:
+            image.thumbnail(max_size, PILImage.Resampling.LANCZOS)
+
+    # Fuerza la extracción de los datos RGB (y del canal alfa) ahora; el
+    # ImageReader los conserva y los renders siguientes no vuelven a decodificar.
+    reader = ImageReader(image)
+    reader.getRGBData()
+    return reader
+
+
+class SharedImage(Flowable):
+    """
+    Flowable de imagen sobre un ImageReader ya decodificado.
+
+    platypus.Image solo acepta rutas o archivos y crea su propio ImageReader;
+    esta variante dibuja con canvas.drawImage el que mantiene `load_image`.
+    """
+
+    def __init__(self, reader, width, height, mask='auto', hAlign='CENTER'):
+        super().__init__()
+        self.reader = reader
+        self.drawWidth = width
+        self.drawHeight = height
+        self.mask = mask
+        self.hAlign = hAlign
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.drawWidth, self.drawHeight, mask=self.mask)
+
+
+def parse_paragraph(text, style):
+    """
+    Parsea el marcado de `text` con `style` y retorna los fragmentos,
+    listos para `new_paragraph`. Pensado para bloques fijos que se cachean.
+    """
+    parser = ParaParser()
+    style, frags, _bullet = parser.parse(cleanBlockQuotedText(text), style)
+    if frags is None:
+        raise ValueError(f"Error de marcado en el texto del PDF: {text[:30]!r}")
+    textTransformFrags(frags, style)
+    return tuple(frags)
+
+
+def new_paragraph(frags, style):
+    """Crea un Paragraph a partir de fragmentos ya parseados (sin volver a parsear)."""
+    return Paragraph('', style, frags=list(frags))
+
+
+def get_pdf_language(request=None):
+    """Idioma del PDF según el usuario autenticado (por defecto español)."""
+    if request and hasattr(request, 'user') and request.user.is_authenticated:
+        return getattr(request.user, 'language', 'es') or 'es'
+    return 'es'
+
+
+def stamp_form(canvas, name, draw_fn):
+    """
+    Estampa en la página actual el contenido estático de `draw_fn(canvas)`.
+
+    La primera vez que se usa `name` en el documento, lo dibujado se captura
+    como form XObject; las páginas siguientes solo lo referencian
+    ("/Form Do"), así el encabezado/pie no se repite en cada página.
+    """
+    if not canvas.hasForm(name):
+        canvas.beginForm(name)
+        draw_fn(canvas)
+        canvas.endForm()
+    canvas.doForm(name)
@@ -0,0 +1,314 @@
+"""
+Utilidades para medir el render de PDFs.
+
+Los documentos de prueba se crean dentro de `documentos_de_prueba()`, una
+transacción que se revierte al salir: se puede medir contra la base de
+datos real sin dejar datos.
+
+`ejecutar_suite` mide cotizaciones y pedidos de tamaño creciente en cada
+idioma (tiempo, pico de memoria, consultas y bytes del PDF) y `comparar`
+contrasta el resultado con una línea base guardada en JSON
+(ver el comando benchmark_pdf).
+
+`medir_registro` compara el render con el registro de recursos estáticos
+vacío en cada render (estilos, logo y textos fijos construidos por render)
+contra el registro ya cargado (benchmark_pdf --registro).
+"""
+
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+import reportlab
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+TAMANOS = (10, 100, 500)
+IDIOMAS = ('es', 'pt', 'en')
+
+# Margen admitido sobre la línea base por métrica (None = no se compara).
+# El tiempo depende de la máquina; consultas y bytes no deberían moverse.
+TOLERANCIAS = {
+    'ms': 0.25,
+    'pico_kb': 0.25,
+    'consultas': 0,
+    'bytes': 0.05,
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def documentos_de_prueba(num_items, items_por_ambiente=25):
+    """
+    Crea una cotización y un pedido de `num_items` ítems cada uno y los
+    retorna como (cotizacion_id, pedido_id). Todo se revierte al salir.
+    """
+    try:
+        with transaction.atomic():
+            yield _crear_documentos(num_items, items_por_ambiente)
+            raise _Rollback()
+    except _Rollback:
+        pass
+
+
+def _crear_documentos(num_items, items_por_ambiente):
+    from clientes.models import Cliente
+    from common.models import Pais, TablaCorrelativos
+    from cotizaciones.models import Cotizacion, CotizacionAmbiente, CotizacionItem
+    from pedidos_servicio.models import ItemPedidoServicio, PedidoServicio
+    from productos_servicios.models import ProductoServicio
+
+    pais, _ = Pais.objects.get_or_create(
+        codigo='BR', defaults={'nombre': 'Brasil', 'codigo_telefono': '+55'}
+    )
+    cliente = Cliente.objects.create(
+        nombre='Cliente Benchmark PDF', pais=pais, telefono='11999999999',
+        numero_documento='00000000', email='benchmark@example.com'
+    )
+    producto = ProductoServicio.objects.create(
+        codigo='BENCH-PDF-0001',
+        nombre='Cortina Roller Blackout',
+        tipo_producto=ProductoServicio.TipoProducto.CORTINA,
+        unidad_medida=ProductoServicio.UnidadMedida.METRO_CUADRADO,
+        precio_base=Decimal('100.00'),
+        requiere_medidas=True,
+    )
+
+    TablaCorrelativos.objects.get_or_create(prefijo='COT', defaults={'nombre': 'Cotizaciones'})
+    cotizacion = Cotizacion.objects.create(
+        cliente=cliente,
+        fecha_validez=timezone.localdate() + timedelta(days=45),
+        descuento_total=Decimal('0.00'),
+    )
+    num_ambientes = max(1, -(-num_items // items_por_ambiente))
+    ambientes = CotizacionAmbiente.objects.bulk_create([
+        CotizacionAmbiente(cotizacion=cotizacion, nombre=f'Ambiente {i + 1}', orden=i + 1)
+        for i in range(num_ambientes)
+    ])
+    items = []
+    for n in range(num_items):
+        item = CotizacionItem(
+            ambiente=ambientes[n // items_por_ambiente],
+            producto=producto,
+            numero_item=n % items_por_ambiente + 1,
+            cantidad=Decimal('1.00'),
+            ancho=Decimal('1.500'),
+            alto=Decimal('2.000'),
+            precio_unitario=producto.precio_base,
+            atributos_seleccionados={'tejido': 'Linho', 'color': 'Blanco'},
+        )
+        item.precio_total = item.precio_unitario * item.ancho * item.alto
+        item.generar_descripcion()
+        items.append(item)
+    CotizacionItem.objects.bulk_create(items)
+    cotizacion.recalculate_totals()
+
+    pedido = PedidoServicio.objects.create(cliente=cliente, solicitante='Benchmark')
+    ItemPedidoServicio.objects.bulk_create([
+        ItemPedidoServicio(
+            pedido_servicio=pedido,
+            numero_item=n + 1,
+            ambiente=f'Ambiente {n // items_por_ambiente + 1}',
+            modelo='Roller',
+            tejido='Blackout',
+            largura=Decimal('1.50'),
+            altura=Decimal('2.00'),
+            cantidad_piezas=1,
+            lado_comando=ItemPedidoServicio.LadoComando.IZQUIERDO,
+            acionamiento=ItemPedidoServicio.Acionamiento.MANUAL,
+            observaciones='Instalar por dentro del vano' if n % 3 == 0 else '',
+        )
+        for n in range(num_items)
+    ])
+
+    return cotizacion.pk, pedido.pk
+
+
+def medir(fn, repeticiones):
+    """
+    Ejecuta `fn()` `repeticiones` veces. Retorna (mediana_ms, resultado de la
+    última ejecución).
+    """
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = fn()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos), resultado
+
+
+def _renderers():
+    from cotizaciones.models import Cotizacion
+    from cotizaciones.pdf_generator import generate_cotizacion_pdf, prefetch_cotizacion_pdf
+    from pedidos_servicio.models import PedidoServicio
+    from pedidos_servicio.pdf_generator import generate_pedido_pdf
+
+    def render_cotizacion(cotizacion_id, idioma):
+        cotizacion = prefetch_cotizacion_pdf(Cotizacion.objects.filter(pk=cotizacion_id)).get()
+        return generate_cotizacion_pdf(cotizacion, language=idioma)
+
+    def render_pedido(pedido_id, idioma):
+        pedido = PedidoServicio.objects.select_related(
+            'cliente', 'manufacturador', 'instalador', 'usuario_creacion'
+        ).prefetch_related('items').get(pk=pedido_id)
+        return generate_pedido_pdf(pedido, language=idioma)
+
+    return {'cotizacion': render_cotizacion, 'pedido': render_pedido}
+
+
+def medir_escenario(fn, repeticiones):
+    """
+    Mide `fn()` (carga desde la BD + render) y retorna las métricas:
+    ms (mediana de `repeticiones`), pico_kb, consultas y bytes del PDF.
+
+    El pico de memoria se mide en una ejecución aparte: tracemalloc
+    ralentiza el render y falsearía el tiempo.
+    """
+    ms, buffer = medir(fn, repeticiones)
+
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        try:
+            fn()
+            _actual, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'ms': round(ms, 1),
+        'pico_kb': round(pico / 1024, 1),
+        'consultas': len(queries.captured_queries),
+        'bytes': len(buffer.getvalue()),
+    }
+
+
+def ejecutar_suite(tamanos=TAMANOS, idiomas=IDIOMAS, repeticiones=3, progreso=None):
+    """
+    Ejecuta el benchmark para cada tamaño, documento e idioma. Retorna una
+    lista de dicts con documento, items, idioma y las métricas de
+    `medir_escenario`. `progreso(resultado)` se llama tras cada escenario.
+    """
+    renderers = _renderers()
+    resultados = []
+    for num_items in tamanos:
+        with documentos_de_prueba(num_items) as (cotizacion_id, pedido_id):
+            ids = {'cotizacion': cotizacion_id, 'pedido': pedido_id}
+            for documento, render in renderers.items():
+                for idioma in idiomas:
+                    # Un render previo deja estilos y textos del idioma en el registro
+                    render(ids[documento], idioma)
+                    resultado = {
+                        'documento': documento,
+                        'items': num_items,
+                        'idioma': idioma,
+                        **medir_escenario(lambda: render(ids[documento], idioma), repeticiones),
+                    }
+                    resultados.append(resultado)
+                    if progreso:
+                        progreso(resultado)
+    return resultados
+
+
+def limpiar_registro_pdf():
+    """Vacía el registro de recursos: el siguiente render los vuelve a construir."""
+    from common.pdf_assets import load_image
+    from cotizaciones import pdf_generator as cotizacion_pdf
+    from pedidos_servicio import pdf_generator as pedido_pdf
+
+    for generador in (cotizacion_pdf, pedido_pdf):
+        generador.get_pdf_styles.cache_clear()
+        generador.get_static_blocks.cache_clear()
+    load_image.cache_clear()
+
+
+def medir_registro(tamanos=TAMANOS, idiomas=IDIOMAS, repeticiones=3, progreso=None):
+    """
+    Para cada tamaño, documento e idioma mide la mediana del render con el
+    registro vacío antes de cada render (ms_frio) y con el registro cargado
+    (ms_caliente). Retorna la lista de resultados; `progreso(resultado)` se
+    llama tras cada escenario.
+    """
+    renderers = _renderers()
+    resultados = []
+    for num_items in tamanos:
+        with documentos_de_prueba(num_items) as (cotizacion_id, pedido_id):
+            ids = {'cotizacion': cotizacion_id, 'pedido': pedido_id}
+            for documento, render in renderers.items():
+                for idioma in idiomas:
+                    def en_frio():
+                        limpiar_registro_pdf()
+                        return render(ids[documento], idioma)
+
+                    ms_frio, _ = medir(en_frio, repeticiones)
+                    ms_caliente, _ = medir(lambda: render(ids[documento], idioma), repeticiones)
+                    resultado = {
+                        'documento': documento,
+                        'items': num_items,
+                        'idioma': idioma,
+                        'ms_frio': round(ms_frio, 1),
+                        'ms_caliente': round(ms_caliente, 1),
+                    }
+                    resultados.append(resultado)
+                    if progreso:
+                        progreso(resultado)
+    return resultados
+
+
+def informe(resultados):
+    """Documento JSON con los resultados y el entorno en que se midieron."""
+    return {
+        'version': 1,
+        'generado': timezone.now().isoformat(),
+        'entorno': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'reportlab': reportlab.Version,
+            'base_de_datos': connection.vendor,
+        },
+        'resultados': resultados,
+    }
+
+
+def cargar_linea_base(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def comparar(resultados, linea_base, tolerancias=None):
+    """
+    Compara `resultados` con los de `linea_base` (escenario a escenario).
+    Retorna la lista de regresiones como textos; vacía si no hay ninguna.
+    Los escenarios que no están en la línea base se ignoran.
+    """
+    tolerancias = TOLERANCIAS if tolerancias is None else tolerancias
+    base = {
+        (r['documento'], r['items'], r['idioma']): r
+        for r in linea_base.get('resultados', [])
+    }
+
+    regresiones = []
+    for resultado in resultados:
+        anterior = base.get((resultado['documento'], resultado['items'], resultado['idioma']))
+        if anterior is None:
+            continue
+        for metrica, tolerancia in tolerancias.items():
+            if tolerancia is None or metrica not in anterior:
+                continue
+            limite = anterior[metrica] * (1 + tolerancia)
+            if resultado[metrica] > limite:
+                regresiones.append(
+                    f"{resultado['documento']} {resultado['items']} ítems ({resultado['idioma']}): "
+                    f"{metrica} {resultado[metrica]} > {anterior[metrica]} (+{tolerancia:.0%})"
+                )
+    return regresiones
@@ -0,0 +1,190 @@
+"""
+Caché en disco de PDFs renderizados.
+
+Las entradas se direccionan por contenido: la clave es un hash de la huella
+del documento (versiones del encabezado, de los ítems, idioma y versión de
+plantilla). Cualquier cambio en el documento produce una clave nueva, por lo
+que no hace falta invalidar explícitamente; las entradas obsoletas dejan de
+usarse y terminan expulsadas por la política LRU cuando el directorio supera
+el tamaño máximo configurado.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_SUFFIX = '.pdf'
+
+# Versión de las plantillas de PDF (cotizaciones y pedidos), parte de cada
+# huella: incrementar al cambiar el diseño para que la caché deje de servir
+# los documentos renderizados con la anterior.
+# 2: pie como form XObject, tablas por TableLayout y fecha del pie del pedido.
+PDF_TEMPLATE_VERSION = 2
+
+
+def build_cache_key(*parts):
+    """
+    Construye una clave estable a partir de las partes de la huella.
+
+    Ej: build_cache_key('cotizacion', 15, 'es', ...) -> 'a3f1...'
+    """
+    raw = '|'.join(str(part) for part in parts)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _as_bytes(buffer):
+    return buffer.getvalue() if hasattr(buffer, 'getvalue') else buffer
+
+
+class PDFCache:
+    """
+    Caché de archivos PDF con expulsión LRU acotada por tamaño.
+
+    - La recencia se marca actualizando el mtime del archivo en cada acierto.
+    - Las escrituras son atómicas (archivo temporal + os.replace), de modo que
+      varios workers de gunicorn pueden compartir el mismo directorio.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def path_for(self, key):
+        return self.directory / f"{key}{PDF_SUFFIX}"
+
+    def open(self, key):
+        """
+        Abre la entrada en modo binario y la marca como usada recientemente.
+        Retorna None si no existe.
+        """
+        path = self.path_for(key)
+        try:
+            handle = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            # La entrada pudo ser expulsada por otro proceso; el handle sigue siendo válido
+            pass
+        return handle
+
+    def put(self, key, buffer):
+        """
+        Guarda el contenido de `buffer` (BytesIO o bytes) bajo `key`.
+        Retorna la ruta del archivo guardado.
+        """
+        data = _as_bytes(buffer)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, self.path_for(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.evict(keep=key)
+        return self.path_for(key)
+
+    def get_or_render(self, key, render_fn):
+        """
+        Retorna un archivo abierto con el PDF de `key`.
+        Si no está en caché, lo genera con `render_fn()` y lo guarda.
+        """
+        handle = self.open(key)
+        if handle is not None:
+            return handle
+
+        data = _as_bytes(render_fn())
+        path = self.put(key, data)
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            # Otro proceso expulsó la entrada recién escrita: se sirve una copia
+            # temporal (se borra al cerrarla)
+            logger.info(f"Entrada de caché PDF expulsada antes de abrirla: {key}")
+            handle = tempfile.NamedTemporaryFile(prefix=f"{key}-", suffix=PDF_SUFFIX)
+            handle.write(data)
+            handle.seek(0)
+            return handle
+
+    def ensure(self, key, render_fn):
+        """Garantiza que `key` esté en caché. Retorna la ruta del archivo."""
+        handle = self.get_or_render(key, render_fn)
+        handle.close()
+        return self.path_for(key)
+
+    def evict(self, keep=None):
+        """
+        Expulsa las entradas usadas hace más tiempo hasta quedar por debajo
+        de `max_bytes`. La entrada `keep` nunca se expulsa.
+        """
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(PDF_SUFFIX):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path, entry.name))
+                    total += stat.st_size
+        except FileNotFoundError:
+            return
+
+        if total <= self.max_bytes:
+            return
+
+        keep_name = f"{keep}{PDF_SUFFIX}" if keep else None
+        for _mtime, size, path, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep_name:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                # Otro proceso ya la expulsó
+                total -= size
+
+    def clear(self):
+        """Elimina todas las entradas de la caché."""
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob(f"*{PDF_SUFFIX}"):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+_cache_instances = {}
+
+
+def get_pdf_cache():
+    """
+    Retorna la caché de PDFs configurada en settings
+    (PDF_CACHE_DIR y PDF_CACHE_MAX_BYTES), una instancia por configuración.
+    """
+    directory = str(settings.PDF_CACHE_DIR)
+    max_bytes = settings.PDF_CACHE_MAX_BYTES
+    config_key = (directory, max_bytes)
+
+    if config_key not in _cache_instances:
+        _cache_instances[config_key] = PDFCache(directory, max_bytes)
+    return _cache_instances[config_key]
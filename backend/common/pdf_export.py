@@ -0,0 +1,121 @@
+"""
+Exportación masiva de PDFs como un ZIP en streaming.
+
+- Los documentos se encolan en bloque como trabajos de render (common.pdf_jobs)
+  y los genera el consumidor dedicado, nunca el worker web; el ZIP copia cada
+  PDF desde la caché en disco a medida que su trabajo termina.
+- Si ningún documento termina durante PDF_EXPORTAR_ESPERA segundos (ej: el
+  consumidor está caído), los restantes se dan por fallidos.
+- El ZIP se escribe entrada por entrada sobre un stream no posicionable y se
+  entrega al cliente a medida que se genera (StreamingHttpResponse). En
+  memoria solo hay un bloque de lectura.
+"""
+
+import logging
+import time
+import zipfile
+
+from django.conf import settings
+
+from .models import TrabajoRenderPDF
+from .pdf_cache import get_pdf_cache
+from .pdf_jobs import encolar_lote, reencolar_trabajo
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+ERRORES_FILENAME = 'ERRORES.txt'
+
+# Segundos entre consultas del estado del trabajo que se espera
+SONDEO_SEGUNDOS = 0.5
+
+
+class _ZipStream:
+    """
+    Destino de escritura para ZipFile que acumula los bytes escritos hasta
+    que el generador los consume. Sin tell()/seek(), ZipFile usa descriptores
+    de datos y nunca retrocede sobre lo ya entregado.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _iter_rendered(tipo_documento, objeto_ids, idioma, usuario):
+    """
+    Encola un trabajo por documento y los retorna, en el orden de
+    `objeto_ids`, a medida que el consumidor los termina.
+    Retorna tuplas (objeto_id, pdf_file, nombre_archivo, error); el
+    llamador cierra `pdf_file`.
+    """
+    trabajos = encolar_lote(tipo_documento, objeto_ids, idioma, usuario)
+    espera = settings.PDF_EXPORTAR_ESPERA
+    plazo = time.monotonic() + espera
+
+    for trabajo in trabajos:
+        while True:
+            trabajo.refresh_from_db(fields=['estado', 'clave_cache', 'nombre_archivo', 'error'])
+            if trabajo.estado == TrabajoRenderPDF.Estado.ERROR:
+                yield trabajo.objeto_id, None, None, trabajo.error
+                break
+            if trabajo.estado == TrabajoRenderPDF.Estado.COMPLETADO:
+                pdf_file = get_pdf_cache().open(trabajo.clave_cache)
+                if pdf_file is not None:
+                    plazo = time.monotonic() + espera
+                    yield trabajo.objeto_id, pdf_file, trabajo.nombre_archivo, None
+                    break
+                # Expulsado de la caché antes de leerlo: el consumidor lo regenera
+                reencolar_trabajo(trabajo)
+            if time.monotonic() >= plazo:
+                logger.error(f"Exportación: {tipo_documento} {trabajo.objeto_id} sin renderizar tras {espera} s")
+                yield trabajo.objeto_id, None, None, 'Tiempo de espera agotado'
+                break
+            time.sleep(SONDEO_SEGUNDOS)
+
+
+def stream_pdf_zip(tipo_documento, objeto_ids, idioma, usuario=None):
+    """
+    Generador que produce el ZIP con los PDFs de `objeto_ids` (el llamador
+    limita su cantidad con PDF_EXPORTAR_MAX).
+
+    Los documentos que fallan no interrumpen la exportación: se listan en
+    un archivo ERRORES.txt al final del ZIP.
+    """
+    stream = _ZipStream()
+    errores = []
+
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_STORED) as zf:
+        rendered = _iter_rendered(tipo_documento, objeto_ids, idioma, usuario)
+        for objeto_id, pdf_file, nombre_archivo, error in rendered:
+            if error is not None:
+                errores.append(f"{objeto_id}: {error}")
+                continue
+
+            # Los PDFs ya vienen comprimidos; se guardan sin recomprimir
+            with pdf_file:
+                with zf.open(nombre_archivo, mode='w', force_zip64=True) as entry:
+                    while True:
+                        chunk = pdf_file.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        entry.write(chunk)
+                        yield stream.drain()
+            yield stream.drain()
+
+        if errores:
+            zf.writestr(ERRORES_FILENAME, '\n'.join(errores))
+
+    yield stream.drain()
@@ -0,0 +1,207 @@
+"""
+Cola de renderizado de PDFs en segundo plano.
+
+- Los trabajos se persisten en `TrabajoRenderPDF` (no requiere broker externo).
+- El lado web solo inserta (o reutiliza) la fila y responde: el render nunca
+  corre en el worker de gunicorn.
+- Un único consumidor dedicado, `manage.py procesar_trabajos_pdf`, reclama los
+  trabajos PENDIENTE en orden de llegada y los renderiza; consulta la tabla
+  cada PDF_CONSUMIDOR_INTERVALO segundos cuando la cola está vacía.
+- El resultado queda en la caché de PDFs en disco (common.pdf_cache); el
+  trabajo solo guarda la clave para servirlo.
+
+Los trabajos que quedaron en PROCESANDO (el consumidor murió a mitad del
+render) vuelven a la cola solos pasados PDF_TRABAJO_ATASCADO_MINUTOS: al
+encolar de nuevo el mismo documento o en la siguiente vuelta del consumidor.
+
+Con PDF_PRERENDER_ON_TRANSITION activo, `prerenderizar` encola el PDF tras las
+transiciones que casi siempre preceden a una descarga (envío o aceptación de
+una cotización, creación de un pedido), de modo que la descarga posterior es
+un acierto de caché.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import TrabajoRenderPDF
+
+logger = logging.getLogger(__name__)
+
+# Función que renderiza cada tipo de documento en la caché.
+# Firma: render(objeto_id, idioma) -> (clave_cache, nombre_archivo)
+RENDERERS = {
+    TrabajoRenderPDF.TipoDocumento.COTIZACION: 'cotizaciones.pdf_generator.render_cotizacion_to_cache',
+    TrabajoRenderPDF.TipoDocumento.PEDIDO: 'pedidos_servicio.pdf_generator.render_pedido_to_cache',
+}
+
+
+def precargar_recursos():
+    """
+    Precarga los recursos estáticos de cada generador (estilos, logo, textos)
+    una sola vez al arrancar el consumidor.
+    """
+    for renderer_path in RENDERERS.values():
+        module_path = renderer_path.rsplit('.', 1)[0]
+        try:
+            import_string(f'{module_path}.warm_pdf_assets')()
+        except Exception as e:
+            logger.warning(f"No se pudieron precargar los recursos PDF de {module_path}: {str(e)}")
+
+
+def render_document(tipo_documento, objeto_id, idioma):
+    """Renderiza un documento en la caché. Retorna (clave_cache, nombre_archivo)."""
+    renderer = import_string(RENDERERS[tipo_documento])
+    return renderer(objeto_id, idioma)
+
+
+def ejecutar_trabajo(trabajo_id):
+    """
+    Procesa un trabajo pendiente.
+
+    El trabajo se reclama con un UPDATE condicionado al estado PENDIENTE,
+    así dos procesos nunca generan el mismo trabajo.
+
+    Returns:
+        Estado final (COMPLETADO o ERROR), o None si otro proceso lo reclamó
+    """
+    reclamado = TrabajoRenderPDF.objects.filter(
+        pk=trabajo_id, estado=TrabajoRenderPDF.Estado.PENDIENTE
+    ).update(estado=TrabajoRenderPDF.Estado.PROCESANDO, fecha_inicio=timezone.now())
+    if not reclamado:
+        return None
+
+    trabajo = TrabajoRenderPDF.objects.get(pk=trabajo_id)
+    try:
+        clave_cache, nombre_archivo = render_document(
+            trabajo.tipo_documento, trabajo.objeto_id, trabajo.idioma
+        )
+    except Exception as e:
+        logger.exception(f"Error renderizando trabajo PDF {trabajo_id}: {str(e)}")
+        TrabajoRenderPDF.objects.filter(pk=trabajo_id).update(
+            estado=TrabajoRenderPDF.Estado.ERROR,
+            error=str(e),
+            fecha_fin=timezone.now(),
+        )
+        return TrabajoRenderPDF.Estado.ERROR
+
+    TrabajoRenderPDF.objects.filter(pk=trabajo_id).update(
+        estado=TrabajoRenderPDF.Estado.COMPLETADO,
+        clave_cache=clave_cache,
+        nombre_archivo=nombre_archivo,
+        error='',
+        fecha_fin=timezone.now(),
+    )
+    return TrabajoRenderPDF.Estado.COMPLETADO
+
+
+def procesar_siguiente():
+    """
+    Reclama y procesa el trabajo PENDIENTE más antiguo.
+
+    Returns:
+        Estado final del trabajo procesado, o None si la cola está vacía
+    """
+    pendientes = TrabajoRenderPDF.objects.filter(
+        estado=TrabajoRenderPDF.Estado.PENDIENTE
+    ).order_by('created_at', 'pk').values_list('pk', flat=True)
+    while True:
+        trabajo_id = pendientes.first()
+        if trabajo_id is None:
+            return None
+        estado = ejecutar_trabajo(trabajo_id)
+        # None: otro consumidor lo reclamó primero; se prueba con el siguiente
+        if estado is not None:
+            return estado
+
+
+def reiniciar_atascados(minutos=None, **filtros):
+    """
+    Vuelve a PENDIENTE los trabajos en PROCESANDO desde hace más de `minutos`
+    (por defecto PDF_TRABAJO_ATASCADO_MINUTOS; 0 = no hace nada). `filtros`
+    acota los trabajos (ej: un documento).
+
+    Returns:
+        int: Trabajos reiniciados
+    """
+    minutos = settings.PDF_TRABAJO_ATASCADO_MINUTOS if minutos is None else minutos
+    if minutos <= 0:
+        return 0
+
+    reiniciados = TrabajoRenderPDF.objects.filter(
+        estado=TrabajoRenderPDF.Estado.PROCESANDO,
+        fecha_inicio__lt=timezone.now() - timedelta(minutes=minutos),
+        **filtros,
+    ).update(estado=TrabajoRenderPDF.Estado.PENDIENTE, fecha_inicio=None)
+    if reiniciados:
+        logger.warning(f"{reiniciados} trabajos de render PDF atascados vueltos a la cola")
+    return reiniciados
+
+
+def encolar_trabajo(tipo_documento, objeto_id, idioma, usuario=None):
+    """
+    Crea (o reutiliza) un trabajo de render para el consumidor. Si el mismo
+    usuario ya tiene un trabajo en curso para el mismo documento e idioma, se
+    retorna ese mismo (si estaba atascado en PROCESANDO, vuelve a PENDIENTE).
+    """
+    if usuario is not None and not usuario.is_authenticated:
+        usuario = None
+
+    documento = dict(
+        tipo_documento=tipo_documento, objeto_id=objeto_id, idioma=idioma, usuario_creacion=usuario
+    )
+    reiniciar_atascados(**documento)
+    en_curso = TrabajoRenderPDF.objects.filter(
+        estado__in=[TrabajoRenderPDF.Estado.PENDIENTE, TrabajoRenderPDF.Estado.PROCESANDO], **documento
+    ).first()
+    if en_curso:
+        return en_curso
+
+    return TrabajoRenderPDF.objects.create(**documento)
+
+
+def encolar_lote(tipo_documento, objeto_ids, idioma, usuario=None):
+    """
+    Crea un trabajo de render por documento en una sola inserción (ej: una
+    exportación masiva). A diferencia de `encolar_trabajo` no reutiliza
+    trabajos en curso: cada lote sigue los suyos.
+
+    Returns:
+        list: Trabajos creados, en el orden de `objeto_ids`
+    """
+    if usuario is not None and not usuario.is_authenticated:
+        usuario = None
+
+    return TrabajoRenderPDF.objects.bulk_create([
+        TrabajoRenderPDF(
+            tipo_documento=tipo_documento, objeto_id=objeto_id, idioma=idioma, usuario_creacion=usuario
+        )
+        for objeto_id in objeto_ids
+    ])
+
+
+def reencolar_trabajo(trabajo):
+    """Vuelve a poner en cola un trabajo cuyo PDF ya no está en la caché."""
+    TrabajoRenderPDF.objects.filter(pk=trabajo.pk).update(
+        estado=TrabajoRenderPDF.Estado.PENDIENTE, clave_cache='', fecha_fin=None
+    )
+    trabajo.refresh_from_db()
+    return trabajo
+
+
+def prerenderizar(tipo_documento, objeto_id, idioma):
+    """
+    Encola el PDF del documento para que el consumidor lo deje en la caché.
+    La fila se inserta en la transacción en curso: si se revierte, no se
+    genera nada.
+
+    Opt-in con PDF_PRERENDER_ON_TRANSITION; sin él no hace nada. El trabajo
+    no tiene usuario (nadie lo consulta): si el render falla queda en ERROR y
+    la descarga lo generará como siempre.
+    """
+    if not settings.PDF_PRERENDER_ON_TRANSITION:
+        return None
+    return encolar_trabajo(tipo_documento, objeto_id, idioma)
@@ -0,0 +1,138 @@
+"""
+Respuestas HTTP para descargar PDFs desde la caché en disco.
+
+El PDF ya vive en un archivo de la caché (common.pdf_cache), así que no hace
+falta cargarlo en memoria para responder: se entrega por bloques desde el
+archivo, con Content-Length, ETag y soporte de rangos (`Range: bytes=...`)
+para que los clientes puedan revalidar (304) y reanudar descargas (206).
+"""
+
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+CHUNK_SIZE = 64 * 1024
+
+# Bytes finales del PDF (trailer con /ID) que identifican un render concreto
+_ETAG_TAIL_BYTES = 512
+
+_RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+
+
+class RangoNoSatisfacible(Exception):
+    pass
+
+
+def pdf_etag(pdf_file):
+    """
+    ETag fuerte del PDF abierto desde la caché.
+
+    La clave de caché identifica el documento, pero dos renders de la misma
+    huella no son idénticos byte a byte (fecha de creación). El final del
+    archivo contiene el trailer con el /ID que ReportLab calcula en cada
+    render, así que su digest distingue un re-render tras una expulsión y
+    evita reanudar un rango sobre otro archivo.
+    """
+    size = os.fstat(pdf_file.fileno()).st_size
+    pdf_file.seek(max(size - _ETAG_TAIL_BYTES, 0))
+    tail_digest = hashlib.md5(pdf_file.read(), usedforsecurity=False).hexdigest()[:16]
+    pdf_file.seek(0)
+    return quote_etag(f"{Path(pdf_file.name).stem}-{tail_digest}")
+
+
+def parse_range(header, size):
+    """
+    Interpreta un encabezado Range de un solo rango sobre `size` bytes.
+
+    Retorna (inicio, fin) inclusivos, o None si el encabezado no aplica
+    (sintaxis inválida o varios rangos: se responde el archivo completo).
+    Lanza RangoNoSatisfacible si el rango queda fuera del archivo.
+    """
+    match = _RANGE_RE.fullmatch(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+
+    start, end = match.groups()
+    if not start:
+        # Sufijo: los últimos `end` bytes
+        length = int(end)
+        if length == 0:
+            raise RangoNoSatisfacible()
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size:
+        raise RangoNoSatisfacible()
+    if end < start:
+        return None
+    return start, end
+
+
+def _iter_range(pdf_file, start, length):
+    try:
+        pdf_file.seek(start)
+        while length > 0:
+            chunk = pdf_file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        pdf_file.close()
+
+
+def pdf_file_response(request, pdf_file, filename):
+    """
+    Respuesta de descarga para `pdf_file` (archivo abierto de la caché).
+
+    - If-None-Match con el ETag vigente -> 304 sin cuerpo.
+    - Range válido (y If-Range, si viene, coincide con el ETag) -> 206.
+    - Range fuera del archivo -> 416.
+    - En otro caso -> 200 con el archivo completo en streaming.
+
+    La respuesta se hace cargo de cerrar el archivo.
+    """
+    etag = pdf_etag(pdf_file)
+    size = os.fstat(pdf_file.fileno()).st_size
+
+    conditional = get_conditional_response(request, etag=etag)
+    if conditional is not None:
+        pdf_file.close()
+        conditional['ETag'] = etag
+        return conditional
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangoNoSatisfacible:
+            pdf_file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(pdf_file, as_attachment=True, filename=filename, content_type='application/pdf')
+        response.block_size = CHUNK_SIZE
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _iter_range(pdf_file, start, end - start + 1), status=206, content_type='application/pdf'
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    # Los navegadores revalidan con If-None-Match en cada descarga
+    response['Cache-Control'] = 'private, no-cache'
+    return response
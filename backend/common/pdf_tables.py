@@ -0,0 +1,135 @@
+"""
+Motor de maquetación compacto para las tablas de ítems de los PDFs.
+
+Los generadores agregaban una docena de comandos de TableStyle por cada fila
+(alineación, fuente, padding, fondo...). En documentos de cientos de ítems
+eso son miles de comandos que ReportLab recorre al calcular la tabla y otra
+vez en cada corte de página.
+
+`TableLayout` separa:
+- los comandos comunes a toda la tabla (`base`), que se declaran una vez;
+- los comandos propios de cada tipo de fila (`row_styles`), que se emiten
+  por tramos contiguos de filas del mismo tipo. 500 filas de datos seguidas
+  generan un comando por propiedad, no 500.
+
+Además, una sola Table de miles de filas es cuadrática al paginar: en cada
+corte de página ReportLab vuelve a calcular alturas, SPANs y estilos de todas
+las filas restantes. `build_chunks` entrega la tabla como varias Tables
+consecutivas, cortadas solo entre grupos de filas (`start_group`) para no
+separar un ítem de su descripción. Las tablas se apilan sin espacio entre
+ellas, así que el resultado es visualmente el mismo.
+
+Ej:
+    layout = TableLayout(
+        base=[('VALIGN', (0, 0), (-1, -1), 'TOP')],
+        row_styles={'header': [('BACKGROUND', 0, -1, colors.grey)]},
+    )
+    layout.add_row('header', ['A', 'B'])
+    for item in items:
+        layout.start_group()
+        layout.add_row('data', [p1, p2])
+    story.extend(layout.build_chunks(colWidths=[...], repeatRows=1))
+"""
+
+from reportlab.platypus import Table, TableStyle
+
+# Filas por Table al trocear (unas pocas páginas): acota el coste de cada corte
+CHUNK_ROWS = 150
+
+
+class TableLayout:
+    """
+    Acumula filas etiquetadas con un tipo y construye la tabla con los
+    comandos de estilo agrupados por rango.
+
+    `row_styles` asocia cada tipo de fila a una lista de comandos con el
+    formato (nombre, columna_inicio, columna_fin, *argumentos); las filas
+    las completa el motor. Los tipos sin comandos propios no necesitan
+    declararse.
+    """
+
+    def __init__(self, base=(), row_styles=None):
+        self.base = list(base)
+        self.row_styles = row_styles or {}
+        self.rows = []
+        self._kinds = []
+        self._groups = []
+
+    def add_row(self, kind, cells):
+        """Agrega una fila del tipo `kind`. Retorna su índice."""
+        self.rows.append(cells)
+        self._kinds.append(kind)
+        return len(self.rows) - 1
+
+    def start_group(self):
+        """Marca que la próxima fila inicia un grupo (ej: un ítem); `build_chunks` solo corta ahí."""
+        self._groups.append(len(self.rows))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def runs(self):
+        """Tramos contiguos de filas del mismo tipo: [(tipo, fila_inicio, fila_fin)]."""
+        runs = []
+        for index, kind in enumerate(self._kinds):
+            if runs and runs[-1][0] == kind:
+                runs[-1][2] = index
+            else:
+                runs.append([kind, index, index])
+        return [tuple(run) for run in runs]
+
+    def commands(self):
+        """Comandos de estilo: los de base y luego los de cada tramo, en orden de filas."""
+        commands = list(self.base)
+        for kind, start, end in self.runs():
+            for name, col_start, col_end, *args in self.row_styles.get(kind, ()):
+                if name == 'SPAN':
+                    # SPAN une celdas de una sola fila: se emite por fila
+                    commands.extend(
+                        (name, (col_start, row), (col_end, row), *args)
+                        for row in range(start, end + 1)
+                    )
+                else:
+                    commands.append((name, (col_start, start), (col_end, end), *args))
+        return commands
+
+    def build(self, **table_kwargs):
+        """Construye la Table de ReportLab con las filas y los comandos agrupados."""
+        table = Table(self.rows, **table_kwargs)
+        table.setStyle(TableStyle(self.commands()))
+        return table
+
+    def build_chunks(self, max_rows=CHUNK_ROWS, **table_kwargs):
+        """
+        Construye la tabla como una lista de Tables de como mucho `max_rows`
+        filas (un grupo más largo queda entero en su Table).
+
+        Con `repeatRows=n`, las n primeras filas (el encabezado) se repiten
+        al inicio de cada Table, igual que ReportLab las repite en cada página.
+        """
+        repeat_rows = table_kwargs.get('repeatRows') or 0
+        if len(self.rows) <= max_rows:
+            return [self.build(**table_kwargs)]
+
+        body_rows = max(max_rows - repeat_rows, 1)
+        boundaries = [index for index in self._groups if index > repeat_rows]
+
+        # Corte voraz: cada trozo termina en el último inicio de grupo que entra
+        chunks = []
+        start = last = repeat_rows
+        for boundary in boundaries + [len(self.rows)]:
+            if boundary - start > body_rows and last > start:
+                chunks.append((start, last))
+                start = last
+            last = boundary
+        if start < len(self.rows):
+            chunks.append((start, len(self.rows)))
+
+        return [self._slice(repeat_rows, start, end).build(**table_kwargs) for start, end in chunks]
+
+    def _slice(self, repeat_rows, start, end):
+        """Layout con las `repeat_rows` primeras filas y las filas [start, end)."""
+        layout = TableLayout(self.base, self.row_styles)
+        for index in [*range(repeat_rows), *range(start, end)]:
+            layout.add_row(self._kinds[index], self.rows[index])
+        return layout
@@ -0,0 +1,20 @@
+from rest_framework import serializers
+from .models import TrabajoRenderPDF
+
+
+class TrabajoRenderPDFSerializer(serializers.ModelSerializer):
+    """Estado de un trabajo de render de PDF en segundo plano."""
+
+    tipo_documento_display = serializers.CharField(source='get_tipo_documento_display', read_only=True)
+    estado_display = serializers.CharField(source='get_estado_display', read_only=True)
+    # URL para consultar el estado / descargar el PDF
+    url = serializers.HyperlinkedIdentityField(view_name='trabajo-pdf-detail', read_only=True)
+
+    class Meta:
+        model = TrabajoRenderPDF
+        fields = [
+            'id', 'url', 'tipo_documento', 'tipo_documento_display', 'objeto_id', 'idioma',
+            'estado', 'estado_display', 'nombre_archivo', 'error',
+            'fecha_inicio', 'fecha_fin', 'created_at',
+        ]
+        read_only_fields = fields
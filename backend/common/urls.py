@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import TrabajoRenderPDFViewSet
+
+router = DefaultRouter()
+router.register(r'trabajos-pdf', TrabajoRenderPDFViewSet, basename='trabajo-pdf')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
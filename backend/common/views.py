@@ -0,0 +1,47 @@
+from rest_framework import mixins, status, viewsets
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import TrabajoRenderPDF
+from .pdf_cache import get_pdf_cache
+from .pdf_jobs import reencolar_trabajo
+from .pdf_response import pdf_file_response
+from .serializers import TrabajoRenderPDFSerializer
+
+
+class TrabajoRenderPDFViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Consulta de trabajos de render de PDF en segundo plano.
+
+    - GET /trabajos-pdf/{id}/ :
+        * PENDIENTE / PROCESANDO -> 202 con el estado del trabajo
+        * ERROR                  -> 200 con el estado y el detalle del error
+        * COMPLETADO             -> descarga del PDF
+    """
+
+    serializer_class = TrabajoRenderPDFSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = TrabajoRenderPDF.objects.all()
+
+        # Cada usuario solo ve sus propios trabajos
+        if not user.is_superuser:
+            queryset = queryset.filter(usuario_creacion=user)
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        trabajo = self.get_object()
+
+        if trabajo.estado == TrabajoRenderPDF.Estado.COMPLETADO:
+            pdf_file = get_pdf_cache().open(trabajo.clave_cache)
+            if pdf_file is not None:
+                return pdf_file_response(request, pdf_file, trabajo.nombre_archivo)
+            # El PDF fue expulsado de la caché: se vuelve a generar
+            trabajo = reencolar_trabajo(trabajo)
+
+        serializer = self.get_serializer(trabajo)
+        if trabajo.estado in [TrabajoRenderPDF.Estado.PENDIENTE, TrabajoRenderPDF.Estado.PROCESANDO]:
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+        return Response(serializer.data)
@@ -157,6 +157,18 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    # Descargas de PDF: revalidación y reanudación
+    'if-none-match',
+    'if-range',
+    'range',
+]
+
+CORS_EXPOSE_HEADERS = [
+    'accept-ranges',
+    'content-disposition',
+    'content-length',
+    'content-range',
+    'etag',
 ]
 
 # Django REST Framework Configuration
@@ -211,6 +223,41 @@ CACHES = {
     }
 }
 
+# Caché en disco de PDFs renderizados (cotizaciones y pedidos)
+PDF_CACHE_DIR = config('PDF_CACHE_DIR', default=str(BASE_DIR / 'pdf_cache'))
+PDF_CACHE_MAX_BYTES = config('PDF_CACHE_MAX_BYTES', default=200 * 1024 * 1024, cast=int)
+
+# Segundos entre consultas del consumidor de la cola de render PDF
+# (manage.py procesar_trabajos_pdf) cuando no hay trabajos pendientes
+PDF_CONSUMIDOR_INTERVALO = config('PDF_CONSUMIDOR_INTERVALO', default=2, cast=float)
+
+# Máximo de documentos por exportación masiva de PDFs (ZIP)
+PDF_EXPORTAR_MAX = config('PDF_EXPORTAR_MAX', default=200, cast=int)
+
+# Segundos que la exportación espera al consumidor sin que termine ningún
+# documento antes de dar los restantes por fallidos (ej: consumidor caído)
+PDF_EXPORTAR_ESPERA = config('PDF_EXPORTAR_ESPERA', default=120, cast=int)
+
+# Un trabajo de render en PROCESANDO desde hace más de estos minutos se da por
+# perdido (ej: el consumidor murió) y vuelve a la cola al encolar el mismo
+# documento o en la siguiente vuelta de procesar_trabajos_pdf. 0 = nunca
+PDF_TRABAJO_ATASCADO_MINUTOS = config('PDF_TRABAJO_ATASCADO_MINUTOS', default=10, cast=int)
+
+# Pre-renderiza el PDF en la caché al enviar/aceptar una cotización o crear un
+# pedido (la descarga que suele seguir ya lo encuentra generado)
+PDF_PRERENDER_ON_TRANSITION = config('PDF_PRERENDER_ON_TRANSITION', default=False, cast=bool)
+
+# Documentos con al menos este número de ítems se generan en modo denso
+# (un encabezado de tabla por ambiente en lugar de uno por ítem). 0 = nunca
+PDF_DENSE_MIN_ITEMS = config('PDF_DENSE_MIN_ITEMS', default=0, cast=int)
+
+# Máximo de clientes por request al clonar una cotización en lote
+COTIZACION_CLONAR_LOTE_MAX = config('COTIZACION_CLONAR_LOTE_MAX', default=200, cast=int)
+
+# Cada cuántas revisiones de una cotización se guarda la foto completa en lugar
+# del delta (acota la reconstrucción a N - 1 deltas)
+COTIZACION_REVISION_CHECKPOINT = config('COTIZACION_REVISION_CHECKPOINT', default=10, cast=int)
+
 # Database optimizations
 CONN_MAX_AGE = 600  # Persistent connections
 DATABASE_CONN_HEALTH_CHECKS = True
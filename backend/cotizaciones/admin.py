@@ -4,7 +4,9 @@ from django.db import models
 from django.db import transaction
 
 # Importamos los modelos
-from .models import Cotizacion, CotizacionAmbiente, CotizacionItem
+from .models import (
+    Cotizacion, CotizacionAmbiente, CotizacionItem, marcar_recalculo_pendiente, recalculo_diferido,
+)
 
 # -----------------------------------------------------------------------------
 # 1. ÍTEMS (Nivel 3)
@@ -125,6 +127,13 @@ class CotizacionAdmin(admin.ModelAdmin):
         """
         with transaction.atomic():
             super().save_model(request, obj, form, change)
-            # Recalcular totales después de guardar todos los inlines
+
+    def save_related(self, request, form, formsets, change):
+        """
+        Guarda los inlines con el recálculo de totales diferido: aunque se
+        guarden varios ítems, los totales se recalculan una sola vez al final.
+        """
+        with recalculo_diferido():
+            super().save_related(request, form, formsets, change)
             if change:  # Solo en edición, no en creación
-                obj.recalculate_totals()
+                marcar_recalculo_pendiente(form.instance.pk)
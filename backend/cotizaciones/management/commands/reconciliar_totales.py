@@ -0,0 +1,77 @@
+# cotizaciones/management/commands/reconciliar_totales.py
+import logging
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from cotizaciones.models import Cotizacion
+
+logger = logging.getLogger(__name__)
+
+
+def cotizaciones_con_desvio(queryset=None):
+    """
+    Compara los totales guardados (mantenidos por deltas) con el aggregate
+    completo de los ítems, en una sola consulta.
+
+    Returns:
+        list: (cotizacion, total_items) de las cotizaciones cuyos totales no coinciden
+    """
+    queryset = queryset if queryset is not None else Cotizacion.objects.all()
+    queryset = queryset.annotate(
+        total_items=Coalesce(
+            Sum('ambientes__items__precio_total'), Decimal('0.00'), output_field=models.DecimalField()
+        )
+    ).order_by('pk')
+
+    return [
+        (cotizacion, cotizacion.total_items)
+        for cotizacion in queryset.iterator(chunk_size=500)
+        if cotizacion.total_neto != cotizacion.total_items
+        or cotizacion.total_general != cotizacion.total_items - cotizacion.descuento_total
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifica que total_neto/total_general de cada cotización coincidan con la suma de sus ítems '
+        '(los totales se mantienen con deltas) y corrige los desvíos. Pensado para ejecutarse periódicamente.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cotizacion', type=int, help='Verificar solo esta cotización (ID)')
+        parser.add_argument(
+            '--solo-verificar', action='store_true',
+            help='Informa los desvíos sin corregirlos',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Cotizacion.objects.all()
+        if options['cotizacion']:
+            queryset = queryset.filter(pk=options['cotizacion'])
+
+        desvios = cotizaciones_con_desvio(queryset)
+        for cotizacion, total_items in desvios:
+            self.stdout.write(
+                f'  ✗ {cotizacion.numero}: total_neto {cotizacion.total_neto} '
+                f'(ítems suman {total_items}), total_general {cotizacion.total_general}'
+            )
+
+        if not desvios:
+            self.stdout.write(self.style.SUCCESS('✅ Totales consistentes con los ítems'))
+            return
+
+        if options['solo_verificar']:
+            self.stdout.write(self.style.WARNING(f'{len(desvios)} cotizaciones con desvío (sin corregir)'))
+            return
+
+        for cotizacion, _total_items in desvios:
+            # Recalcular con el aggregate completo, con la fila bloqueada
+            with transaction.atomic():
+                Cotizacion.objects.select_for_update().filter(pk=cotizacion.pk).first().recalculate_totals()
+            logger.warning(f'Totales de la cotización {cotizacion.numero} reconciliados')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(desvios)} cotizaciones reconciliadas'))
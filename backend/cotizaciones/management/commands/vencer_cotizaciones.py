@@ -0,0 +1,39 @@
+# cotizaciones/management/commands/vencer_cotizaciones.py
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cotizaciones.services import BULK_BATCH_SIZE, CotizacionService
+
+
+class Command(BaseCommand):
+    help = (
+        'Pasa a VENCIDA las cotizaciones BORRADOR/ENVIADA con fecha de validez pasada, '
+        'por lotes (un UPDATE por lote). Pensado para ejecutarse a diario (cron); '
+        'es seguro en paralelo con la API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=BULK_BATCH_SIZE, help='Filas por UPDATE')
+        parser.add_argument('--fecha', help='Fecha de referencia YYYY-MM-DD (por defecto hoy)')
+        parser.add_argument('--simular', action='store_true', help='Solo informa cuántas vencerían')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+        try:
+            hoy = date.fromisoformat(options['fecha']) if options['fecha'] else None
+        except ValueError:
+            raise CommandError('--fecha debe tener el formato YYYY-MM-DD')
+
+        vencidas = CotizacionService.vencer_cotizaciones(
+            hoy=hoy, lote=options['lote'], simular=options['simular']
+        )
+
+        for estado, cantidad in vencidas.items():
+            self.stdout.write(f'  {estado}: {cantidad}')
+        total = sum(vencidas.values())
+        if options['simular']:
+            self.stdout.write(self.style.WARNING(f'{total} cotizaciones vencerían (simulación, sin cambios)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {total} cotizaciones pasadas a VENCIDA'))
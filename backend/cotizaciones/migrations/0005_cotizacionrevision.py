@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cotizaciones', '0004_alter_cotizacion_fecha_emision'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CotizacionRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Activo')),
+                ('numero', models.PositiveIntegerField(verbose_name='Número de Revisión')),
+                ('es_checkpoint', models.BooleanField(default=False, help_text="Si es True, 'datos' es la foto completa; si no, el delta contra la revisión anterior.", verbose_name='Checkpoint')),
+                ('datos', models.JSONField(verbose_name='Foto o Delta (JSON)')),
+                ('cotizacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisiones', to='cotizaciones.cotizacion', verbose_name='Cotización')),
+                ('usuario_creacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_creados', to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+                ('usuario_modificacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_modificados', to=settings.AUTH_USER_MODEL, verbose_name='Modificado por')),
+            ],
+            options={
+                'verbose_name': 'Revisión de Cotización',
+                'verbose_name_plural': 'Revisiones de Cotización',
+                'ordering': ['cotizacion', 'numero'],
+                'unique_together': {('cotizacion', 'numero')},
+            },
+        ),
+    ]
@@ -1,8 +1,13 @@
+import threading
+from contextlib import contextmanager
+
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
 
 # Importaciones externas de apps vecinas
 # NOTA: Asumo que Manufactura, Cliente, ProductoServicio y common.models existen
@@ -11,6 +16,59 @@ from manufactura.models import Manufactura
 from common.models import BaseModel, SoftDeleteMixin, TablaCorrelativos
 from productos_servicios.models import ProductoServicio
 
+# -----------------------------------------------------------------------------
+# RECÁLCULO DIFERIDO DE TOTALES
+# -----------------------------------------------------------------------------
+
+# Cotizaciones con totales pendientes de recalcular (por hilo / request)
+_recalculo = threading.local()
+
+
+@contextmanager
+def recalculo_diferido():
+    """
+    Agrupa los recálculos de totales dentro de un bloque atómico.
+
+    Mientras el bloque está activo, `CotizacionItem.save()` solo marca su
+    cotización como pendiente; al cerrar el bloque (antes del commit) cada
+    cotización pendiente se recalcula UNA sola vez. Si el bloque falla, la
+    transacción se revierte y no se recalcula nada. Los bloques anidados se
+    suman al más externo.
+
+    Uso:
+        with recalculo_diferido():
+            for item in items:
+                item.save()
+    """
+    if getattr(_recalculo, 'pendientes', None) is not None:
+        yield
+        return
+
+    _recalculo.pendientes = set()
+    try:
+        with transaction.atomic():
+            yield
+            pendientes, _recalculo.pendientes = _recalculo.pendientes, None
+            # Orden estable por pk para bloquear filas siempre en el mismo orden
+            for cotizacion in Cotizacion.objects.filter(pk__in=pendientes).order_by('pk'):
+                cotizacion.recalculate_totals()
+    finally:
+        _recalculo.pendientes = None
+
+
+def marcar_recalculo_pendiente(cotizacion_id):
+    """
+    Registra la cotización en el bloque `recalculo_diferido` activo.
+
+    Returns:
+        bool: False si no hay un bloque activo (el llamador debe recalcular ya)
+    """
+    pendientes = getattr(_recalculo, 'pendientes', None)
+    if pendientes is None:
+        return False
+    pendientes.add(cotizacion_id)
+    return True
+
 # -----------------------------------------------------------------------------
 # 1. MODELO ENCABEZADO (COTIZACIÓN)
 # -----------------------------------------------------------------------------
@@ -91,9 +149,13 @@ class Cotizacion(BaseModel, SoftDeleteMixin):
         de transacciones atómicas.
         """
 
-        # 1. Sumar totales de todos los items en todos los ambientes
-        total_bruto = sum(item.precio_total for ambiente in self.ambientes.all()
-                          for item in ambiente.items.all())
+        # 1. Sumar totales de todos los items en todos los ambientes con un solo
+        # SUM en la base de datos (ítems unidos a la cotización vía ambiente)
+        total_bruto = CotizacionItem.objects.filter(
+            ambiente__cotizacion_id=self.pk
+        ).aggregate(
+            total=Coalesce(Sum('precio_total'), Decimal('0.00'), output_field=models.DecimalField())
+        )['total']
 
         # 2. Aplicar descuento global (si lo hubiera, aquí se necesitaría un campo de descuento global en Cotizacion)
         # Por ahora, total_neto = total_bruto
@@ -104,6 +166,25 @@ class Cotizacion(BaseModel, SoftDeleteMixin):
         # Usar update_fields para evitar triggers y señales innecesarias
         self.save(update_fields=['total_neto', 'total_general', 'updated_at'])
 
+    @classmethod
+    def aplicar_delta_totales(cls, cotizacion_id, delta):
+        """
+        Suma `delta` a total_neto y total_general con un UPDATE atómico (F()),
+        sin leer ni recorrer los ítems. Concurrente-seguro: dos ediciones
+        simultáneas de ítems distintos no se pisan.
+
+        La desviación que pudiera quedar (p. ej. borrados masivos que no pasan
+        por `CotizacionItem.delete()`) se corrige con el comando
+        `reconciliar_totales`.
+        """
+        if not delta:
+            return
+        cls.objects.filter(pk=cotizacion_id).update(
+            total_neto=F('total_neto') + delta,
+            total_general=F('total_general') + delta,
+            updated_at=timezone.now(),
+        )
+
     def save(self, *args, **kwargs):
         # Implementación de Atomicidad para el Correlativo
         if not self.numero:
@@ -221,16 +302,99 @@ class CotizacionItem(BaseModel):
     precio_total = models.DecimalField(
         max_digits=12, decimal_places=2, editable=False, verbose_name="Total Línea (Neto)")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores persistidos: base del delta de totales al guardar o eliminar
+        instance._precio_total_guardado = instance.__dict__.get('precio_total')
+        instance._ambiente_guardado_id = instance.__dict__.get('ambiente_id')
+        return instance
+
     def save(self, *args, skip_recalculate=False, **kwargs):
         """
         Guarda el item calculando precio_total y descripcion_tecnica automáticamente.
         
         Args:
-            skip_recalculate (bool): Si es True, NO recalcula los totales del encabezado.
+            skip_recalculate (bool): Si es True, NO actualiza los totales del encabezado.
                 Usar cuando se están creando múltiples items dentro de una transacción
-                y se va a recalcular una sola vez al final.
+                y se va a recalcular una sola vez al final (o usar `recalculo_diferido()`).
         """
         # 1. Calcular Totales
+        self.calcular_precio_total()
+
+        # 2. Generar Descripción Técnica (Concatenación Automática)
+        self.generar_descripcion()
+
+        es_nuevo = self._state.adding
+        super().save(*args, **kwargs)
+
+        # Con update_fields solo se persiste parte de la fila: el delta vale si se
+        # guardan precio_total y ambiente; si no se guarda ninguno, los totales no cambian
+        update_fields = kwargs.get('update_fields')
+        guardados = None if update_fields is None else {
+            'ambiente' if campo == 'ambiente_id' else campo for campo in update_fields
+        }
+        guarda_precio = guardados is None or 'precio_total' in guardados
+        guarda_ambiente = guardados is None or 'ambiente' in guardados
+
+        # 3. Actualizar los totales del encabezado con el delta del ítem (nuevo - anterior).
+        # Solo si no se está ejecutando dentro de una transacción mayor; dentro de
+        # `recalculo_diferido()` se recalcula una sola vez al cerrar el bloque
+        if (
+            not skip_recalculate
+            and (guarda_precio or guarda_ambiente)
+            and not marcar_recalculo_pendiente(self.ambiente.cotizacion_id)
+        ):
+            anterior = Decimal(0) if es_nuevo else getattr(self, '_precio_total_guardado', None)
+            ambiente_anterior = self.ambiente_id if es_nuevo else getattr(self, '_ambiente_guardado_id', None)
+            if anterior is None or ambiente_anterior != self.ambiente_id or not (guarda_precio and guarda_ambiente):
+                # Sin valor anterior confiable, el ítem cambió de ambiente o solo se
+                # guardó uno de los dos campos: recálculo completo desde la base de datos
+                self._recalcular_cotizaciones(ambiente_anterior, self.ambiente_id)
+            else:
+                Cotizacion.aplicar_delta_totales(self.ambiente.cotizacion_id, self.precio_total - anterior)
+                self._refrescar_totales_en_memoria()
+
+        if guarda_precio:
+            self._precio_total_guardado = self.precio_total
+        if guarda_ambiente:
+            self._ambiente_guardado_id = self.ambiente_id
+
+    def delete(self, *args, **kwargs):
+        """
+        Elimina el item restando su precio_total de los totales del encabezado.
+        """
+        cotizacion_id = self.ambiente.cotizacion_id
+        anterior = getattr(self, '_precio_total_guardado', self.precio_total)
+        resultado = super().delete(*args, **kwargs)
+
+        if not marcar_recalculo_pendiente(cotizacion_id):
+            if anterior is None:
+                # precio_total diferido al cargar: recálculo completo (como en save)
+                self._recalcular_cotizaciones(self.ambiente_id)
+            else:
+                Cotizacion.aplicar_delta_totales(cotizacion_id, -anterior)
+                self._refrescar_totales_en_memoria()
+        return resultado
+
+    def _recalcular_cotizaciones(self, *ambiente_ids):
+        cotizacion_ids = CotizacionAmbiente.objects.filter(
+            pk__in=[pk for pk in ambiente_ids if pk is not None]
+        ).values_list('cotizacion_id', flat=True)
+        for cotizacion in Cotizacion.objects.filter(pk__in=cotizacion_ids).order_by('pk'):
+            cotizacion.recalculate_totals()
+        self._refrescar_totales_en_memoria()
+
+    def _refrescar_totales_en_memoria(self):
+        """Actualiza la cotización ya cargada en memoria (si la hay) tras un UPDATE con F()"""
+        if CotizacionItem.ambiente.is_cached(self) and CotizacionAmbiente.cotizacion.is_cached(self.ambiente):
+            self.ambiente.cotizacion.refresh_from_db(fields=['total_neto', 'total_general', 'updated_at'])
+
+    def calcular_precio_total(self):
+        """
+        Calcula precio_total en memoria a partir del precio unitario (snapshot),
+        las medidas, la cantidad y el descuento de línea.
+        """
         factor = Decimal(1)
         # Accedemos al modelo relacionado a través del campo 'producto'
         if self.producto.unidad_medida == 'M2' and self.producto.requiere_medidas:
@@ -239,17 +403,8 @@ class CotizacionItem(BaseModel):
 
         subtotal = self.precio_unitario * factor * self.cantidad
         descuento = subtotal * (self.porcentaje_descuento / Decimal(100))
-        self.precio_total = subtotal - descuento
-
-        # 2. Generar Descripción Técnica (Concatenación Automática)
-        self.generar_descripcion()
-
-        super().save(*args, **kwargs)
-
-        # 3. Recalcular total del encabezado después de guardar el item
-        # Solo si no se está ejecutando dentro de una transacción mayor
-        if not skip_recalculate:
-            self.ambiente.cotizacion.recalculate_totals()
+        # Redondeo a centavos aquí (no en la BD) para que los deltas de totales sean exactos
+        self.precio_total = Decimal(subtotal - descuento).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
 
     def generar_descripcion(self):
         """
@@ -281,3 +436,40 @@ class CotizacionItem(BaseModel):
         ordering = ['numero_item']
         # El numero_item debe ser único dentro de cada AMBIENTE, no dentro de toda la Cotización
         unique_together = ['ambiente', 'numero_item']
+
+# -----------------------------------------------------------------------------
+# 4. REVISIONES (HISTORIAL DE EDICIONES)
+# -----------------------------------------------------------------------------
+
+
+class CotizacionRevision(BaseModel):
+    """
+    Revisión de una cotización guardada en cada edición.
+
+    Para no duplicar el árbol completo en cada guardado, `datos` contiene el
+    delta JSON respecto de la revisión anterior; cada N revisiones se guarda
+    un checkpoint (foto completa) que acota el costo de reconstrucción.
+    Ver cotizaciones/revisiones.py.
+    """
+    cotizacion = models.ForeignKey(
+        Cotizacion,
+        on_delete=models.CASCADE,
+        related_name='revisiones',
+        verbose_name="Cotización"
+    )
+    numero = models.PositiveIntegerField(verbose_name="Número de Revisión")
+    es_checkpoint = models.BooleanField(
+        default=False,
+        verbose_name="Checkpoint",
+        help_text="Si es True, 'datos' es la foto completa; si no, el delta contra la revisión anterior."
+    )
+    datos = models.JSONField(verbose_name="Foto o Delta (JSON)")
+
+    class Meta:
+        verbose_name = "Revisión de Cotización"
+        verbose_name_plural = "Revisiones de Cotización"
+        ordering = ['cotizacion', 'numero']
+        unique_together = ['cotizacion', 'numero']
+
+    def __str__(self):
+        return f"{self.cotizacion.numero} rev. {self.numero}"
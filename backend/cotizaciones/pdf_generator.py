@@ -3,15 +3,22 @@ from datetime import datetime
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm, mm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
+from django.db.models import Prefetch
 from django.utils import translation
 from django.utils.translation import get_language
 from django.conf import settings
+import functools
 import os
 import logging
 
+from common.pdf_assets import SharedImage, get_pdf_language, load_image, new_paragraph, parse_paragraph, stamp_form
+from common.pdf_cache import PDF_TEMPLATE_VERSION, build_cache_key, get_pdf_cache
+from common.pdf_tables import TableLayout
+from .models import Cotizacion, CotizacionAmbiente, CotizacionItem
+
 logger = logging.getLogger(__name__)
 
 # --- CONFIGURACIÓN DE COLORES Y FUENTES ---
@@ -26,6 +33,10 @@ HEADER_ACCENT = colors.HexColor("#8B4513")  # Marrón/café para acento
 FONT_MAIN = "Helvetica"
 FONT_BOLD = "Helvetica-Bold"
 
+# Logo del encabezado (se dibuja a LOGO_SIZE x LOGO_SIZE)
+LOGO_PATH = os.path.join(settings.BASE_DIR, 'cotizaciones', 'static', 'cotizaciones', 'images', 'Logo Cortinas.png')
+LOGO_SIZE = 2.5 * cm
+
 # --- DICCIONARIO DE TRADUCCIONES ---
 TRANSLATIONS = {
     'es': {
@@ -155,7 +166,242 @@ def get_translation(key, lang_code=None):
     return TRANSLATIONS[lang_code].get(key, TRANSLATIONS['es'].get(key, key))
 
 
-def add_page_number(canvas, doc, lang_code='es'):
+# --- REGISTRO DE RECURSOS ESTÁTICOS (una vez por proceso) ---
+@functools.lru_cache(maxsize=None)
+def get_pdf_styles():
+    """Estilos del PDF de cotización. Se construyen una vez por proceso."""
+    styles = getSampleStyleSheet()
+
+    style_normal = ParagraphStyle('Normal', parent=styles['Normal'], fontName=FONT_MAIN, fontSize=10, leading=11)  # Reducido de 12 a 11
+    style_bold = ParagraphStyle('Bold', parent=style_normal, fontName=FONT_BOLD)
+    style_small = ParagraphStyle('Small', parent=style_normal, fontSize=7.5, leading=9)
+
+    return {
+        'normal': style_normal,
+        'bold': style_bold,
+        'small': style_small,
+        'small_center': ParagraphStyle('SmallCenter', parent=style_small, alignment=TA_CENTER),  # Para datos centrados
+        'terms': ParagraphStyle('Terms', parent=style_normal, fontSize=8, leading=10, alignment=TA_JUSTIFY),
+        'tagline': ParagraphStyle('Tagline', parent=style_bold, fontSize=9, alignment=TA_LEFT, textColor=colors.white),
+        'quote_title': ParagraphStyle('QuoteTitle', parent=style_bold, fontSize=11, alignment=TA_RIGHT, textColor=colors.white),
+        'quote_number': ParagraphStyle('QuoteNum', parent=style_bold, fontSize=10, alignment=TA_RIGHT, textColor=colors.white),
+        'header_right': ParagraphStyle('DateRight', parent=style_normal, fontSize=9, alignment=TA_RIGHT, leading=10, textColor=colors.white),
+        'env_header': ParagraphStyle('EnvHeader', parent=style_bold, textColor=colors.white, fontSize=10),
+        'desc': ParagraphStyle('Desc', parent=style_small, fontSize=7, textColor=TEXT_GRAY),
+    }
+
+
+def get_logo():
+    """Logo decodificado y reducido a resolución de impresión (None si no existe)."""
+    return load_image(LOGO_PATH, LOGO_SIZE, LOGO_SIZE)
+
+
+@functools.lru_cache(maxsize=None)
+def get_static_blocks(lang_code):
+    """
+    Bloques de texto fijos ya parseados para un idioma: tagline, título,
+    encabezado de la tabla de ítems y términos y condiciones.
+    """
+    styles = get_pdf_styles()
+    return {
+        'tagline': parse_paragraph(f"<b>{get_translation('company_tagline', lang_code)}</b>", styles['tagline']),
+        'quote': parse_paragraph(f"<b>{get_translation('quote', lang_code)}</b>", styles['quote_title']),
+        'items_header': tuple(
+            get_translation(key, lang_code)
+            for key in ('item', 'code', 'description', 'qty', 'width', 'height', 'unit', 'qty_total', 'unit_price', 'total')
+        ),
+        'terms_title': parse_paragraph(f"<b>{get_translation('terms_title', lang_code)}</b>", styles['bold']),
+        'terms': tuple(parse_paragraph(term, styles['terms']) for term in get_translation('terms', lang_code)),
+    }
+
+
+# --- TABLA DE ÍTEMS ---
+# Comandos comunes a todas las filas. Las celdas de datos son Paragraphs con
+# su propio estilo, así que fuente y alineación solo afectan al encabezado.
+ITEMS_TABLE_BASE = (
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('FONTNAME', (0, 0), (-1, -1), FONT_BOLD),
+    ('FONTSIZE', (0, 0), (-1, -1), 7.5),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),  # ITEM y datos numéricos al centro
+    ('ALIGN', (1, 0), (2, -1), 'LEFT'),     # CÓDIGO y DESCRIPCIÓN a la izquierda
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+)
+
+# Comandos por tipo de fila: (nombre, columna_inicio, columna_fin, *args)
+ITEMS_ROW_STYLES = {
+    'header': [
+        ('BACKGROUND', 0, -1, ROW_GRAY),
+        ('TOPPADDING', 0, -1, 5),
+        ('BOTTOMPADDING', 0, -1, 5),
+    ],
+    'desc': [
+        ('SPAN', 0, 9),
+        ('TOPPADDING', 0, -1, 0),
+        ('BOTTOMPADDING', 0, -1, 8),
+    ],
+    'subtotal': [
+        ('BACKGROUND', 0, -1, ROW_GRAY),
+        ('SPAN', 0, 8),
+        ('VALIGN', 0, -1, 'BOTTOM'),
+        ('TOPPADDING', 0, -1, 5),
+        ('BOTTOMPADDING', 0, -1, 5),
+    ],
+}
+
+
+def get_items_table_layout():
+    """Motor de tabla para los ítems de un ambiente (ver common.pdf_tables)."""
+    return TableLayout(base=ITEMS_TABLE_BASE, row_styles=ITEMS_ROW_STYLES)
+
+
+def get_items_col_widths(available_width):
+    # --- ANCHOS DE COLUMNA (Total 100%) ---
+    return [
+        available_width * 0.05,  # ITEM
+        available_width * 0.13,  # CÓDIGO
+        available_width * 0.29,  # DESCRIPCIÓN
+        available_width * 0.06,  # CANT
+        available_width * 0.08,  # ANCHO
+        available_width * 0.08,  # ALTO
+        available_width * 0.05,  # UN
+        available_width * 0.09,  # Q. TOTAL
+        available_width * 0.09,  # V.UNIT
+        available_width * 0.08,  # TOTAL
+    ]
+
+
+def use_dense_layout(num_items):
+    """
+    Indica si una cotización se genera en modo denso (un encabezado por
+    ambiente en lugar de uno por ítem) según PDF_DENSE_MIN_ITEMS.
+    0 desactiva el modo denso automático.
+    """
+    threshold = settings.PDF_DENSE_MIN_ITEMS
+    return bool(threshold) and num_items >= threshold
+
+
+def warm_pdf_assets():
+    """Precarga estilos, logo y bloques de todos los idiomas (al iniciar un worker)."""
+    get_pdf_styles()
+    get_logo()
+    for lang_code in TRANSLATIONS:
+        get_static_blocks(lang_code)
+
+
+# --- PLAN DE CONSULTAS DEL PDF ---
+# Columnas que el PDF lee de cada ítem y de su producto. El resto se difiere.
+PDF_ITEM_FIELDS = (
+    'id', 'ambiente', 'producto', 'numero_item', 'cantidad', 'ancho', 'alto',
+    'precio_unitario', 'precio_total', 'descripcion_tecnica',
+    'producto__codigo', 'producto__nombre', 'producto__unidad_medida',
+)
+
+
+def prefetch_cotizacion_pdf(queryset=None):
+    """
+    Aplica al queryset el plan de carga del árbol completo del documento.
+
+    Independientemente del tamaño de la cotización se ejecutan 3 consultas:
+    encabezado (+ cliente y vendedor), ambientes ordenados por `orden` e
+    ítems ordenados por `numero_item` con las columnas del producto.
+    El resultado queda en `cotizacion.pdf_ambientes` y `ambiente.pdf_items`.
+    """
+    if queryset is None:
+        queryset = Cotizacion.objects.all()
+
+    items_qs = (
+        CotizacionItem.objects
+        .select_related('producto')
+        .only(*PDF_ITEM_FIELDS)
+        .order_by('numero_item')
+    )
+
+    return queryset.select_related('cliente', 'vendedor').prefetch_related(
+        Prefetch(
+            'ambientes',
+            queryset=CotizacionAmbiente.objects.order_by('orden'),
+            to_attr='pdf_ambientes'
+        ),
+        Prefetch('pdf_ambientes__items', queryset=items_qs, to_attr='pdf_items'),
+    )
+
+
+def _load_cotizacion_for_pdf(cotizacion):
+    """Devuelve la cotización con el plan de carga del PDF aplicado."""
+    if hasattr(cotizacion, 'pdf_ambientes'):
+        return cotizacion
+    return prefetch_cotizacion_pdf(Cotizacion.objects.filter(pk=cotizacion.pk)).get()
+
+
+# --- CACHÉ DE PDFs RENDERIZADOS ---
+def get_cotizacion_pdf_fingerprint(cotizacion, language):
+    """
+    Huella del documento para la caché de PDFs.
+
+    Combina la versión del encabezado (updated_at, que `recalculate_totals`
+    actualiza), cliente y vendedor, y en una sola consulta los ambientes con
+    la versión de cada ítem y de su producto. Cualquier guardado de un ítem o
+    cambio de ambientes produce una huella distinta.
+    """
+    tree = list(
+        CotizacionAmbiente.objects
+        .filter(cotizacion_id=cotizacion.pk)
+        .order_by('pk', 'items__pk')
+        .values_list(
+            'pk', 'nombre', 'orden',
+            'items__pk', 'items__updated_at', 'items__producto__updated_at'
+        )
+    )
+    cliente = cotizacion.cliente
+    vendedor = cotizacion.vendedor
+
+    return build_cache_key(
+        'cotizacion',
+        PDF_TEMPLATE_VERSION,
+        language,
+        cotizacion.pk,
+        cotizacion.updated_at.isoformat(),
+        cliente.updated_at.isoformat() if cliente else None,
+        vendedor.updated_at.isoformat() if vendedor else None,
+        settings.PDF_DENSE_MIN_ITEMS,  # el modo denso depende del nº de ítems del árbol
+        tree,
+    )
+
+
+def open_cotizacion_pdf(cotizacion, request=None, language=None):
+    """
+    Retorna el PDF de la cotización como archivo abierto (modo binario),
+    sirviéndolo desde la caché en disco cuando el documento no cambió.
+    """
+    language = language or get_pdf_language(request)
+    key = get_cotizacion_pdf_fingerprint(cotizacion, language)
+    return get_pdf_cache().get_or_render(
+        key, lambda: generate_cotizacion_pdf(cotizacion, language=language)
+    )
+
+
+def render_cotizacion_to_cache(cotizacion_id, language):
+    """
+    Genera (si hace falta) el PDF de la cotización en la caché.
+    Usado por la cola de render en segundo plano (common.pdf_jobs).
+    Retorna (clave_cache, nombre_archivo).
+    """
+    cotizacion = prefetch_cotizacion_pdf(Cotizacion.objects.filter(pk=cotizacion_id)).get()
+    key = get_cotizacion_pdf_fingerprint(cotizacion, language)
+    get_pdf_cache().ensure(key, lambda: generate_cotizacion_pdf(cotizacion, language=language))
+    return key, f"Cotizacion_{cotizacion.numero}.pdf"
+
+
+# Nombre del form XObject con el encabezado/pie estático de la cotización
+CHROME_FORM_NAME = 'CotizacionChrome'
+
+
+def draw_page_chrome(canvas):
+    """
+    Dibuja el encabezado y pie estáticos (formas diagonales e información de
+    contacto). Se captura una vez por documento como form XObject.
+    """
     canvas.saveState()
     
     # Diseño del encabezado con forma diagonal
@@ -233,6 +479,17 @@ def add_page_number(canvas, doc, lang_code='es'):
     x_start += 8*cm
     canvas.drawString(x_start, y_position_line2, "San Paulo - Brasil")
     
+    canvas.restoreState()
+
+
+def add_page_number(canvas, doc, lang_code='es'):
+    # Encabezado/pie estático: se dibuja en la primera página y se reutiliza
+    stamp_form(canvas, CHROME_FORM_NAME, draw_page_chrome)
+
+    canvas.saveState()
+    canvas.setFillColor(colors.white)
+    canvas.setFont(FONT_MAIN, 8.5)
+
     # Número de página en la esquina derecha
     page_num = canvas.getPageNumber()
     total_pages = doc.page
@@ -242,11 +499,18 @@ def add_page_number(canvas, doc, lang_code='es'):
     canvas.restoreState()
 
 
-def generate_cotizacion_pdf(cotizacion, request=None):
-    user_language = 'es'
-    if request and hasattr(request, 'user') and request.user.is_authenticated:
-        user_language = getattr(request.user, 'language', 'es') or 'es'
-    
+def generate_cotizacion_pdf(cotizacion, request=None, language=None, dense=None):
+    """
+    Genera el PDF de la cotización y lo retorna en un BytesIO.
+    `dense` fuerza el modo denso (un encabezado por ambiente); por defecto
+    se decide con PDF_DENSE_MIN_ITEMS según el número de ítems.
+    """
+    user_language = language or get_pdf_language(request)
+    
+    cotizacion = _load_cotizacion_for_pdf(cotizacion)
+    if dense is None:
+        dense = use_dense_layout(sum(len(ambiente.pdf_items) for ambiente in cotizacion.pdf_ambientes))
+
     old_language = get_language()
     translation.activate(user_language)
     
@@ -270,31 +534,27 @@ def generate_cotizacion_pdf(cotizacion, request=None):
     )
     
     story = []
-    styles = getSampleStyleSheet()
-    
-    style_normal = ParagraphStyle('Normal', parent=styles['Normal'], fontName=FONT_MAIN, fontSize=10, leading=11)  # Reducido de 12 a 11
-    style_bold = ParagraphStyle('Bold', parent=style_normal, fontName=FONT_BOLD)
-    style_small = ParagraphStyle('Small', parent=style_normal, fontSize=7.5, leading=9)
-    style_small_center = ParagraphStyle('SmallCenter', parent=style_small, alignment=TA_CENTER)  # Para datos centrados
-    style_terms = ParagraphStyle('Terms', parent=style_normal, fontSize=8, leading=10, alignment=TA_JUSTIFY)
+
+    # Estilos, logo y textos fijos vienen del registro del proceso
+    styles = get_pdf_styles()
+    blocks = get_static_blocks(user_language)
+    style_normal = styles['normal']
+    style_bold = styles['bold']
+    style_small = styles['small']
+    style_small_center = styles['small_center']
     
     # --- HEADER ---
-    logo_path = os.path.join(settings.BASE_DIR, 'cotizaciones', 'static', 'cotizaciones', 'images', 'Logo Cortinas.png')
+    logo_reader = get_logo()
     
     # Logo y texto del tagline lado a lado
     left_content = []
-    if os.path.exists(logo_path):
+    tagline = new_paragraph(blocks['tagline'], styles['tagline'])
+    if logo_reader is not None:
         # Logo circular
-        logo = Image(logo_path, width=2.5*cm, height=2.5*cm, mask='auto')
-        
-        # Texto a la derecha del logo
-        tagline = Paragraph(
-            f"<b>{get_translation('company_tagline', user_language)}</b>", 
-            ParagraphStyle('Tagline', parent=style_bold, fontSize=9, alignment=TA_LEFT, textColor=colors.white)
-        )
+        logo = SharedImage(logo_reader, width=LOGO_SIZE, height=LOGO_SIZE, mask='auto')
         
         # Crear tabla interna para logo y tagline lado a lado
-        logo_table = Table([[logo, tagline]], colWidths=[2.5*cm, 5*cm])
+        logo_table = Table([[logo, tagline]], colWidths=[LOGO_SIZE, 5*cm])
         logo_table.setStyle(TableStyle([
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
             ('ALIGN', (0, 0), (0, 0), 'LEFT'),
@@ -302,27 +562,17 @@ def generate_cotizacion_pdf(cotizacion, request=None):
         ]))
         left_content.append(logo_table)
     else:
-        tagline = Paragraph(
-            f"<b>{get_translation('company_tagline', user_language)}</b>", 
-            ParagraphStyle('Tagline', parent=style_bold, fontSize=9, alignment=TA_LEFT, textColor=colors.white)
-        )
         left_content.append(tagline)
     
     # Columna derecha: Reorganizada según orden solicitado
     right_content = []
     
     # 1. COTIZACIÓN (título)
-    quote_title = Paragraph(
-        f"<b>{get_translation('quote', user_language)}</b>",
-        ParagraphStyle('QuoteTitle', parent=style_bold, fontSize=11, alignment=TA_RIGHT, textColor=colors.white)
-    )
+    quote_title = new_paragraph(blocks['quote'], styles['quote_title'])
     right_content.append(quote_title)
     
     # 2. Número (COT-0000012)
-    quote_number = Paragraph(
-        f"<b>{cotizacion.numero}</b>",
-        ParagraphStyle('QuoteNum', parent=style_bold, fontSize=10, alignment=TA_RIGHT, textColor=colors.white)
-    )
+    quote_number = Paragraph(f"<b>{cotizacion.numero}</b>", styles['quote_number'])
     right_content.append(quote_number)
     
     # 3. Página X / Y (se calcula en el footer, aquí podemos omitirlo o dejarlo en blanco)
@@ -330,11 +580,11 @@ def generate_cotizacion_pdf(cotizacion, request=None):
     
     # 4. Fecha de emisión
     date_text = f"{get_translation('date', user_language)}: {cotizacion.fecha_emision.strftime('%d/%m/%Y')}"
-    right_content.append(Paragraph(date_text, ParagraphStyle('DateRight', parent=style_normal, fontSize=9, alignment=TA_RIGHT, leading=10, textColor=colors.white)))
+    right_content.append(Paragraph(date_text, styles['header_right']))
     
     # 5. Fecha de validez
     valid_until_text = f"{get_translation('valid_until', user_language)}: {cotizacion.fecha_validez.strftime('%d/%m/%Y')}"
-    right_content.append(Paragraph(valid_until_text, ParagraphStyle('ValidRight', parent=style_normal, fontSize=9, alignment=TA_RIGHT, leading=10, textColor=colors.white)))
+    right_content.append(Paragraph(valid_until_text, styles['header_right']))
     
     header_table = Table([[left_content, right_content]], colWidths=[available_width * 0.5, available_width * 0.5])
     header_table.setStyle(TableStyle([('VALIGN', (0, 0), (-1, -1), 'TOP'), ('ALIGN', (0, 0), (0, 0), 'LEFT'), ('ALIGN', (1, 0), (1, 0), 'RIGHT')]))
@@ -355,8 +605,8 @@ def generate_cotizacion_pdf(cotizacion, request=None):
     story.append(Spacer(1, 0.3*cm))
     
     # --- AMBIENTES ---
-    for ambiente in cotizacion.ambientes.all():
-        ambiente_header = Paragraph(f"<b>{get_translation('environment', user_language)}: {ambiente.nombre.upper()}</b>", ParagraphStyle('EnvHeader', parent=style_bold, textColor=colors.white, fontSize=10))
+    for ambiente in cotizacion.pdf_ambientes:
+        ambiente_header = Paragraph(f"<b>{get_translation('environment', user_language)}: {ambiente.nombre.upper()}</b>", styles['env_header'])
         env_table = Table([[ambiente_header]], colWidths=[available_width])
         env_table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, -1), HEADER_GRAY),
@@ -369,39 +619,21 @@ def generate_cotizacion_pdf(cotizacion, request=None):
         ]))
         story.append(env_table)
         
-        table_data = []
-        table_styles = []
-        
-        header_row = [
-            f"{get_translation('item', user_language)}",
-            f"{get_translation('code', user_language)}",
-            f"{get_translation('description', user_language)}",
-            f"{get_translation('qty', user_language)}",
-            f"{get_translation('width', user_language)}",
-            f"{get_translation('height', user_language)}",
-            f"{get_translation('unit', user_language)}",
-            f"{get_translation('qty_total', user_language)}",
-            f"{get_translation('unit_price', user_language)}",
-            f"{get_translation('total', user_language)}",
-        ]
+        layout = get_items_table_layout()
+        header_row = list(blocks['items_header'])
 
         ambiente_subtotal = 0
+
+        if dense:
+            # Modo denso: un único encabezado por ambiente (se repite al cortar página)
+            layout.add_row('header', header_row)
         
-        for i, item in enumerate(ambiente.items.all()):
-            # 1. ENCABEZADO REPETIDO
-            table_data.append(header_row)
-            header_idx = len(table_data) - 1
-            table_styles.extend([
-                ('BACKGROUND', (0, header_idx), (-1, header_idx), ROW_GRAY),
-                ('TEXTCOLOR', (0, header_idx), (-1, header_idx), colors.black),
-                ('ALIGN', (0, header_idx), (0, header_idx), 'CENTER'),  # ITEM centrado
-                ('ALIGN', (1, header_idx), (2, header_idx), 'LEFT'),    # CÓDIGO y DESCRIPCIÓN a la izquierda
-                ('ALIGN', (3, header_idx), (9, header_idx), 'CENTER'),  # Resto centrado
-                ('FONTNAME', (0, header_idx), (-1, header_idx), FONT_BOLD),
-                ('FONTSIZE', (0, header_idx), (-1, header_idx), 7.5),
-                ('TOPPADDING', (0, header_idx), (-1, header_idx), 5),
-                ('BOTTOMPADDING', (0, header_idx), (-1, header_idx), 5),
-            ])
+        for item in ambiente.pdf_items:
+            layout.start_group()
+
+            # 1. ENCABEZADO REPETIDO (modo estándar)
+            if not dense:
+                layout.add_row('header', header_row)
 
             # DATA PREP
             producto_codigo = item.producto.codigo if item.producto else ''
@@ -409,7 +641,7 @@ def generate_cotizacion_pdf(cotizacion, request=None):
             unidad_medida = item.producto.unidad_medida if item.producto else 'PC'
             
             # 2. DATOS
-            item_row = [
+            layout.add_row('data', [
                 Paragraph(f"{item.numero_item:02d}", style_small_center),
                 Paragraph(producto_codigo, style_small_center),
                 Paragraph(producto_nombre, style_small),
@@ -420,79 +652,25 @@ def generate_cotizacion_pdf(cotizacion, request=None):
                 Paragraph(str(int(float(item.cantidad))), style_small_center),
                 Paragraph(f"{float(item.precio_unitario):.2f}", style_small_center),
                 Paragraph(f"<b>{float(item.precio_total):.2f}</b>", style_small_center),
-            ]
-            table_data.append(item_row)
-            data_idx = len(table_data) - 1
-            
-            # 3. ALINEACIONES (Ajuste Solicitado)
-            # - Descripcion (2): Izquierda
-            # - ITEM, CÓDIGO y todo lo numérico (0, 1, 3-9): CENTRO
-            table_styles.extend([
-                ('ALIGN', (0, data_idx), (1, data_idx), 'CENTER'), # Item y Código al centro
-                ('ALIGN', (2, data_idx), (2, data_idx), 'LEFT'),   # Solo Descripción a la izquierda
-                ('ALIGN', (3, data_idx), (9, data_idx), 'CENTER'), # Todos los datos numéricos al CENTRO
-                ('VALIGN', (0, data_idx), (-1, data_idx), 'TOP'),
-                ('FONTSIZE', (0, data_idx), (-1, data_idx), 7.5),
-                ('TOPPADDING', (0, data_idx), (-1, data_idx), 3),
-                ('BOTTOMPADDING', (0, data_idx), (-1, data_idx), 3),
             ])
             
-            # 4. DESCRIPCIÓN TÉCNICA
+            # 3. DESCRIPCIÓN TÉCNICA
             desc_text = item.descripcion_completa if hasattr(item, 'descripcion_completa') else (item.descripcion_tecnica if hasattr(item, 'descripcion_tecnica') else "")
-            desc_row = [Paragraph(desc_text, ParagraphStyle('Desc', parent=style_small, fontSize=7, textColor=TEXT_GRAY))]
-            desc_row.extend([''] * 9)
-            table_data.append(desc_row)
-            desc_idx = len(table_data) - 1
-            table_styles.extend([
-                ('SPAN', (0, desc_idx), (9, desc_idx)),
-                ('VALIGN', (0, desc_idx), (-1, desc_idx), 'TOP'),
-                ('ALIGN', (0, desc_idx), (0, desc_idx), 'LEFT'),
-                ('TOPPADDING', (0, desc_idx), (-1, desc_idx), 0),
-                ('BOTTOMPADDING', (0, desc_idx), (-1, desc_idx), 8),
-            ])
+            layout.add_row('desc', [Paragraph(desc_text, styles['desc'])] + [''] * 9)
             
             ambiente_subtotal += float(item.precio_total)
         
-        # 5. SUBTOTAL
+        # 4. SUBTOTAL
         subtotal_label = f"<b>{get_translation('subtotal', user_language)} - {ambiente.nombre}</b>"
-        subtotal_row = [
+        layout.add_row('subtotal', [
             Paragraph(subtotal_label, style_bold),
             '', '', '', '', '', '', '', '',
             Paragraph(f"<b>{ambiente_subtotal:.2f}</b>", style_bold)
-        ]
-        table_data.append(subtotal_row)
-        subtotal_idx = len(table_data) - 1
-        table_styles.extend([
-            ('BACKGROUND', (0, subtotal_idx), (-1, subtotal_idx), ROW_GRAY),
-            ('SPAN', (0, subtotal_idx), (8, subtotal_idx)),
-            ('ALIGN', (0, subtotal_idx), (8, subtotal_idx), 'LEFT'),
-            ('ALIGN', (9, subtotal_idx), (9, subtotal_idx), 'RIGHT'),
-            ('TOPPADDING', (0, subtotal_idx), (-1, subtotal_idx), 5),
-            ('BOTTOMPADDING', (0, subtotal_idx), (-1, subtotal_idx), 5),
         ])
         
-        # --- ANCHOS DE COLUMNA RECALCULADOS (Total 100%) ---
-        # ITEM: Aumentado de 0.04 a 0.05
-        # Q.TOTAL: Aumentado de 0.08 a 0.09
-        # TOTAL: Disminuido de 0.09 a 0.08
-        # DESCRIPCIÓN: Ajuste de 0.30 a 0.29 para cuadrar suma
-        col_widths = [
-            available_width * 0.05,  # ITEM (+1%)
-            available_width * 0.13,  # CÓDIGO
-            available_width * 0.29,  # DESCRIPCIÓN (Ajuste fino)
-            available_width * 0.06,  # CANT
-            available_width * 0.08,  # ANCHO
-            available_width * 0.08,  # ALTO
-            available_width * 0.05,  # UN
-            available_width * 0.09,  # Q. TOTAL (+1%)
-            available_width * 0.09,  # V.UNIT
-            available_width * 0.08,  # TOTAL (-1%)
-        ]
-        
-        items_table = Table(table_data, colWidths=col_widths)
-        items_table.setStyle(TableStyle(table_styles))
-        
-        story.append(items_table)
+        story.extend(layout.build_chunks(
+            colWidths=get_items_col_widths(available_width), repeatRows=1 if dense else 0
+        ))
         story.append(Spacer(1, 0.2*cm))  # Reducido de 0.5cm a 0.2cm
     
     # --- TOTALES FINALES ---
@@ -520,11 +698,11 @@ def generate_cotizacion_pdf(cotizacion, request=None):
     story.append(totals_table)
     story.append(Spacer(1, 1*cm))
     
-    terms_title = Paragraph(f"<b>{get_translation('terms_title', user_language)}</b>", style_bold)
+    terms_title = new_paragraph(blocks['terms_title'], style_bold)
     story.append(terms_title)
     story.append(Spacer(1, 0.2*cm))
-    for term in get_translation('terms', user_language):
-        story.append(Paragraph(term, style_terms))
+    for term_frags in blocks['terms']:
+        story.append(new_paragraph(term_frags, styles['terms']))
         story.append(Spacer(1, 0.1*cm))
     
     doc.build(story, onFirstPage=lambda c, d: add_page_number(c, d, user_language), onLaterPages=lambda c, d: add_page_number(c, d, user_language))
@@ -0,0 +1,190 @@
+"""
+Historial de revisiones de cotizaciones almacenado como deltas.
+
+Cada guardado registra una `CotizacionRevision` con el delta JSON contra la
+revisión anterior. Cada `COTIZACION_REVISION_CHECKPOINT` revisiones se
+guarda en cambio la foto completa (checkpoint), de modo que reconstruir
+cualquier revisión cuesta una consulta y, como máximo, N - 1 deltas.
+
+Formato de la foto:
+    {
+        "encabezado": {"cliente": 3, "descuento_total": "0.00", ...},
+        "ambientes": {
+            "<id>": {"nombre": "Sala", "orden": 1,
+                     "items": {"<id>": {"producto": 7, "cantidad": "2.00", ...}}}
+        }
+    }
+
+Los ambientes e ítems se indexan por id, así editar un ítem produce un
+delta con solo ese ítem y sus campos modificados.
+
+Formato del delta, en cada nivel:
+    {"valores": {clave: valor nuevo}, "anidados": {clave: delta},
+     "eliminadas": [clave, ...]}
+(solo las partes no vacías). Las claves de la foto nunca se mezclan con las
+del formato, así un JSON libre (atributos_seleccionados) puede tener
+cualquier clave.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Subquery
+
+from .models import Cotizacion, CotizacionItem, CotizacionRevision
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_ENCABEZADO = ['cliente_id', 'vendedor_id', 'fecha_validez', 'descuento_total', 'total_neto', 'total_general']
+CAMPOS_ITEM = [
+    'producto_id', 'numero_item', 'cantidad', 'ancho', 'alto', 'atributos_seleccionados',
+    'descripcion_tecnica', 'precio_unitario', 'porcentaje_descuento', 'precio_total',
+]
+
+
+def _valor_json(valor):
+    """Decimal y fechas como texto (misma representación que la API)"""
+    if valor is None or isinstance(valor, (bool, int, str, dict, list)):
+        return valor
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _campos(valores):
+    return {campo.removesuffix('_id'): _valor_json(valor) for campo, valor in valores.items()}
+
+
+def foto_cotizacion(cotizacion):
+    """
+    Foto completa (JSON) del encabezado, ambientes e ítems, leída de la base
+    de datos (no de la instancia en memoria, que puede tener tipos sin
+    normalizar). Tres consultas: encabezado, ambientes e ítems.
+    """
+    encabezado = Cotizacion.objects.filter(pk=cotizacion.pk).values(*CAMPOS_ENCABEZADO).get()
+    ambientes = {
+        str(ambiente.id): {'nombre': ambiente.nombre, 'orden': ambiente.orden, 'items': {}}
+        for ambiente in cotizacion.ambientes.all().order_by('orden')
+    }
+    items = CotizacionItem.objects.filter(
+        ambiente__cotizacion=cotizacion
+    ).order_by('ambiente_id', 'numero_item').values('id', 'ambiente_id', *CAMPOS_ITEM)
+    for item in items:
+        ambiente_id, item_id = item.pop('ambiente_id'), item.pop('id')
+        ambientes[str(ambiente_id)]['items'][str(item_id)] = _campos(item)
+
+    return {'encabezado': _campos(encabezado), 'ambientes': ambientes}
+
+
+def calcular_delta(antes, despues):
+    """
+    Delta que transforma `antes` en `despues` (ambos dicts).
+
+    Returns:
+        dict: Vacío si no hay cambios
+    """
+    valores, anidados = {}, {}
+    for clave, valor in despues.items():
+        if clave not in antes:
+            valores[clave] = valor
+        elif isinstance(valor, dict) and isinstance(antes[clave], dict):
+            sub = calcular_delta(antes[clave], valor)
+            if sub:
+                anidados[clave] = sub
+        elif antes[clave] != valor:
+            valores[clave] = valor
+
+    delta = {}
+    if valores:
+        delta['valores'] = valores
+    if anidados:
+        delta['anidados'] = anidados
+    eliminadas = [clave for clave in antes if clave not in despues]
+    if eliminadas:
+        delta['eliminadas'] = eliminadas
+    return delta
+
+
+def aplicar_delta(foto, delta):
+    """
+    Aplica un delta de `calcular_delta` sobre una foto (retorna una nueva,
+    sin modificar la original).
+    """
+    resultado = dict(foto)
+    for clave in delta.get('eliminadas', []):
+        resultado.pop(clave, None)
+    resultado.update(delta.get('valores', {}))
+    for clave, sub in delta.get('anidados', {}).items():
+        resultado[clave] = aplicar_delta(resultado[clave], sub)
+    return resultado
+
+
+class RevisionService:
+    """Registro y reconstrucción de revisiones de cotizaciones"""
+
+    @staticmethod
+    def reconstruir(cotizacion, numero=None):
+        """
+        Reconstruye la foto de una revisión: parte del checkpoint más cercano
+        hacia atrás y aplica los deltas siguientes, con UNA sola consulta.
+
+        Args:
+            cotizacion: Cotizacion (o su pk)
+            numero: Número de revisión (por defecto la última)
+
+        Returns:
+            tuple: (CotizacionRevision, foto) o (None, None) si no existe
+        """
+        revisiones = CotizacionRevision.objects.filter(cotizacion=cotizacion)
+        if numero is not None:
+            revisiones = revisiones.filter(numero__lte=numero)
+
+        checkpoint = revisiones.filter(es_checkpoint=True).order_by('-numero').values('numero')[:1]
+        cadena = list(revisiones.filter(numero__gte=Subquery(checkpoint)).order_by('numero'))
+
+        if not cadena or (numero is not None and cadena[-1].numero != numero):
+            return None, None
+
+        foto = cadena[0].datos
+        for revision in cadena[1:]:
+            foto = aplicar_delta(foto, revision.datos)
+        return cadena[-1], foto
+
+    @staticmethod
+    def registrar(cotizacion, usuario=None):
+        """
+        Registra el estado actual de la cotización como nueva revisión (delta
+        contra la anterior, o foto completa si toca checkpoint). No registra
+        nada si no hubo cambios. Debe llamarse dentro de la transacción del
+        guardado: la fila de la cotización queda bloqueada hasta el commit,
+        así dos guardados simultáneos no calculan el mismo número.
+
+        Returns:
+            CotizacionRevision o None si no hubo cambios
+        """
+        with transaction.atomic():
+            Cotizacion.objects.select_for_update().filter(pk=cotizacion.pk).values_list('pk', flat=True).get()
+            foto = foto_cotizacion(cotizacion)
+            anterior, foto_anterior = RevisionService.reconstruir(cotizacion)
+
+            if anterior is None:
+                numero, datos, es_checkpoint = 1, foto, True
+            else:
+                delta = calcular_delta(foto_anterior, foto)
+                if not delta:
+                    return None
+                numero = anterior.numero + 1
+                cada = max(settings.COTIZACION_REVISION_CHECKPOINT, 1)
+                es_checkpoint = (numero - 1) % cada == 0
+                datos = foto if es_checkpoint else delta
+
+            revision = CotizacionRevision.objects.create(
+                cotizacion=cotizacion,
+                numero=numero,
+                es_checkpoint=es_checkpoint,
+                datos=datos,
+                usuario_creacion=usuario,
+            )
+            logger.debug(f"Cotización {cotizacion.numero}: revisión {numero} registrada (checkpoint={es_checkpoint})")
+            return revision
@@ -1,7 +1,9 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.db import transaction
-from .models import Cotizacion, CotizacionAmbiente, CotizacionItem
-from productos_servicios.models import ProductoServicio
+from .models import Cotizacion, CotizacionAmbiente, CotizacionItem, CotizacionRevision
+from .revisiones import RevisionService
+from .services import CotizacionService
 from manufactura.models import Manufactura
 from core.serializers import UserSerializer
 
@@ -20,9 +22,10 @@ class CotizacionItemSerializer(serializers.ModelSerializer):
     producto_nombre = serializers.CharField(
         source='producto.nombre', read_only=True)
 
-    # Campo para la escritura, permitiendo crear el Item con el ID del producto
-    producto_id = serializers.PrimaryKeyRelatedField(
-        queryset=ProductoServicio.objects.filter(is_active=True),
+    # Campo para la escritura, permitiendo crear el Item con el ID del producto.
+    # Aquí solo se valida el tipo: la instancia se resuelve en lote (una consulta
+    # para todo el payload) en CotizacionSerializer.validate
+    producto_id = serializers.IntegerField(
         source='producto',
         write_only=True
     )
@@ -30,6 +33,9 @@ class CotizacionItemSerializer(serializers.ModelSerializer):
     unidad_medida = serializers.CharField(
         source='producto.unidad_medida', read_only=True)
 
+    # Escribible para que el update identifique los ítems existentes (diff)
+    id = serializers.IntegerField(required=False)
+
     class Meta:
         model = CotizacionItem
         fields = [
@@ -55,11 +61,13 @@ class CotizacionAmbienteSerializer(serializers.ModelSerializer):
     # Relación de escritura: Un ambiente contiene una lista de items
     items = CotizacionItemSerializer(many=True)
 
+    # Escribible para que el update identifique los ambientes existentes (diff)
+    id = serializers.IntegerField(required=False)
+
     class Meta:
         model = CotizacionAmbiente
         fields = ['id', 'nombre', 'orden', 'items']
         # El orden puede ser gestionado en el create de la Cotización.
-        read_only_fields = ['id']
 
 # -----------------------------------------------------------------------------
 # 3. COTIZACION SERIALIZER (Nivel 1)
@@ -104,6 +112,44 @@ class CotizacionSerializer(serializers.ModelSerializer):
         read_only_fields = ['numero', 'total_neto', 'total_general', 'fecha_emision', 
                            'created_at', 'updated_at', 'usuario_creacion', 'usuario_creacion_detalle']
 
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs.get('ambientes'):
+            self._resolver_productos(attrs['ambientes'])
+        return attrs
+
+    def _resolver_productos(self, ambientes_data):
+        """
+        Reemplaza el id de producto de cada ítem por su instancia, cargando
+        todos los productos del payload con una sola consulta. Los ids
+        inexistentes, inactivos o eliminados se reportan en la ruta de su ítem.
+        """
+        productos = CotizacionService.resolver_productos(
+            item['producto']
+            for ambiente_data in ambientes_data
+            for item in ambiente_data.get('items', [])
+            if 'producto' in item
+        )
+
+        errores, hay_errores = [], False
+        for ambiente_data in ambientes_data:
+            errores_items = []
+            for item in ambiente_data.get('items', []):
+                if 'producto' not in item:
+                    errores_items.append({})
+                elif item['producto'] in productos:
+                    item['producto'] = productos[item['producto']]
+                    errores_items.append({})
+                else:
+                    errores_items.append({'producto_id': [
+                        f'El producto "{item["producto"]}" no existe o no está activo.'
+                    ]})
+                    hay_errores = True
+            errores.append({'items': errores_items} if any(errores_items) else {})
+
+        if hay_errores:
+            raise serializers.ValidationError({'ambientes': errores})
+
     def create(self, validated_data):
         # 1. Extraer los ambientes anidados
         ambientes_data = validated_data.pop('ambientes')
@@ -120,41 +166,18 @@ class CotizacionSerializer(serializers.ModelSerializer):
         with transaction.atomic():
             cotizacion = Cotizacion.objects.create(**validated_data)
 
-            # 4. Iterar sobre los ambientes
-            for i, ambiente_data in enumerate(ambientes_data):
-                items_data = ambiente_data.pop('items')
-
-                # Crear el ambiente y vincularlo a la cotización
-                ambiente = CotizacionAmbiente.objects.create(
-                    cotizacion=cotizacion,
-                    orden=i + 1,  # Asignamos orden secuencial
-                    **ambiente_data
-                )
-
-                # 5. Iterar sobre los items dentro del ambiente
-                for j, item_data in enumerate(items_data):
-                    producto_instance = item_data.pop('producto')
-                    # Extraer numero_item si viene en los datos (para evitar duplicación)
-                    numero_item = item_data.pop('numero_item', j + 1)
-
-                    # El precio base se toma como SNAPSHOT del catálogo
-                    precio_snapshot = producto_instance.precio_base
-
-                    # Crear el item con skip_recalculate=True para evitar múltiples saves
-                    item = CotizacionItem(
-                        ambiente=ambiente,
-                        producto=producto_instance,
-                        numero_item=numero_item,
-                        precio_unitario=precio_snapshot,  # Precio de lista como snapshot
-                        usuario_creacion=request.user if request and hasattr(request, 'user') else None,
-                        **item_data
-                    )
-                    item.save(skip_recalculate=True)
-
-            # 6. Recalcular totales UNA SOLA VEZ al final de la transacción
+            # 4. Crear ambientes e ítems con inserciones masivas: precio_total y
+            # descripcion_tecnica se calculan en memoria (precio del catálogo como snapshot)
+            usuario = request.user if request and hasattr(request, 'user') else None
+            CotizacionService.crear_ambientes_con_items(cotizacion, ambientes_data, usuario=usuario)
+
+            # 5. Recalcular totales UNA SOLA VEZ al final de la transacción
             # Esto garantiza atomicidad: todo se guarda o nada se guarda
             cotizacion.recalculate_totals()
 
+            # 6. Primera revisión del historial (foto completa)
+            RevisionService.registrar(cotizacion, usuario=usuario)
+
             return cotizacion
 
     def update(self, instance, validated_data):
@@ -176,111 +199,85 @@ class CotizacionSerializer(serializers.ModelSerializer):
                 setattr(instance, attr, value)
             instance.save()
             
-            # Si se enviaron ambientes, actualizar la estructura completa
+            # Si se enviaron ambientes, sincronizar la estructura completa por diff:
+            # solo se escriben las filas nuevas, modificadas o eliminadas
             if ambientes_data is not None:
-                # Obtener IDs de ambientes que vienen en el request
-                ambiente_ids_in_request = []
-                
-                for i, ambiente_data in enumerate(ambientes_data):
-                    items_data = ambiente_data.pop('items', [])
-                    ambiente_id = ambiente_data.pop('id', None)  # Extraer ID si existe
-                    ambiente_data.pop('orden', None)  # Remover orden si viene del frontend
-                    
-                    if ambiente_id:
-                        # Actualizar ambiente existente
-                        try:
-                            ambiente = CotizacionAmbiente.objects.get(
-                                id=ambiente_id, 
-                                cotizacion=instance
-                            )
-                            ambiente.nombre = ambiente_data.get('nombre', ambiente.nombre)
-                            ambiente.orden = i + 1
-                            ambiente.save()
-                            ambiente_ids_in_request.append(ambiente_id)
-                        except CotizacionAmbiente.DoesNotExist:
-                            # Si no existe, crear uno nuevo
-                            ambiente = CotizacionAmbiente.objects.create(
-                                cotizacion=instance,
-                                orden=i + 1,
-                                **ambiente_data
-                            )
-                            ambiente_ids_in_request.append(ambiente.id)
-                    else:
-                        # Crear nuevo ambiente
-                        ambiente = CotizacionAmbiente.objects.create(
-                            cotizacion=instance,
-                            orden=i + 1,
-                            **ambiente_data
-                        )
-                        ambiente_ids_in_request.append(ambiente.id)
-                    
-                    # Procesar items del ambiente
-                    item_ids_in_request = []
-                    for j, item_data in enumerate(items_data):
-                        producto_instance = item_data.pop('producto', None)
-                        item_id = item_data.pop('id', None)  # Extraer ID si existe
-                        item_data.pop('numero_item', None)  # Remover numero_item si viene del frontend
-                        
-                        if item_id:
-                            # Actualizar item existente
-                            try:
-                                item = CotizacionItem.objects.get(
-                                    id=item_id,
-                                    ambiente=ambiente
-                                )
-                                # Actualizar campos del item
-                                if producto_instance:
-                                    item.producto = producto_instance
-                                    item.precio_unitario = producto_instance.precio_base
-                                
-                                for field in ['cantidad', 'ancho', 'alto', 'porcentaje_descuento', 
-                                            'atributos_seleccionados']:
-                                    if field in item_data:
-                                        setattr(item, field, item_data[field])
-                                
-                                item.numero_item = j + 1
-                                item.save(skip_recalculate=True)
-                                item_ids_in_request.append(item_id)
-                            except CotizacionItem.DoesNotExist:
-                                # Si no existe, crear uno nuevo
-                                if not producto_instance:
-                                    continue
-                                item = CotizacionItem(
-                                    ambiente=ambiente,
-                                    producto=producto_instance,
-                                    numero_item=j + 1,
-                                    precio_unitario=producto_instance.precio_base,
-                                    usuario_creacion=request.user if request and hasattr(request, 'user') else None,
-                                    **item_data
-                                )
-                                item.save(skip_recalculate=True)
-                                item_ids_in_request.append(item.id)
-                        else:
-                            # Crear nuevo item
-                            if not producto_instance:
-                                continue
-                            item = CotizacionItem(
-                                ambiente=ambiente,
-                                producto=producto_instance,
-                                numero_item=j + 1,
-                                precio_unitario=producto_instance.precio_base,
-                                usuario_creacion=request.user if request and hasattr(request, 'user') else None,
-                                **item_data
-                            )
-                            item.save(skip_recalculate=True)
-                            item_ids_in_request.append(item.id)
-                    
-                    # Eliminar items que no están en el request
-                    CotizacionItem.objects.filter(
-                        ambiente=ambiente
-                    ).exclude(id__in=item_ids_in_request).delete()
-                
-                # Eliminar ambientes que no están en el request
-                CotizacionAmbiente.objects.filter(
-                    cotizacion=instance
-                ).exclude(id__in=ambiente_ids_in_request).delete()
-            
+                usuario = request.user if request and hasattr(request, 'user') else None
+                CotizacionService.actualizar_ambientes_con_items(instance, ambientes_data, usuario=usuario)
+
             # Recalcular totales después de actualizar
             instance.recalculate_totals()
 
+            # Registrar la revisión (delta contra la anterior) en la misma transacción
+            RevisionService.registrar(instance, usuario=validated_data.get('usuario_modificacion'))
+
         return instance
+
+
+# -----------------------------------------------------------------------------
+# 4. LISTADO (solo encabezado)
+# -----------------------------------------------------------------------------
+
+
+class CotizacionListSerializer(serializers.ModelSerializer):
+    """
+    Representación liviana para el listado: encabezado, nombres de cliente y
+    vendedor, totales y cantidad de ítems. No incluye el árbol de ambientes
+    e ítems (eso queda para el detalle).
+
+    `total_items` viene anotado en SQL por el queryset del listado.
+    """
+
+    cliente_nombre = serializers.CharField(
+        source='cliente.nombre', read_only=True)
+    vendedor_nombre = serializers.CharField(
+        source='vendedor.nombre', read_only=True, allow_null=True)
+    estado_display = serializers.CharField(
+        source='get_estado_display', read_only=True)
+    total_items = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Cotizacion
+        fields = [
+            'id', 'numero', 'cliente', 'cliente_nombre', 'vendedor_nombre',
+            'fecha_emision', 'fecha_validez', 'estado', 'estado_display',
+            'total_neto', 'descuento_total', 'total_general', 'total_items',
+            'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+
+# -----------------------------------------------------------------------------
+# 5. REVISIONES
+# -----------------------------------------------------------------------------
+
+
+class CotizacionRevisionSerializer(serializers.ModelSerializer):
+    """Metadatos de una revisión (sin la foto ni el delta)"""
+
+    usuario_creacion_detalle = UserSerializer(
+        source='usuario_creacion', read_only=True)
+
+    class Meta:
+        model = CotizacionRevision
+        fields = ['numero', 'es_checkpoint', 'created_at', 'usuario_creacion', 'usuario_creacion_detalle']
+        read_only_fields = fields
+
+
+# -----------------------------------------------------------------------------
+# 6. CLONAR EN LOTE
+# -----------------------------------------------------------------------------
+
+
+class ClonarLoteSerializer(serializers.Serializer):
+    """Payload de clonar-lote: { "clientes": [id, id, ...] }"""
+
+    clientes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+    def validate_clientes(self, value):
+        # El máximo se lee al validar (configurable por entorno)
+        if len(value) > settings.COTIZACION_CLONAR_LOTE_MAX:
+            raise serializers.ValidationError(
+                f"Máximo {settings.COTIZACION_CLONAR_LOTE_MAX} clientes por lote.")
+        return value
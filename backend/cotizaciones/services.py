@@ -0,0 +1,473 @@
+"""
+Servicios de lógica de negocio para cotizaciones.
+
+Este módulo contiene la lógica de negocio reutilizable, separada de los
+serializers y views.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
+
+from common.models import TablaCorrelativos
+from pedidos_servicio.services import ConversionCotizacionService
+from productos_servicios.models import ProductoServicio
+from .models import Cotizacion, CotizacionAmbiente, CotizacionItem
+from .revisiones import RevisionService
+
+logger = logging.getLogger(__name__)
+
+# Filas por INSERT en las inserciones masivas
+BULK_BATCH_SIZE = 500
+
+# Campos que se copian tal cual al clonar un ítem (precios históricos incluidos)
+CAMPOS_ITEM_CLONADOS = [
+    'producto_id', 'numero_item', 'cantidad', 'ancho', 'alto', 'atributos_seleccionados',
+    'descripcion_tecnica', 'precio_unitario', 'porcentaje_descuento', 'precio_total',
+]
+
+# Campos del ítem que se comparan para decidir si una fila cambió
+CAMPOS_ITEM_EDITABLES = ['cantidad', 'ancho', 'alto', 'porcentaje_descuento', 'atributos_seleccionados']
+CAMPOS_ITEM_DIFF = [
+    'producto_id', 'numero_item', 'precio_unitario', *CAMPOS_ITEM_EDITABLES,
+    'precio_total', 'descripcion_tecnica',
+]
+
+
+class CotizacionService:
+    """Servicio con lógica de negocio para Cotizaciones"""
+
+    @staticmethod
+    def resolver_productos(producto_ids):
+        """
+        Carga con UNA sola consulta todos los productos referenciados por un
+        payload, en lugar de una consulta por ítem. Solo devuelve productos
+        vendibles (activos y no eliminados); los ids ausentes del resultado
+        son inválidos. Las instancias traen precio_base, del que se toma el
+        snapshot de precio de cada ítem.
+
+        Args:
+            producto_ids: Iterable de ids (se admiten repetidos)
+
+        Returns:
+            dict: {id: ProductoServicio}
+        """
+        return ProductoServicio.objects.filter(is_active=True, eliminado=False).in_bulk(set(producto_ids))
+
+    @staticmethod
+    def construir_item(ambiente, producto, numero_item, usuario=None, **item_data):
+        """
+        Construye (sin guardar) un ítem con el precio del catálogo como
+        snapshot y con precio_total y descripcion_tecnica ya calculados,
+        igual que lo haría CotizacionItem.save().
+
+        Args:
+            ambiente: CotizacionAmbiente (guardado) al que pertenece el ítem
+            producto: ProductoServicio ya cargado (no se vuelve a consultar)
+            numero_item: Posición del ítem dentro del ambiente
+            usuario: Usuario de creación (opcional)
+            **item_data: Medidas, cantidad, descuento y atributos
+
+        Returns:
+            CotizacionItem: Instancia lista para bulk_create
+        """
+        item = CotizacionItem(
+            ambiente=ambiente,
+            producto=producto,
+            numero_item=numero_item,
+            precio_unitario=producto.precio_base,  # Precio de lista como snapshot
+            usuario_creacion=usuario,
+            **item_data
+        )
+        item.calcular_precio_total()
+        item.generar_descripcion()
+        return item
+
+    @staticmethod
+    def crear_ambientes_con_items(cotizacion, ambientes_data, usuario=None):
+        """
+        Crea los ambientes y sus ítems con dos inserciones masivas (una para
+        ambientes y otra para ítems, por lotes de BULK_BATCH_SIZE), en lugar
+        de un INSERT por fila.
+
+        No recalcula los totales del encabezado: el llamador debe invocar
+        `cotizacion.recalculate_totals()` una vez al final, dentro de la misma
+        transacción.
+
+        Args:
+            cotizacion: Cotizacion ya guardada
+            ambientes_data: Lista de dicts validados con 'items' anidados
+                (cada ítem con 'producto' como instancia)
+            usuario: Usuario de creación de los ítems (opcional)
+
+        Returns:
+            tuple: (ambientes, items) creados
+        """
+        items_por_ambiente = []
+        ambientes = []
+        for i, ambiente_data in enumerate(ambientes_data):
+            ambiente_data = dict(ambiente_data)
+            items_por_ambiente.append(ambiente_data.pop('items', []))
+            ambiente_data.pop('orden', None)
+            ambiente_data.pop('id', None)  # En el alta se ignoran ids enviados
+            ambientes.append(CotizacionAmbiente(
+                cotizacion=cotizacion,
+                orden=i + 1,  # Orden secuencial
+                **ambiente_data
+            ))
+        ambientes = CotizacionAmbiente.objects.bulk_create(ambientes)
+
+        items = []
+        for ambiente, items_data in zip(ambientes, items_por_ambiente):
+            for j, item_data in enumerate(items_data):
+                item_data = dict(item_data)
+                producto = item_data.pop('producto')
+                numero_item = item_data.pop('numero_item', j + 1)
+                item_data.pop('id', None)
+                items.append(CotizacionService.construir_item(
+                    ambiente, producto, numero_item, usuario=usuario, **item_data
+                ))
+        items = CotizacionItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+
+        logger.info(
+            f"Cotización {cotizacion.numero}: {len(ambientes)} ambientes y "
+            f"{len(items)} ítems creados en bloque"
+        )
+        return ambientes, items
+
+    @staticmethod
+    def actualizar_ambientes_con_items(cotizacion, ambientes_data, usuario=None):
+        """
+        Sincroniza los ambientes e ítems de una cotización con el payload.
+
+        Carga el árbol existente una sola vez, calcula el diff (altas, cambios
+        y bajas) y lo aplica con sentencias masivas: un DELETE por nivel,
+        bulk_update solo para las filas que realmente cambiaron y bulk_create
+        para las nuevas. Las filas sin cambios no se escriben (conservan su
+        updated_at).
+
+        Mantiene la semántica del update anterior: los ambientes se reordenan
+        por posición (orden = i + 1) y los ítems se renumeran (numero_item =
+        j + 1); un id desconocido (o de otro ambiente) se trata como alta; al
+        enviar el producto se vuelve a tomar su precio de lista como snapshot.
+
+        No recalcula los totales del encabezado: el llamador debe invocar
+        `cotizacion.recalculate_totals()` dentro de la misma transacción.
+
+        Args:
+            cotizacion: Cotizacion ya guardada
+            ambientes_data: Lista de dicts validados con 'items' anidados
+                (cada ítem con 'id' opcional y 'producto' como instancia)
+            usuario: Usuario de creación/modificación (opcional)
+
+        Returns:
+            dict: Cantidad de filas creadas, actualizadas y eliminadas por nivel
+        """
+        existentes = {
+            ambiente.id: ambiente
+            for ambiente in cotizacion.ambientes.prefetch_related(
+                Prefetch('items', queryset=CotizacionItem.objects.select_related('producto'))
+            )
+        }
+        ahora = timezone.now()
+
+        ambientes_a_crear, ambientes_a_actualizar, ambientes_conservados = [], [], set()
+        items_a_crear, items_a_actualizar, items_conservados = [], [], set()
+        renumerados, mayor_numero = [], 0
+        # Ítems nuevos por ambiente; los de ambientes nuevos se resuelven tras el bulk_create
+        altas_por_ambiente = []
+
+        for i, ambiente_data in enumerate(ambientes_data):
+            ambiente_data = dict(ambiente_data)
+            items_data = ambiente_data.pop('items', [])
+            ambiente = existentes.get(ambiente_data.pop('id', None))
+            ambiente_data.pop('orden', None)
+
+            if ambiente is None or ambiente.id in ambientes_conservados:
+                ambiente = CotizacionAmbiente(cotizacion=cotizacion, orden=i + 1, **ambiente_data)
+                ambientes_a_crear.append(ambiente)
+                items_actuales = {}
+            else:
+                ambientes_conservados.add(ambiente.id)
+                nombre = ambiente_data.get('nombre', ambiente.nombre)
+                if (ambiente.nombre, ambiente.orden) != (nombre, i + 1):
+                    ambiente.nombre, ambiente.orden = nombre, i + 1
+                    ambientes_a_actualizar.append(ambiente)
+                items_actuales = {item.id: item for item in ambiente.items.all()}
+
+            altas = []
+            for j, item_data in enumerate(items_data):
+                item_data = dict(item_data)
+                producto = item_data.pop('producto', None)
+                item = items_actuales.get(item_data.pop('id', None))
+                item_data.pop('numero_item', None)
+
+                if item is None or item.id in items_conservados:
+                    if producto is not None:
+                        altas.append((producto, j + 1, item_data))
+                    continue
+
+                items_conservados.add(item.id)
+                mayor_numero = max(mayor_numero, item.numero_item)
+                if item.numero_item != j + 1:
+                    renumerados.append(item)
+                if CotizacionService._aplicar_cambios_item(item, producto, j + 1, item_data):
+                    item.updated_at = ahora
+                    item.usuario_modificacion = usuario
+                    items_a_actualizar.append(item)
+            altas_por_ambiente.append((ambiente, altas))
+
+        # 1. Bajas: una sentencia por nivel (los ítems de ambientes eliminados caen en cascada)
+        ambientes_eliminados = [pk for pk in existentes if pk not in ambientes_conservados]
+        items_eliminados = [
+            item.id
+            for pk in ambientes_conservados
+            for item in existentes[pk].items.all()
+            if item.id not in items_conservados
+        ]
+        if items_eliminados:
+            CotizacionItem.objects.filter(id__in=items_eliminados).delete()
+        if ambientes_eliminados:
+            CotizacionAmbiente.objects.filter(id__in=ambientes_eliminados).delete()
+
+        # 2. Cambios
+        if ambientes_a_actualizar:
+            CotizacionAmbiente.objects.bulk_update(ambientes_a_actualizar, ['nombre', 'orden'])
+        if items_a_actualizar:
+            if renumerados:
+                CotizacionService._renumerar_sin_colisiones(renumerados, mayor_numero)
+            CotizacionItem.objects.bulk_update(
+                items_a_actualizar,
+                [*CAMPOS_ITEM_DIFF, 'updated_at', 'usuario_modificacion'],
+                batch_size=BULK_BATCH_SIZE,
+            )
+
+        # 3. Altas
+        if ambientes_a_crear:
+            CotizacionAmbiente.objects.bulk_create(ambientes_a_crear)
+        for ambiente, altas in altas_por_ambiente:
+            for producto, numero_item, item_data in altas:
+                items_a_crear.append(CotizacionService.construir_item(
+                    ambiente, producto, numero_item, usuario=usuario, **item_data
+                ))
+        if items_a_crear:
+            CotizacionItem.objects.bulk_create(items_a_crear, batch_size=BULK_BATCH_SIZE)
+
+        resumen = {
+            'ambientes_creados': len(ambientes_a_crear),
+            'ambientes_actualizados': len(ambientes_a_actualizar),
+            'ambientes_eliminados': len(ambientes_eliminados),
+            'items_creados': len(items_a_crear),
+            'items_actualizados': len(items_a_actualizar),
+            'items_eliminados': len(items_eliminados),
+        }
+        logger.info(f"Cotización {cotizacion.numero}: actualización por diff {resumen}")
+        return resumen
+
+    @staticmethod
+    def _aplicar_cambios_item(item, producto, numero_item, item_data):
+        """
+        Aplica el payload sobre un ítem cargado y recalcula precio_total y
+        descripcion_tecnica en memoria.
+
+        Returns:
+            bool: True si alguno de los campos persistidos cambió
+        """
+        antes = [getattr(item, campo) for campo in CAMPOS_ITEM_DIFF]
+
+        if producto is not None:
+            item.producto = producto
+            item.precio_unitario = producto.precio_base  # Nuevo snapshot del precio de lista
+        for campo in CAMPOS_ITEM_EDITABLES:
+            if campo in item_data:
+                setattr(item, campo, item_data[campo])
+        item.numero_item = numero_item
+        item.calcular_precio_total()  # Ya redondeado a centavos, comparable con el valor guardado
+        item.generar_descripcion()
+
+        return antes != [getattr(item, campo) for campo in CAMPOS_ITEM_DIFF]
+
+    @staticmethod
+    def _renumerar_sin_colisiones(renumerados, desplazamiento):
+        """
+        Mueve a números temporales (por encima de `desplazamiento`, el mayor
+        numero_item en uso) los ítems que cambian de posición, para que el
+        bulk_update final no choque fila a fila con la restricción única
+        (ambiente, numero_item).
+        """
+        finales = [item.numero_item for item in renumerados]
+        for item in renumerados:
+            item.numero_item += desplazamiento
+        CotizacionItem.objects.bulk_update(renumerados, ['numero_item'], batch_size=BULK_BATCH_SIZE)
+        for item, numero_item in zip(renumerados, finales):
+            item.numero_item = numero_item
+
+    @staticmethod
+    def clonar_cotizacion(original, clientes, vendedor=None, usuario=None):
+        """
+        Duplica una cotización (encabezado, ambientes e ítems) una vez por
+        cliente, en una sola transacción y con inserciones masivas: un
+        bulk_create por nivel para todas las copias, sin importar cuántas
+        sean ni cuántos ítems tenga el original.
+
+        Las copias quedan en BORRADOR con los precios históricos del
+        original (no se vuelve a tomar el precio de lista). Como los ítems
+        son idénticos, los totales se calculan una sola vez en memoria.
+
+        Args:
+            original: Cotizacion a copiar
+            clientes: Lista de Cliente, uno por copia (en orden)
+            vendedor: Vendedor de las copias (por defecto el del original)
+            usuario: Usuario de creación (opcional)
+
+        Returns:
+            list: Cotizaciones creadas, en el mismo orden que `clientes`
+        """
+        # Reutiliza el prefetch de la vista si ya existe
+        prefetch_related_objects([original], 'ambientes__items')
+        ambientes_originales = list(original.ambientes.all())
+        total_neto = sum(
+            (item.precio_total for ambiente in ambientes_originales for item in ambiente.items.all()),
+            Decimal('0.00'),
+        )
+
+        with transaction.atomic():
+            try:
+                correlativo = TablaCorrelativos.objects.get(prefijo='COT')
+            except TablaCorrelativos.DoesNotExist:
+                raise ValidationError("Error: No existe un correlativo configurado con prefijo 'COT'.")
+            numeros = correlativo.obtener_siguientes_codigos(len(clientes))
+
+            # 1. Encabezados: número reservado en bloque y totales ya conocidos
+            copias = Cotizacion.objects.bulk_create([
+                Cotizacion(
+                    numero=numero,
+                    cliente=cliente,
+                    vendedor=vendedor if vendedor is not None else original.vendedor,
+                    estado=Cotizacion.EstadoCotizacion.BORRADOR,
+                    fecha_validez=original.fecha_validez,
+                    descuento_total=original.descuento_total,
+                    total_neto=total_neto,
+                    total_general=total_neto - original.descuento_total,
+                    usuario_creacion=usuario,
+                )
+                for numero, cliente in zip(numeros, clientes)
+            ])
+
+            # 2. Ambientes de todas las copias
+            ambientes = CotizacionAmbiente.objects.bulk_create([
+                CotizacionAmbiente(cotizacion=copia, nombre=ambiente.nombre, orden=ambiente.orden)
+                for copia in copias
+                for ambiente in ambientes_originales
+            ])
+
+            # 3. Ítems: los ambientes nuevos vienen en el mismo orden (copia x ambiente original)
+            items = [
+                CotizacionItem(
+                    ambiente=nuevo_ambiente,
+                    usuario_creacion=usuario,
+                    **{campo: getattr(item, campo) for campo in CAMPOS_ITEM_CLONADOS}
+                )
+                for nuevo_ambiente, ambiente in zip(ambientes, ambientes_originales * len(copias))
+                for item in ambiente.items.all()
+            ]
+            CotizacionItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+
+            # 4. Revisión inicial de cada copia, como al crear por el serializer
+            for copia in copias:
+                RevisionService.registrar(copia, usuario=usuario)
+
+        logger.info(
+            f"Cotización {original.numero} clonada {len(copias)} veces "
+            f"({len(ambientes)} ambientes y {len(items)} ítems en bloque)"
+        )
+        return copias
+
+    @staticmethod
+    def aceptar_cotizacion(cotizacion, usuario=None):
+        """
+        Pasa la cotización a ACEPTADA y genera su Pedido de Servicio en la
+        misma transacción (si algo falla, no queda ni el cambio de estado ni
+        el pedido).
+
+        Es idempotente: la fila se bloquea mientras dura la aceptación, y una
+        cotización ya aceptada con pedido retorna ese pedido sin tocar nada,
+        así que reintentos o dobles clics no duplican pedidos.
+
+        Args:
+            cotizacion: Cotizacion a aceptar (se actualiza su estado en memoria)
+            usuario: Usuario que acepta (opcional)
+
+        Returns:
+            tuple: (PedidoServicio, creado: bool)
+
+        Raises:
+            ValidationError: Si la cotización no está en BORRADOR, ENVIADA o ACEPTADA
+        """
+        aceptables = [
+            Cotizacion.EstadoCotizacion.BORRADOR,
+            Cotizacion.EstadoCotizacion.ENVIADA,
+            Cotizacion.EstadoCotizacion.ACEPTADA,
+        ]
+
+        with transaction.atomic():
+            bloqueada = Cotizacion.objects.select_for_update().select_related('vendedor').get(pk=cotizacion.pk)
+            if bloqueada.estado not in aceptables:
+                raise ValidationError(
+                    "La cotización debe estar en estado ENVIADA o BORRADOR para ser aceptada."
+                )
+
+            if bloqueada.estado != Cotizacion.EstadoCotizacion.ACEPTADA:
+                bloqueada.estado = Cotizacion.EstadoCotizacion.ACEPTADA
+                bloqueada.save()
+
+            pedido, creado = ConversionCotizacionService.crear_desde_cotizacion(bloqueada, usuario)
+
+        cotizacion.estado = bloqueada.estado
+        return pedido, creado
+
+    @staticmethod
+    def vencer_cotizaciones(hoy=None, lote=BULK_BATCH_SIZE, simular=False):
+        """
+        Pasa a VENCIDA las cotizaciones BORRADOR/ENVIADA cuya fecha_validez ya
+        pasó, por lotes: por cada lote, un SELECT de ids (índice estado,
+        -created_at) y un único UPDATE.
+
+        Es seguro ejecutarlo en paralelo con la API: el UPDATE vuelve a exigir
+        estado y fecha vencida, así que una cotización aceptada o prorrogada
+        entre el SELECT y el UPDATE no se pisa. Cada lote se confirma por
+        separado para no retener bloqueos.
+
+        Args:
+            hoy: Fecha de referencia (por defecto la fecha local actual)
+            lote: Cantidad máxima de filas por UPDATE
+            simular: Si es True, solo cuenta (no modifica nada)
+
+        Returns:
+            dict: {estado_anterior: cantidad vencida}
+        """
+        hoy = hoy or timezone.localdate()
+        vencidas = {}
+
+        for estado in [Cotizacion.EstadoCotizacion.BORRADOR, Cotizacion.EstadoCotizacion.ENVIADA]:
+            expiradas = Cotizacion.objects.filter(estado=estado, fecha_validez__lt=hoy, is_active=True)
+            if simular:
+                vencidas[estado] = expiradas.count()
+                continue
+
+            vencidas[estado] = 0
+            while True:
+                ids = list(expiradas.order_by('-created_at').values_list('pk', flat=True)[:lote])
+                if not ids:
+                    break
+                vencidas[estado] += expiradas.filter(pk__in=ids).update(
+                    estado=Cotizacion.EstadoCotizacion.VENCIDA,
+                    updated_at=timezone.now(),
+                )
+
+        logger.info(f"Vencimiento de cotizaciones al {hoy}: {vencidas}")
+        return vencidas
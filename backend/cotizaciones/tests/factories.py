@@ -0,0 +1,155 @@
+# cotizaciones/tests/factories.py
+from decimal import Decimal
+
+import factory
+from factory.django import DjangoModelFactory
+from django.contrib.auth import get_user_model
+
+from clientes.models import Cliente
+from common.models import Pais, TablaCorrelativos
+from cotizaciones.models import Cotizacion, CotizacionAmbiente, CotizacionItem
+from manufactura.models import Manufactura
+from productos_servicios.models import ProductoServicio
+
+User = get_user_model()
+
+
+class UserFactory(DjangoModelFactory):
+    class Meta:
+        model = User
+        skip_postgeneration_save = True
+
+    username = factory.Sequence(lambda n: f'cot_user{n}')
+    email = factory.Sequence(lambda n: f'cot_user{n}@example.com')
+    password = factory.PostGenerationMethodCall('set_password', 'password123')
+
+    @classmethod
+    def _after_postgeneration(cls, instance, create, results=None):
+        if create:
+            instance.save()
+
+
+class PaisFactory(DjangoModelFactory):
+    class Meta:
+        model = Pais
+        django_get_or_create = ('codigo',)
+
+    codigo = 'BR'
+    nombre = 'Brasil'
+    codigo_telefono = '+55'
+
+
+class ClienteFactory(DjangoModelFactory):
+    class Meta:
+        model = Cliente
+
+    nombre = factory.Sequence(lambda n: f'Cliente Cotización {n}')
+    pais = factory.SubFactory(PaisFactory)
+    telefono = '11999999999'
+    email = factory.Sequence(lambda n: f'cliente_cot{n}@example.com')
+
+
+class VendedorFactory(DjangoModelFactory):
+    class Meta:
+        model = Manufactura
+
+    nombre = factory.Sequence(lambda n: f'Vendedor {n}')
+    apellido = 'Comercial'
+    documento = factory.Sequence(lambda n: f'DOC-VEN-{n}')
+    email = factory.Sequence(lambda n: f'vendedor{n}@example.com')
+    telefono = '11988888888'
+    cargo = Manufactura.Cargo.COMERCIAL
+
+
+class ProductoFactory(DjangoModelFactory):
+    class Meta:
+        model = ProductoServicio
+
+    codigo = factory.Sequence(lambda n: f'COR-TST-{n:04d}')
+    nombre = factory.Sequence(lambda n: f'Cortina Test {n}')
+    tipo_producto = ProductoServicio.TipoProducto.CORTINA
+    unidad_medida = ProductoServicio.UnidadMedida.METRO_CUADRADO
+    precio_base = Decimal('100.00')
+    requiere_medidas = True
+
+
+class CorrelativoCotizacionFactory(DjangoModelFactory):
+    class Meta:
+        model = TablaCorrelativos
+        django_get_or_create = ('prefijo',)
+
+    prefijo = 'COT'
+    nombre = 'Cotizaciones'
+
+
+class CotizacionFactory(DjangoModelFactory):
+    class Meta:
+        model = Cotizacion
+
+    cliente = factory.SubFactory(ClienteFactory)
+    vendedor = factory.SubFactory(VendedorFactory)
+    fecha_validez = factory.Faker('future_date')
+    descuento_total = Decimal('0.00')
+
+    @classmethod
+    def _create(cls, model_class, *args, **kwargs):
+        CorrelativoCotizacionFactory()
+        return super()._create(model_class, *args, **kwargs)
+
+
+class CotizacionAmbienteFactory(DjangoModelFactory):
+    class Meta:
+        model = CotizacionAmbiente
+
+    cotizacion = factory.SubFactory(CotizacionFactory)
+    nombre = factory.Sequence(lambda n: f'Ambiente {n}')
+    orden = factory.Sequence(lambda n: n + 1)
+
+
+class CotizacionItemFactory(DjangoModelFactory):
+    class Meta:
+        model = CotizacionItem
+
+    ambiente = factory.SubFactory(CotizacionAmbienteFactory)
+    producto = factory.SubFactory(ProductoFactory)
+    numero_item = factory.Sequence(lambda n: n + 1)
+    cantidad = Decimal('1.00')
+    ancho = Decimal('1.500')
+    alto = Decimal('2.000')
+    precio_unitario = Decimal('100.00')
+
+
+def crear_cotizacion_completa(num_ambientes, items_por_ambiente, productos=None, **kwargs):
+    """
+    Crea una cotización con `num_ambientes` ambientes y `items_por_ambiente`
+    ítems en cada uno, usando inserciones masivas para mantener los tests rápidos.
+    """
+    cotizacion = CotizacionFactory(**kwargs)
+    productos = productos or ProductoFactory.create_batch(5)
+
+    ambientes = CotizacionAmbiente.objects.bulk_create([
+        CotizacionAmbiente(cotizacion=cotizacion, nombre=f'Ambiente {i + 1}', orden=i + 1)
+        for i in range(num_ambientes)
+    ])
+
+    items = []
+    for ambiente in ambientes:
+        for j in range(items_por_ambiente):
+            producto = productos[j % len(productos)]
+            item = CotizacionItem(
+                ambiente=ambiente,
+                producto=producto,
+                numero_item=j + 1,
+                cantidad=Decimal('1.00'),
+                ancho=Decimal('1.500'),
+                alto=Decimal('2.000'),
+                precio_unitario=producto.precio_base,
+                atributos_seleccionados={'tejido': 'Linho'},
+            )
+            item.precio_total = item.precio_unitario * item.ancho * item.alto
+            item.generar_descripcion()
+            items.append(item)
+    CotizacionItem.objects.bulk_create(items)
+
+    cotizacion.recalculate_totals()
+    return cotizacion
@@ -0,0 +1,183 @@
+# cotizaciones/tests/test_aceptacion.py
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from cotizaciones.models import Cotizacion, CotizacionItem
+from cotizaciones.services import CotizacionService
+from pedidos_servicio.models import ItemPedidoServicio, PedidoServicio
+from productos_servicios.models import ProductoServicio
+from .factories import ProductoFactory, UserFactory, crear_cotizacion_completa
+
+Estado = Cotizacion.EstadoCotizacion
+
+
+@pytest.mark.django_db
+class TestAceptarCotizacion(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory(is_superuser=True)
+        self.cotizacion = crear_cotizacion_completa(
+            num_ambientes=2, items_por_ambiente=3, estado=Estado.ENVIADA
+        )
+
+    def _aceptar(self, cotizacion=None):
+        cotizacion = Cotizacion.objects.get(pk=(cotizacion or self.cotizacion).pk)
+        return CotizacionService.aceptar_cotizacion(cotizacion, usuario=self.user)
+
+    def test_genera_el_pedido_con_los_items_de_la_cotizacion(self):
+        item = CotizacionItem.objects.filter(ambiente__cotizacion=self.cotizacion).order_by('ambiente__orden', 'numero_item').first()
+        item.atributos_seleccionados = {'tejido': 'Screen 5%', 'mando': 'Izquierdo', 'caida': 'Invertida'}
+        item.cantidad = Decimal('2.00')
+        item.save()
+
+        pedido, creado = self._aceptar()
+
+        self.assertTrue(creado)
+        self.cotizacion.refresh_from_db()
+        self.assertEqual(self.cotizacion.estado, Estado.ACEPTADA)
+        self.assertEqual(pedido.cotizacion, self.cotizacion)
+        self.assertEqual(pedido.cliente_id, self.cotizacion.cliente_id)
+        self.assertEqual(pedido.solicitante, self.cotizacion.vendedor.get_full_name())
+        self.assertEqual(pedido.usuario_creacion, self.user)
+        self.assertIn(self.cotizacion.numero, pedido.observaciones)
+
+        items = list(pedido.items.all())
+        self.assertEqual([i.numero_item for i in items], [1, 2, 3, 4, 5, 6])
+        self.assertEqual([i.ambiente for i in items], ['Ambiente 1'] * 3 + ['Ambiente 2'] * 3)
+
+        primero = items[0]
+        self.assertEqual(primero.modelo, item.producto.nombre)
+        self.assertEqual(primero.tejido, 'Screen 5%')
+        self.assertEqual((primero.largura, primero.altura), (Decimal('1.50'), Decimal('2.00')))
+        self.assertEqual(primero.cantidad_piezas, 2)
+        self.assertEqual(primero.lado_comando, ItemPedidoServicio.LadoComando.IZQUIERDO)
+        self.assertEqual(primero.posicion_tejido, ItemPedidoServicio.PosicionTejido.INVERSO)
+        self.assertEqual(primero.acionamiento, ItemPedidoServicio.Acionamiento.MANUAL)
+
+        # Sin atributos reconocibles: valores por defecto
+        self.assertEqual(items[1].tejido, 'Linho')
+        self.assertEqual(items[1].lado_comando, ItemPedidoServicio.LadoComando.DERECHO)
+        self.assertEqual(items[1].posicion_tejido, ItemPedidoServicio.PosicionTejido.NORMAL)
+
+    def test_solo_traslada_items_fabricables(self):
+        servicio = ProductoFactory(
+            tipo_producto=ProductoServicio.TipoProducto.SERVICIO,
+            unidad_medida=ProductoServicio.UnidadMedida.UNIDAD,
+            requiere_medidas=False,
+        )
+        CotizacionItem.objects.create(
+            ambiente=self.cotizacion.ambientes.first(), producto=servicio, numero_item=9,
+            cantidad=Decimal('1.00'), precio_unitario=Decimal('50.00'), porcentaje_descuento=Decimal('0.00'),
+        )
+
+        pedido, _ = self._aceptar()
+
+        self.assertEqual(pedido.items.count(), 6)
+        self.assertNotIn(servicio.nombre, pedido.items.values_list('modelo', flat=True))
+
+    def test_items_en_bloque(self):
+        self._aceptar(crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1, estado=Estado.ENVIADA))
+        grande = crear_cotizacion_completa(num_ambientes=5, items_por_ambiente=10, estado=Estado.ENVIADA)
+
+        with CaptureQueriesContext(connection) as ctx:
+            pedido, _ = self._aceptar(grande)
+
+        self.assertEqual(pedido.items.count(), 50)
+        inserts = [q['sql'] for q in ctx.captured_queries if 'INSERT INTO "pedidos_servicio_itempedidoservicio"' in q['sql']]
+        campos = [f for f in ItemPedidoServicio._meta.concrete_fields if not f.primary_key]
+        self.assertEqual(len(inserts), -(-50 // connection.ops.bulk_batch_size(campos, [None] * 50)))
+
+    def test_aceptar_dos_veces_no_duplica_el_pedido(self):
+        pedido, creado = self._aceptar()
+        repetido, repetido_creado = self._aceptar()
+
+        self.assertTrue(creado)
+        self.assertFalse(repetido_creado)
+        self.assertEqual(repetido, pedido)
+        self.assertEqual(PedidoServicio.objects.filter(cotizacion=self.cotizacion).count(), 1)
+        self.assertEqual(ItemPedidoServicio.objects.filter(pedido_servicio=pedido).count(), 6)
+
+    def test_estado_no_aceptable(self):
+        Cotizacion.objects.filter(pk=self.cotizacion.pk).update(estado=Estado.RECHAZADA)
+
+        with self.assertRaises(ValidationError):
+            self._aceptar()
+
+        self.assertFalse(PedidoServicio.objects.exists())
+
+    def test_emails_solo_al_confirmar(self):
+        with mock.patch('pedidos_servicio.signals.enviar_email_nuevo_pedido') as email_mock:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                pedido, _ = self._aceptar()
+            email_mock.assert_not_called()
+
+            for callback in callbacks:
+                callback()
+
+        email_mock.assert_called_once_with(pedido)
+
+    def test_fallo_revierte_estado_pedido_y_emails(self):
+        with mock.patch('pedidos_servicio.signals.enviar_email_nuevo_pedido') as email_mock, \
+                mock.patch.object(ItemPedidoServicio.objects, 'bulk_create', side_effect=RuntimeError('fallo')):
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError):
+                    self._aceptar()
+
+        email_mock.assert_not_called()
+        self.cotizacion.refresh_from_db()
+        self.assertEqual(self.cotizacion.estado, Estado.ENVIADA)
+        self.assertFalse(PedidoServicio.objects.exists())
+
+
+@pytest.mark.django_db
+class TestEndpointsAceptacion(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=UserFactory(is_superuser=True))
+        self.cotizacion = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=2, estado=Estado.ENVIADA)
+
+    def test_accept_es_idempotente(self):
+        url = reverse('cotizacion-accept-cotizacion', kwargs={'pk': self.cotizacion.pk})
+
+        primera = self.client.post(url)
+        segunda = self.client.post(url)
+
+        self.assertEqual(primera.status_code, 200)
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual(primera.data['estado'], Estado.ACEPTADA)
+        self.assertEqual(primera.data['pedido_servicio'], segunda.data['pedido_servicio'])
+        pedido = PedidoServicio.objects.get(cotizacion=self.cotizacion)
+        self.assertEqual(primera.data['pedido_servicio']['numero_pedido'], pedido.numero_pedido)
+        self.assertEqual(pedido.items.count(), 2)
+
+    def test_cambiar_estado_a_aceptada_genera_el_pedido(self):
+        response = self.client.post(
+            reverse('cotizacion-cambiar-estado', kwargs={'pk': self.cotizacion.pk}),
+            {'estado': Estado.ACEPTADA}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['estado'], Estado.ACEPTADA)
+        self.assertEqual(PedidoServicio.objects.get(cotizacion=self.cotizacion).items.count(), 2)
+
+    def test_cambiar_estado_a_aceptada_exige_permiso(self):
+        self.client.force_authenticate(user=UserFactory())
+
+        response = self.client.post(
+            reverse('cotizacion-cambiar-estado', kwargs={'pk': self.cotizacion.pk}),
+            {'estado': Estado.ACEPTADA}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.cotizacion.refresh_from_db()
+        self.assertEqual(self.cotizacion.estado, Estado.ENVIADA)
+        self.assertFalse(PedidoServicio.objects.filter(cotizacion=self.cotizacion).exists())
@@ -0,0 +1,190 @@
+# cotizaciones/tests/test_cotizacion_clone.py
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from common.models import TablaCorrelativos
+from cotizaciones.models import Cotizacion, CotizacionItem, CotizacionRevision
+from cotizaciones.revisiones import RevisionService
+from cotizaciones.services import CotizacionService
+from .factories import ClienteFactory, UserFactory, crear_cotizacion_completa
+
+
+def _arbol(cotizacion):
+    """Estructura comparable de una cotización: ambientes con sus ítems"""
+    return [
+        (
+            ambiente.nombre, ambiente.orden,
+            [
+                (item.producto_id, item.numero_item, item.cantidad, item.ancho, item.alto,
+                 item.atributos_seleccionados, item.descripcion_tecnica, item.precio_unitario,
+                 item.porcentaje_descuento, item.precio_total)
+                for item in ambiente.items.order_by('numero_item')
+            ],
+        )
+        for ambiente in cotizacion.ambientes.order_by('orden')
+    ]
+
+
+@pytest.mark.django_db
+class TestClonarCotizacion(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory(is_superuser=True)
+        self.original = crear_cotizacion_completa(
+            num_ambientes=3, items_por_ambiente=4, descuento_total=Decimal('20.00')
+        )
+        self.original.estado = Cotizacion.EstadoCotizacion.ENVIADA
+        self.original.save()
+
+    def _clonar(self, clientes):
+        original = Cotizacion.objects.get(pk=self.original.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            copias = CotizacionService.clonar_cotizacion(original, clientes, usuario=self.user)
+        return copias, len(ctx.captured_queries)
+
+    def test_copia_identica_en_borrador(self):
+        cliente = ClienteFactory()
+
+        (copia,), _ = self._clonar([cliente])
+
+        copia = Cotizacion.objects.get(pk=copia.pk)
+        self.assertEqual(_arbol(copia), _arbol(self.original))
+        self.assertEqual(copia.cliente, cliente)
+        self.assertEqual(copia.vendedor, self.original.vendedor)
+        self.assertEqual(copia.estado, Cotizacion.EstadoCotizacion.BORRADOR)
+        self.assertEqual(copia.usuario_creacion, self.user)
+        self.assertNotEqual(copia.numero, self.original.numero)
+
+        self.original.refresh_from_db()
+        self.assertEqual(copia.total_neto, self.original.total_neto)
+        self.assertEqual(copia.total_general, self.original.total_general)
+
+    def test_consultas_no_crecen_con_las_copias(self):
+        # La revisión inicial es una por copia; se mide solo la inserción en bloque
+        with mock.patch.object(RevisionService, 'registrar'):
+            _, una = self._clonar(ClienteFactory.create_batch(1))
+            copias, diez = self._clonar(ClienteFactory.create_batch(10))
+
+        # 10 copias x 12 ítems = 120 filas; el backend limita las filas por INSERT
+        campos = [f for f in CotizacionItem._meta.concrete_fields if not f.primary_key]
+        lotes = -(-120 // connection.ops.bulk_batch_size(campos, [None] * 120))
+        self.assertEqual(diez, una + lotes - 1)
+
+        for copia in copias:
+            self.assertEqual(_arbol(copia), _arbol(self.original))
+
+    def test_registra_la_revision_inicial_de_cada_copia(self):
+        copias, _ = self._clonar(ClienteFactory.create_batch(2))
+
+        for copia in copias:
+            revision = CotizacionRevision.objects.get(cotizacion=copia)
+            self.assertEqual((revision.numero, revision.es_checkpoint), (1, True))
+            self.assertEqual(revision.usuario_creacion, self.user)
+            _, foto = RevisionService.reconstruir(copia)
+            self.assertEqual(len(foto['ambientes']), 3)
+
+    def test_numeros_consecutivos_y_unicos(self):
+        copias, _ = self._clonar(ClienteFactory.create_batch(3))
+
+        correlativo = TablaCorrelativos.objects.get(prefijo='COT')
+        esperados = [
+            f"COT-{str(n).zfill(correlativo.longitud)}"
+            for n in range(correlativo.numero - 2, correlativo.numero + 1)
+        ]
+        self.assertEqual([copia.numero for copia in copias], esperados)
+
+    def test_fallo_no_deja_copias_parciales(self):
+        antes = Cotizacion.objects.count()
+        original = Cotizacion.objects.get(pk=self.original.pk)
+
+        with self.assertRaises(Exception):
+            # Un cliente sin guardar hace fallar el INSERT de los encabezados
+            CotizacionService.clonar_cotizacion(original, [ClienteFactory(), ClienteFactory.build()])
+
+        self.assertEqual(Cotizacion.objects.count(), antes)
+
+
+@pytest.mark.django_db
+class TestEndpointsClonar(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=UserFactory(is_superuser=True))
+        self.original = crear_cotizacion_completa(num_ambientes=2, items_por_ambiente=3)
+
+    def test_clonar_para_otro_cliente(self):
+        cliente = ClienteFactory()
+
+        response = self.client.post(
+            reverse('cotizacion-clone-cotizacion', kwargs={'pk': self.original.pk}),
+            {'cliente_id': cliente.pk}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['cliente'], cliente.pk)
+        self.assertEqual(len(response.data['ambientes']), 2)
+        self.assertEqual(len(response.data['ambientes'][0]['items']), 3)
+
+    def test_clonar_lote(self):
+        clientes = ClienteFactory.create_batch(4)
+
+        response = self.client.post(
+            reverse('cotizacion-clonar-lote', kwargs={'pk': self.original.pk}),
+            {'clientes': [c.pk for c in clientes]}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([r['cliente'] for r in response.data], [c.pk for c in clientes])
+        for resultado in response.data:
+            copia = Cotizacion.objects.get(pk=resultado['id'])
+            self.assertEqual(copia.numero, resultado['numero'])
+            self.assertEqual(_arbol(copia), _arbol(self.original))
+
+    def test_clonar_lote_rechaza_clientes_invalidos(self):
+        antes = Cotizacion.objects.count()
+
+        response = self.client.post(
+            reverse('cotizacion-clonar-lote', kwargs={'pk': self.original.pk}),
+            {'clientes': [ClienteFactory().pk, 999999]}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('999999', str(response.data['clientes']))
+        self.assertEqual(Cotizacion.objects.count(), antes)
+
+    @override_settings(COTIZACION_CLONAR_LOTE_MAX=2)
+    def test_clonar_lote_respeta_el_maximo(self):
+        response = self.client.post(
+            reverse('cotizacion-clonar-lote', kwargs={'pk': self.original.pk}),
+            {'clientes': [c.pk for c in ClienteFactory.create_batch(3)]}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_clonar_lote_requiere_lista(self):
+        response = self.client.post(
+            reverse('cotizacion-clonar-lote', kwargs={'pk': self.original.pk}), {}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_clonar_lote_valida_los_ids(self):
+        antes = Cotizacion.objects.count()
+        cliente = ClienteFactory()
+
+        for clientes in [[None], [True], [cliente.pk + 0.5], ['x'], [{}], 'abc', []]:
+            response = self.client.post(
+                reverse('cotizacion-clonar-lote', kwargs={'pk': self.original.pk}),
+                {'clientes': clientes}, format='json',
+            )
+            self.assertEqual(response.status_code, 400, clientes)
+            self.assertIn('clientes', response.data)
+
+        self.assertEqual(Cotizacion.objects.count(), antes)
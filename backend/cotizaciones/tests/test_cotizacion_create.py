@@ -0,0 +1,192 @@
+# cotizaciones/tests/test_cotizacion_create.py
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from cotizaciones.models import Cotizacion, CotizacionItem
+from cotizaciones.serializers import CotizacionSerializer
+from .factories import (
+    ClienteFactory, CorrelativoCotizacionFactory, ProductoFactory, UserFactory, VendedorFactory,
+)
+
+
+def _payload(cliente, productos, num_ambientes, items_por_ambiente):
+    return {
+        'cliente': cliente.pk,
+        'fecha_validez': '2030-01-31',
+        'descuento_total': '0.00',
+        'ambientes': [
+            {
+                'nombre': f'Ambiente {a + 1}',
+                'items': [
+                    {
+                        'numero_item': i + 1,
+                        'producto_id': productos[i % len(productos)].pk,
+                        'cantidad': '2.00',
+                        'ancho': '1.250',
+                        'alto': '2.100',
+                        'porcentaje_descuento': '10.00',
+                        'atributos_seleccionados': {'tejido': 'Linho', 'color_riel': 'Blanco'},
+                    }
+                    for i in range(items_por_ambiente)
+                ],
+            }
+            for a in range(num_ambientes)
+        ],
+    }
+
+
+@pytest.mark.django_db
+class TestCreacionAnidadaCotizacion(TestCase):
+
+    def setUp(self):
+        CorrelativoCotizacionFactory()
+        self.user = UserFactory(is_superuser=True)
+        self.cliente = ClienteFactory()
+        self.productos = ProductoFactory.create_batch(3)
+        self.request = type('Request', (), {'user': self.user})()
+
+    def _guardar(self, num_ambientes, items_por_ambiente):
+        serializer = CotizacionSerializer(
+            data=_payload(self.cliente, self.productos, num_ambientes, items_por_ambiente),
+            context={'request': self.request},
+        )
+        self.assertTrue(serializer.is_valid())
+        with CaptureQueriesContext(connection) as ctx:
+            cotizacion = serializer.save()
+        return cotizacion, len(ctx.captured_queries)
+
+    def test_consultas_no_crecen_con_los_items(self):
+        """Una cotización de 300 líneas se guarda con un INSERT por lote, no uno por fila"""
+        _chica, consultas_chica = self._guardar(num_ambientes=3, items_por_ambiente=1)
+        grande, consultas_grande = self._guardar(num_ambientes=3, items_por_ambiente=100)
+
+        # El backend limita las filas por INSERT (SQLite: 999 parámetros por sentencia)
+        campos = [f for f in CotizacionItem._meta.concrete_fields if not f.primary_key]
+        lotes = -(-300 // connection.ops.bulk_batch_size(campos, [None] * 300))
+        self.assertEqual(consultas_grande, consultas_chica + lotes - 1)
+        self.assertLess(consultas_grande, 30)
+        self.assertEqual(CotizacionItem.objects.filter(ambiente__cotizacion=grande).count(), 300)
+
+    def test_calculos_iguales_a_los_de_save(self):
+        """precio_total, descripción y snapshot de precio coinciden con el cálculo de CotizacionItem.save()"""
+        cotizacion, _ = self._guardar(num_ambientes=2, items_por_ambiente=4)
+
+        items = CotizacionItem.objects.filter(ambiente__cotizacion=cotizacion).select_related('producto', 'ambiente')
+        self.assertEqual(items.count(), 8)
+        for item in items:
+            esperado = CotizacionItem(
+                ambiente=item.ambiente, producto=item.producto, numero_item=item.numero_item,
+                cantidad=item.cantidad, ancho=item.ancho, alto=item.alto,
+                precio_unitario=item.producto.precio_base,
+                porcentaje_descuento=item.porcentaje_descuento,
+                atributos_seleccionados=item.atributos_seleccionados,
+            )
+            esperado.calcular_precio_total()
+            esperado.generar_descripcion()
+
+            self.assertEqual(item.precio_unitario, item.producto.precio_base)
+            self.assertEqual(item.precio_total, esperado.precio_total.quantize(Decimal('0.01')))
+            self.assertEqual(item.descripcion_tecnica, esperado.descripcion_tecnica)
+            self.assertEqual(item.usuario_creacion, self.user)
+
+        self.assertEqual([a.orden for a in cotizacion.ambientes.order_by('orden')], [1, 2])
+        self.assertEqual(
+            [i.numero_item for i in items.filter(ambiente__orden=1).order_by('numero_item')], [1, 2, 3, 4]
+        )
+
+        cotizacion.refresh_from_db()
+        total = sum(item.precio_total for item in items)
+        self.assertEqual(cotizacion.total_neto, total)
+        self.assertEqual(cotizacion.total_general, total)
+
+    def test_precio_snapshot_no_cambia_con_el_catalogo(self):
+        cotizacion, _ = self._guardar(num_ambientes=1, items_por_ambiente=1)
+        producto = self.productos[0]
+        producto.precio_base = Decimal('999.00')
+        producto.save()
+
+        item = CotizacionItem.objects.get(ambiente__cotizacion=cotizacion)
+        self.assertEqual(item.precio_unitario, Decimal('100.00'))
+
+    def test_endpoint_crea_la_cotizacion_anidada(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        payload = _payload(self.cliente, self.productos, num_ambientes=2, items_por_ambiente=3)
+        payload['vendedor_id'] = VendedorFactory().pk
+
+        response = client.post(reverse('cotizacion-list'), payload, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        cotizacion = Cotizacion.objects.get(pk=response.data['id'])
+        self.assertEqual(len(response.data['ambientes']), 2)
+        self.assertEqual(len(response.data['ambientes'][0]['items']), 3)
+        self.assertEqual(cotizacion.usuario_creacion, self.user)
+        self.assertGreater(cotizacion.total_general, 0)
+
+
+@pytest.mark.django_db
+class TestResolucionDeProductosEnLote(TestCase):
+
+    def setUp(self):
+        CorrelativoCotizacionFactory()
+        self.cliente = ClienteFactory()
+        self.productos = ProductoFactory.create_batch(5)
+
+    def _validar(self, payload):
+        serializer = CotizacionSerializer(data=payload)
+        with CaptureQueriesContext(connection) as ctx:
+            valido = serializer.is_valid()
+        return serializer, valido, len(ctx.captured_queries)
+
+    def test_una_consulta_de_productos_para_todo_el_payload(self):
+        _, valido_chico, consultas_chico = self._validar(_payload(self.cliente, self.productos, 1, 1))
+        serializer, valido, consultas = self._validar(_payload(self.cliente, self.productos, 4, 50))
+
+        self.assertTrue(valido_chico)
+        self.assertTrue(valido)
+        self.assertEqual(consultas, consultas_chico)
+        productos = {
+            item['producto'].pk: item['producto']
+            for ambiente in serializer.validated_data['ambientes'] for item in ambiente['items']
+        }
+        self.assertEqual(set(productos), {p.pk for p in self.productos})
+
+    def test_productos_invalidos_se_reportan_en_su_item(self):
+        inactivo, eliminado = self.productos[1], self.productos[2]
+        inactivo.is_active = False
+        inactivo.save()
+        eliminado.eliminado = True
+        eliminado.save()
+
+        payload = _payload(self.cliente, self.productos[:1], 2, 2)
+        payload['ambientes'][0]['items'][1]['producto_id'] = inactivo.pk
+        payload['ambientes'][1]['items'][0]['producto_id'] = eliminado.pk
+        payload['ambientes'][1]['items'][1]['producto_id'] = 999999
+
+        serializer, valido, _ = self._validar(payload)
+
+        self.assertFalse(valido)
+        errores = serializer.errors['ambientes']
+        self.assertEqual(errores[0]['items'][0], {})
+        self.assertIn(str(inactivo.pk), str(errores[0]['items'][1]['producto_id']))
+        self.assertIn(str(eliminado.pk), str(errores[1]['items'][0]['producto_id']))
+        self.assertIn('999999', str(errores[1]['items'][1]['producto_id']))
+
+    def test_snapshot_de_precio_desde_el_mapa(self):
+        self.productos[0].precio_base = Decimal('321.00')
+        self.productos[0].save()
+        serializer = CotizacionSerializer(data=_payload(self.cliente, self.productos[:1], 1, 3))
+        self.assertTrue(serializer.is_valid())
+
+        cotizacion = serializer.save()
+
+        precios = set(
+            CotizacionItem.objects.filter(ambiente__cotizacion=cotizacion).values_list('precio_unitario', flat=True)
+        )
+        self.assertEqual(precios, {Decimal('321.00')})
@@ -0,0 +1,87 @@
+# cotizaciones/tests/test_cotizacion_list.py
+import pytest
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from cotizaciones.models import Cotizacion
+from cotizaciones.serializers import CotizacionSerializer
+from .factories import ProductoFactory, UserFactory, crear_cotizacion_completa
+
+
+@pytest.mark.django_db
+class TestListadoLiviano(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=UserFactory(is_superuser=True))
+        self.productos = ProductoFactory.create_batch(3)
+
+    def _crear(self, cantidad, items_por_ambiente=5):
+        return [
+            crear_cotizacion_completa(num_ambientes=2, items_por_ambiente=items_por_ambiente, productos=self.productos)
+            for _ in range(cantidad)
+        ]
+
+    def _listar(self, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('cotizacion-list'), {'page_size': 100, **params})
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_campos_del_encabezado_y_cantidad_de_items(self):
+        cotizacion, = self._crear(1, items_por_ambiente=4)
+
+        response, _ = self._listar()
+
+        fila, = response.data['results']
+        self.assertNotIn('ambientes', fila)
+        self.assertEqual(fila['id'], cotizacion.pk)
+        self.assertEqual(fila['numero'], cotizacion.numero)
+        self.assertEqual(fila['cliente_nombre'], cotizacion.cliente.nombre)
+        self.assertEqual(fila['vendedor_nombre'], cotizacion.vendedor.nombre)
+        self.assertEqual(fila['total_items'], 8)
+        self.assertEqual(fila['total_general'], str(cotizacion.total_general))
+
+    def test_consultas_no_crecen_con_las_filas_ni_los_items(self):
+        self._crear(2, items_por_ambiente=1)
+        _, pocas = self._listar()
+
+        self._crear(20, items_por_ambiente=10)
+        response, muchas = self._listar()
+
+        self.assertEqual(response.data['count'], 22)
+        self.assertEqual(muchas, pocas)
+
+    def test_payload_mucho_menor_que_el_anidado(self):
+        self._crear(10, items_por_ambiente=10)
+
+        response, consultas = self._listar()
+
+        anidado = JSONRenderer().render(CotizacionSerializer(
+            Cotizacion.objects.prefetch_related('ambientes__items__producto'), many=True
+        ).data)
+        # 10 cotizaciones x 20 ítems: el listado pesa una fracción del árbol completo
+        self.assertLess(len(response.content) * 10, len(anidado))
+        self.assertLessEqual(consultas, 3)
+
+    def test_filtros_y_orden_siguen_funcionando(self):
+        chica, grande = self._crear(1, items_por_ambiente=1) + self._crear(1, items_por_ambiente=10)
+
+        response, _ = self._listar(ordering='-total_general')
+        self.assertEqual([r['id'] for r in response.data['results']], [grande.pk, chica.pk])
+
+        response, _ = self._listar(search=chica.numero)
+        self.assertEqual([r['id'] for r in response.data['results']], [chica.pk])
+        self.assertEqual(response.data['results'][0]['total_items'], 2)
+
+    def test_detalle_mantiene_el_arbol_anidado(self):
+        cotizacion, = self._crear(1, items_por_ambiente=3)
+
+        response = self.client.get(reverse('cotizacion-detail', kwargs={'pk': cotizacion.pk}))
+
+        self.assertEqual(len(response.data['ambientes']), 2)
+        self.assertEqual(len(response.data['ambientes'][0]['items']), 3)
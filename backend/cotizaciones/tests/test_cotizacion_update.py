@@ -0,0 +1,186 @@
+# cotizaciones/tests/test_cotizacion_update.py
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from cotizaciones.models import CotizacionAmbiente, CotizacionItem
+from cotizaciones.serializers import CotizacionSerializer
+from cotizaciones.services import CAMPOS_ITEM_DIFF
+from .factories import UserFactory, crear_cotizacion_completa
+
+
+def _payload_desde(cotizacion):
+    """Payload de edición tal como lo arma el frontend: con ids de ambientes e ítems"""
+    return {
+        'cliente': cotizacion.cliente_id,
+        'fecha_validez': str(cotizacion.fecha_validez),
+        'descuento_total': str(cotizacion.descuento_total),
+        'ambientes': [
+            {
+                'id': ambiente.id,
+                'nombre': ambiente.nombre,
+                'orden': ambiente.orden,
+                'items': [
+                    {
+                        'id': item.id,
+                        'numero_item': item.numero_item,
+                        'producto_id': item.producto_id,
+                        'cantidad': str(item.cantidad),
+                        'ancho': str(item.ancho),
+                        'alto': str(item.alto),
+                        'porcentaje_descuento': str(item.porcentaje_descuento),
+                        'atributos_seleccionados': item.atributos_seleccionados,
+                    }
+                    for item in ambiente.items.order_by('numero_item')
+                ],
+            }
+            for ambiente in cotizacion.ambientes.order_by('orden')
+        ],
+    }
+
+
+@pytest.mark.django_db
+class TestActualizacionPorDiff(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory(is_superuser=True)
+        self.request = type('Request', (), {'user': self.user})()
+        self.cotizacion = crear_cotizacion_completa(num_ambientes=2, items_por_ambiente=3)
+
+    def _guardar(self, payload):
+        serializer = CotizacionSerializer(
+            self.cotizacion, data=payload, context={'request': self.request}
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with CaptureQueriesContext(connection) as ctx:
+            serializer.save()
+        return ctx.captured_queries
+
+    def _items(self):
+        return {
+            item.id: item
+            for item in CotizacionItem.objects.filter(ambiente__cotizacion=self.cotizacion)
+        }
+
+    def test_payload_sin_cambios_no_escribe_filas(self):
+        antes = self._items()
+
+        consultas = self._guardar(_payload_desde(self.cotizacion))
+
+        sql = [q['sql'] for q in consultas]
+        self.assertFalse([s for s in sql if 'cotizaciones_cotizacionitem' in s and not s.startswith('SELECT')])
+        self.assertFalse([s for s in sql if 'cotizaciones_cotizacionambiente' in s and not s.startswith('SELECT')])
+        despues = self._items()
+        self.assertEqual(set(despues), set(antes))
+        for pk, item in despues.items():
+            self.assertEqual(item.updated_at, antes[pk].updated_at)
+
+    def test_solo_se_actualiza_la_fila_modificada(self):
+        payload = _payload_desde(self.cotizacion)
+        modificado = payload['ambientes'][1]['items'][0]
+        modificado['cantidad'] = '5.00'
+        antes = self._items()
+
+        self._guardar(payload)
+
+        despues = self._items()
+        item = despues[modificado['id']]
+        self.assertEqual(item.cantidad, Decimal('5.00'))
+        self.assertEqual(item.precio_total, item.precio_unitario * item.ancho * item.alto * 5)
+        self.assertGreater(item.updated_at, antes[item.id].updated_at)
+        self.assertEqual(item.usuario_modificacion, self.user)
+        for pk in set(despues) - {item.id}:
+            self.assertEqual(despues[pk].updated_at, antes[pk].updated_at)
+
+        self.cotizacion.refresh_from_db()
+        self.assertEqual(self.cotizacion.total_neto, sum(i.precio_total for i in despues.values()))
+
+    def test_reordenar_items_respeta_la_restriccion_unica(self):
+        payload = _payload_desde(self.cotizacion)
+        items = payload['ambientes'][0]['items']
+        ids = [item['id'] for item in reversed(items)]
+        payload['ambientes'][0]['items'] = list(reversed(items))
+
+        self._guardar(payload)
+
+        ambiente = CotizacionAmbiente.objects.get(pk=payload['ambientes'][0]['id'])
+        self.assertEqual(list(ambiente.items.order_by('numero_item').values_list('id', flat=True)), ids)
+
+    def test_altas_bajas_y_reorden_de_ambientes(self):
+        payload = _payload_desde(self.cotizacion)
+        primero, segundo = payload['ambientes']
+        eliminado = primero['items'].pop(0)
+        nuevo = dict(primero['items'][0], cantidad='3.00')
+        del nuevo['id']
+        primero['items'].append(nuevo)
+        payload['ambientes'] = [
+            segundo,
+            {'nombre': 'Terraza', 'items': [dict(nuevo)]},
+        ]
+
+        self._guardar(payload)
+
+        ambientes = list(self.cotizacion.ambientes.order_by('orden'))
+        self.assertEqual([a.nombre for a in ambientes], [segundo['nombre'], 'Terraza'])
+        self.assertEqual([a.orden for a in ambientes], [1, 2])
+        self.assertEqual(ambientes[0].id, segundo['id'])
+        self.assertFalse(CotizacionAmbiente.objects.filter(pk=primero['id']).exists())
+        self.assertFalse(CotizacionItem.objects.filter(pk=eliminado['id']).exists())
+
+        terraza = ambientes[1].items.get()
+        self.assertEqual(terraza.numero_item, 1)
+        self.assertEqual(terraza.cantidad, Decimal('3.00'))
+        self.assertEqual(terraza.usuario_creacion, self.user)
+        self.assertEqual(terraza.precio_total, terraza.precio_unitario * terraza.ancho * terraza.alto * 3)
+
+    def test_enviar_el_producto_toma_de_nuevo_el_precio_de_lista(self):
+        item = CotizacionItem.objects.filter(ambiente__cotizacion=self.cotizacion).select_related('producto').first()
+        item.producto.precio_base = Decimal('250.00')
+        item.producto.save()
+
+        self._guardar(_payload_desde(self.cotizacion))
+
+        item.refresh_from_db()
+        self.assertEqual(item.precio_unitario, Decimal('250.00'))
+        self.assertEqual(item.precio_total, Decimal('250.00') * item.ancho * item.alto * item.cantidad)
+
+    def test_consultas_no_crecen_con_los_items(self):
+        def consultas_al_modificar_todo():
+            payload = _payload_desde(self.cotizacion)
+            for ambiente in payload['ambientes']:
+                for item in ambiente['items']:
+                    item['cantidad'] = str(Decimal(item['cantidad']) + 1)
+            return len(self._guardar(payload))
+
+        chica = consultas_al_modificar_todo()
+        self.cotizacion = crear_cotizacion_completa(num_ambientes=2, items_por_ambiente=60)
+        grande = consultas_al_modificar_todo()
+
+        # bulk_update agrupa las filas en lotes limitados por el backend (SQLite: 999 parámetros)
+        campos = [CotizacionItem._meta.pk] * 2 + [
+            CotizacionItem._meta.get_field(f) for f in CAMPOS_ITEM_DIFF + ['updated_at', 'usuario_modificacion']
+        ]
+        lotes = -(-120 // connection.ops.bulk_batch_size(campos, [None] * 120))
+        self.assertEqual(grande, chica + lotes - 1)
+
+    def test_endpoint_actualiza_con_ids_del_frontend(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        payload = _payload_desde(self.cotizacion)
+        ids = set(self._items())
+
+        response = client.put(
+            reverse('cotizacion-detail', kwargs={'pk': self.cotizacion.pk}), payload, format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(self._items()), ids)
+        self.assertEqual(
+            [a['id'] for a in response.data['ambientes']],
+            [a['id'] for a in payload['ambientes']],
+        )
@@ -0,0 +1,140 @@
+# cotizaciones/tests/test_pdf_assets.py
+import io
+import tempfile
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+from common import pdf_assets
+from common.pdf_benchmark import limpiar_registro_pdf
+from cotizaciones import pdf_generator
+from .factories import crear_cotizacion_completa
+
+
+@pytest.mark.django_db
+@override_settings(PDF_CACHE_DIR=tempfile.mkdtemp(prefix='cotidomo-pdf-cache-'))
+class TestRegistroRecursosPdf(TestCase):
+
+    def setUp(self):
+        limpiar_registro_pdf()
+        self.addCleanup(limpiar_registro_pdf)
+
+    def test_registro_se_construye_una_vez(self):
+        """Estilos, logo y bloques traducidos se reutilizan entre llamadas"""
+        self.assertIs(pdf_generator.get_pdf_styles(), pdf_generator.get_pdf_styles())
+        self.assertIs(pdf_generator.get_logo(), pdf_generator.get_logo())
+        self.assertIs(pdf_generator.get_static_blocks('pt'), pdf_generator.get_static_blocks('pt'))
+        self.assertEqual(
+            len(pdf_generator.get_static_blocks('en')['terms']),
+            len(pdf_generator.TRANSLATIONS['en']['terms'])
+        )
+
+    def test_logo_reducido_a_resolucion_de_impresion(self):
+        """El logo de 1024 px se guarda al tamaño necesario para 2.5 cm a 300 dpi"""
+        logo = pdf_generator.get_logo()
+        self.assertIsNotNone(logo)
+        ancho, alto = logo.getSize()
+        self.assertLessEqual(ancho, round(pdf_generator.LOGO_SIZE / 72 * pdf_assets.PRINT_DPI))
+        self.assertLessEqual(alto, round(pdf_generator.LOGO_SIZE / 72 * pdf_assets.PRINT_DPI))
+
+    def test_renders_sucesivos_no_reconstruyen_recursos(self):
+        """Tras el primer render no se vuelve a crear la hoja de estilos ni a decodificar el logo"""
+        cotizacion = crear_cotizacion_completa(num_ambientes=2, items_por_ambiente=2)
+        pdf_generator.generate_cotizacion_pdf(cotizacion, language='es')
+
+        with mock.patch.object(pdf_generator, 'getSampleStyleSheet') as sample_mock, \
+                mock.patch.object(pdf_assets, 'ImageReader') as reader_mock:
+            buffer = pdf_generator.generate_cotizacion_pdf(cotizacion, language='es')
+
+        sample_mock.assert_not_called()
+        reader_mock.assert_not_called()
+        self.assertTrue(buffer.getvalue().startswith(b'%PDF'))
+
+    def test_logo_inexistente_usa_solo_el_tagline(self):
+        cotizacion = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1)
+
+        with mock.patch.object(pdf_generator, 'LOGO_PATH', '/no/existe/logo.png'):
+            buffer = pdf_generator.generate_cotizacion_pdf(cotizacion, language='en')
+
+        self.assertTrue(buffer.getvalue().startswith(b'%PDF'))
+
+    def test_benchmark_reporta_ahorro(self):
+        salida = io.StringIO()
+
+        call_command('benchmark_pdf', registro=True, tamanos='2', idiomas='es', repeticiones=2, stdout=salida)
+
+        self.assertIn('Ahorro por render', salida.getvalue())
+
+
+class TestContratoReportlab(SimpleTestCase):
+    """
+    parse_paragraph usa el parser interno de reportlab.platypus.paragraph:
+    si una versión nueva de reportlab lo cambia, estos tests lo detectan.
+    """
+
+    def test_fragmentos_iguales_a_un_paragraph(self):
+        style = pdf_generator.get_pdf_styles()['terms']
+        for texto in [
+            '<b>Términos</b> y condiciones &amp; garantía',
+            'Línea uno<br/>línea <i>dos</i> con <font size="6">letra chica</font>',
+            '  Texto   con   espacios\n  y saltos  ',
+        ]:
+            referencia = Paragraph(texto, style)
+            cacheado = pdf_assets.new_paragraph(pdf_assets.parse_paragraph(texto, style), style)
+
+            atributos = lambda p: [(f.text, f.fontName, f.fontSize) for f in p.frags]
+            self.assertEqual(atributos(cacheado), atributos(referencia), texto)
+            self.assertEqual(cacheado.wrap(200, 1000), referencia.wrap(200, 1000), texto)
+
+    def test_marcado_invalido(self):
+        with self.assertRaises(ValueError):
+            pdf_assets.parse_paragraph('<b>sin cerrar', pdf_generator.get_pdf_styles()['normal'])
+
+    def test_shared_image_dibuja_el_reader(self):
+        reader = pdf_assets.load_image(pdf_generator.LOGO_PATH, 40, 40)
+
+        def documento(*tamanos):
+            buffer = io.BytesIO()
+            SimpleDocTemplate(buffer).build([pdf_assets.SharedImage(reader, width=t, height=t) for t in tamanos])
+            return buffer.getvalue()
+
+        self.assertEqual(pdf_assets.SharedImage(reader, width=40, height=40).wrap(500, 500), (40, 40))
+        una = documento(40)
+        self.assertIn(b'/Subtype /Image', una)
+        # La misma imagen se incrusta una sola vez aunque se dibuje dos veces
+        self.assertEqual(documento(40, 20).count(b'/Subtype /Image'), una.count(b'/Subtype /Image'))
+
+
+def _dibujar_sin_form(canvas, name, draw_fn):
+    """Variante de stamp_form que redibuja el contenido en cada página."""
+    draw_fn(canvas)
+
+
+@pytest.mark.django_db
+@override_settings(PDF_CACHE_DIR=tempfile.mkdtemp(prefix='cotidomo-pdf-cache-'))
+class TestEncabezadoPiePdf(TestCase):
+
+    def test_chrome_se_dibuja_una_vez_por_documento(self):
+        """En un documento de varias páginas el encabezado/pie se captura una sola vez"""
+        cotizacion = crear_cotizacion_completa(num_ambientes=10, items_por_ambiente=10)
+
+        with mock.patch.object(
+            pdf_generator, 'draw_page_chrome', wraps=pdf_generator.draw_page_chrome
+        ) as chrome_mock:
+            contenido = pdf_generator.generate_cotizacion_pdf(cotizacion, language='es').getvalue()
+
+        self.assertGreater(contenido.count(b'/Type /Page\n'), 1)
+        self.assertEqual(chrome_mock.call_count, 1)
+        self.assertEqual(contenido.count(b'/Subtype /Form'), 1)
+
+    def test_form_reduce_el_tamano_del_documento(self):
+        cotizacion = crear_cotizacion_completa(num_ambientes=10, items_por_ambiente=10)
+
+        con_form = pdf_generator.generate_cotizacion_pdf(cotizacion, language='es').getvalue()
+        with mock.patch.object(pdf_generator, 'stamp_form', _dibujar_sin_form):
+            sin_form = pdf_generator.generate_cotizacion_pdf(cotizacion, language='es').getvalue()
+
+        self.assertLess(len(con_form), len(sin_form))
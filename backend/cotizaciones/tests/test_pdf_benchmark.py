@@ -0,0 +1,98 @@
+# cotizaciones/tests/test_pdf_benchmark.py
+import json
+import os
+import tempfile
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from common.pdf_benchmark import cargar_linea_base, comparar, ejecutar_suite, informe
+from cotizaciones.models import Cotizacion
+
+LINEA_BASE = os.path.join(settings.BASE_DIR, 'benchmarks', 'pdf_baseline.json')
+
+
+def _resultado(**metricas):
+    return {'documento': 'cotizacion', 'items': 10, 'idioma': 'es',
+            'ms': 100.0, 'pico_kb': 1000.0, 'consultas': 3, 'bytes': 50000, **metricas}
+
+
+class TestComparar(SimpleTestCase):
+
+    def setUp(self):
+        self.linea_base = {'resultados': [_resultado()]}
+
+    def test_dentro_de_la_tolerancia(self):
+        self.assertEqual(comparar([_resultado(ms=120.0, bytes=52000)], self.linea_base), [])
+
+    def test_detecta_regresiones_por_metrica(self):
+        regresiones = comparar([_resultado(ms=200.0, consultas=4)], self.linea_base)
+
+        self.assertEqual(len(regresiones), 2)
+        self.assertIn('ms 200.0 > 100.0', regresiones[0])
+        self.assertIn('consultas 4 > 3', regresiones[1])
+
+    def test_metricas_sin_tolerancia_no_se_comparan(self):
+        tolerancias = {'ms': None, 'pico_kb': None, 'consultas': 0, 'bytes': 0.05}
+        self.assertEqual(comparar([_resultado(ms=900.0, pico_kb=9000.0)], self.linea_base, tolerancias), [])
+
+    def test_escenarios_nuevos_se_ignoran(self):
+        self.assertEqual(comparar([_resultado(items=5000, ms=1e6)], self.linea_base), [])
+
+
+@pytest.mark.django_db
+class TestSuiteBenchmarkPdf(TestCase):
+
+    def test_suite_mide_cada_documento_tamano_e_idioma(self):
+        resultados = ejecutar_suite(tamanos=(2, 12), idiomas=('es', 'en'), repeticiones=1)
+
+        self.assertEqual(len(resultados), 2 * 2 * 2)
+        for r in resultados:
+            self.assertGreater(r['ms'], 0)
+            self.assertGreater(r['pico_kb'], 0)
+            self.assertGreater(r['bytes'], 1000)
+        # Los documentos de prueba se revierten
+        self.assertFalse(Cotizacion.objects.exists())
+
+        por_escenario = {(r['documento'], r['items'], r['idioma']): r for r in resultados}
+        for documento in ('cotizacion', 'pedido'):
+            chico, grande = por_escenario[(documento, 2, 'es')], por_escenario[(documento, 12, 'es')]
+            # Las consultas no crecen con el número de ítems
+            self.assertEqual(chico['consultas'], grande['consultas'])
+            self.assertGreater(grande['bytes'], chico['bytes'])
+
+    def test_consultas_y_tamano_respecto_de_la_linea_base(self):
+        """Regresión contra la línea base versionada (sin tiempo ni memoria: dependen de la máquina)"""
+        linea_base = cargar_linea_base(LINEA_BASE)
+        menor = min(r['items'] for r in linea_base['resultados'])
+
+        resultados = ejecutar_suite(tamanos=(menor,), repeticiones=1)
+
+        tolerancias = {'ms': None, 'pico_kb': None, 'consultas': 0, 'bytes': 0.05}
+        self.assertEqual(comparar(resultados, linea_base, tolerancias), [])
+
+    def test_comando_guarda_json_y_falla_ante_regresiones(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = os.path.join(directorio, 'resultado.json')
+            call_command('benchmark_pdf', tamanos='2', idiomas='es', repeticiones=1,
+                         salida=salida, stdout=StringIO())
+
+            datos = cargar_linea_base(salida)
+            self.assertEqual(datos['version'], 1)
+            self.assertEqual(len(datos['resultados']), 2)
+            self.assertIn('reportlab', datos['entorno'])
+
+            # Una línea base imposible de cumplir produce error (exit != 0 en CI)
+            for r in datos['resultados']:
+                r.update(consultas=0, bytes=1)
+            estricta = os.path.join(directorio, 'estricta.json')
+            with open(estricta, 'w', encoding='utf-8') as f:
+                json.dump(informe(datos['resultados']), f)
+
+            with self.assertRaises(CommandError):
+                call_command('benchmark_pdf', tamanos='2', idiomas='es', repeticiones=1,
+                             comparar=estricta, sin_tiempo=True, stdout=StringIO(), stderr=StringIO())
@@ -0,0 +1,118 @@
+# cotizaciones/tests/test_pdf_cache.py
+import os
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from common.pdf_cache import PDFCache, get_pdf_cache
+from cotizaciones.models import Cotizacion, CotizacionItem
+from cotizaciones import pdf_generator
+from .factories import UserFactory, crear_cotizacion_completa
+
+
+@pytest.mark.django_db
+@override_settings(PDF_CACHE_DIR=tempfile.mkdtemp(prefix='cotidomo-pdf-cache-'))
+class TestCotizacionPdfCache(TestCase):
+
+    def setUp(self):
+        get_pdf_cache().clear()
+        self.cotizacion = crear_cotizacion_completa(num_ambientes=2, items_por_ambiente=2)
+        self.user = UserFactory(is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('cotizacion-generar-pdf', kwargs={'pk': self.cotizacion.pk})
+
+    def _download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.getvalue()
+
+    def test_repeated_download_is_served_from_cache(self):
+        """La segunda descarga no vuelve a generar el PDF"""
+        with mock.patch.object(
+            pdf_generator, 'generate_cotizacion_pdf', wraps=pdf_generator.generate_cotizacion_pdf
+        ) as generate:
+            primero = self._download()
+            segundo = self._download()
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(primero, segundo)
+
+    def test_item_save_invalidates_cache(self):
+        """Guardar un ítem cambia la huella del documento"""
+        cotizacion = Cotizacion.objects.get(pk=self.cotizacion.pk)
+        huella_antes = pdf_generator.get_cotizacion_pdf_fingerprint(cotizacion, 'es')
+
+        item = CotizacionItem.objects.filter(ambiente__cotizacion=cotizacion).first()
+        item.cantidad = Decimal('3.00')
+        item.save()
+
+        cotizacion = Cotizacion.objects.get(pk=self.cotizacion.pk)
+        self.assertNotEqual(pdf_generator.get_cotizacion_pdf_fingerprint(cotizacion, 'es'), huella_antes)
+
+    def test_recalculate_totals_invalidates_cache(self):
+        cotizacion = Cotizacion.objects.get(pk=self.cotizacion.pk)
+        huella_antes = pdf_generator.get_cotizacion_pdf_fingerprint(cotizacion, 'es')
+
+        cotizacion.recalculate_totals()
+
+        self.assertNotEqual(pdf_generator.get_cotizacion_pdf_fingerprint(cotizacion, 'es'), huella_antes)
+
+    def test_language_is_part_of_fingerprint(self):
+        cotizacion = Cotizacion.objects.get(pk=self.cotizacion.pk)
+        self.assertNotEqual(
+            pdf_generator.get_cotizacion_pdf_fingerprint(cotizacion, 'es'),
+            pdf_generator.get_cotizacion_pdf_fingerprint(cotizacion, 'pt'),
+        )
+
+
+class TestPDFCacheEviction(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='cotidomo-pdf-lru-')
+        self.cache = PDFCache(self.directory, max_bytes=250)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.put('a', b'a' * 100)
+        self.cache.put('b', b'b' * 100)
+
+        # Marcar 'a' como usada recientemente
+        past = time.time() - 60
+        os.utime(self.cache.path_for('b'), (past, past))
+        self.cache.open('a').close()
+
+        self.cache.put('c', b'c' * 100)
+
+        self.assertTrue(self.cache.path_for('a').exists())
+        self.assertFalse(self.cache.path_for('b').exists())
+        self.assertTrue(self.cache.path_for('c').exists())
+
+    def test_get_or_render_only_renders_on_miss(self):
+        render = mock.Mock(return_value=b'%PDF-test')
+
+        with self.cache.get_or_render('doc', render) as handle:
+            self.assertEqual(handle.read(), b'%PDF-test')
+        with self.cache.get_or_render('doc', render) as handle:
+            self.assertEqual(handle.read(), b'%PDF-test')
+
+        render.assert_called_once()
+
+    def test_get_or_render_sobrevive_a_una_expulsion_concurrente(self):
+        """Si otro proceso expulsa la entrada entre el put y el open, se sirve igual"""
+        put = self.cache.put
+
+        def put_y_expulsar(key, buffer):
+            path = put(key, buffer)
+            path.unlink()
+            return path
+
+        with mock.patch.object(self.cache, 'put', side_effect=put_y_expulsar):
+            with self.cache.get_or_render('doc', lambda: b'%PDF-test') as handle:
+                self.assertEqual(handle.read(), b'%PDF-test')
+                self.assertTrue(handle.name.endswith('.pdf'))
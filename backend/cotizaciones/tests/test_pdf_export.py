@@ -0,0 +1,149 @@
+# cotizaciones/tests/test_pdf_export.py
+import io
+import tempfile
+import zipfile
+from unittest import mock
+
+import pytest
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from common.models import TrabajoRenderPDF
+from common.pdf_cache import get_pdf_cache
+from common.pdf_export import ERRORES_FILENAME, stream_pdf_zip
+from common.pdf_jobs import procesar_siguiente, render_document
+from cotizaciones.models import Cotizacion
+from .factories import UserFactory, crear_cotizacion_completa
+
+
+@pytest.mark.django_db
+@override_settings(
+    PDF_CACHE_DIR=tempfile.mkdtemp(prefix='cotidomo-pdf-cache-'),
+)
+class TestExportarPdfZip(TestCase):
+
+    def setUp(self):
+        get_pdf_cache().clear()
+        self.user = UserFactory(is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        # El consumidor corre aparte; aquí avanza un trabajo en cada espera de la exportación
+        patcher = mock.patch('common.pdf_export.time.sleep', side_effect=lambda segundos: self._consumidor())
+        self.sleep_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.en_consumidor = False
+
+    def _consumidor(self):
+        self.en_consumidor = True
+        try:
+            procesar_siguiente()
+        finally:
+            self.en_consumidor = False
+
+    def _leer_zip(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertTrue(response.streaming)
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_exporta_cotizaciones_filtradas(self):
+        """El ZIP contiene un PDF por cada cotización que cumple los filtros"""
+        enviadas = [crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=2) for _ in range(3)]
+        Cotizacion.objects.filter(pk__in=[c.pk for c in enviadas]).update(
+            estado=Cotizacion.EstadoCotizacion.ENVIADA
+        )
+        crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1)  # BORRADOR, fuera del filtro
+
+        response = self.client.get(reverse('cotizacion-exportar-pdf'), {'estado': 'ENVIADA'})
+        zf = self._leer_zip(response)
+
+        self.assertIsNone(zf.testzip())
+        esperados = {f"Cotizacion_{Cotizacion.objects.get(pk=c.pk).numero}.pdf" for c in enviadas}
+        self.assertEqual(set(zf.namelist()), esperados)
+        for nombre in zf.namelist():
+            self.assertTrue(zf.read(nombre).startswith(b'%PDF'))
+
+    def test_stream_entrega_varios_bloques(self):
+        """El ZIP se produce incrementalmente, no en un único bloque al final"""
+        ids = [crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1).pk for _ in range(2)]
+
+        chunks = [chunk for chunk in stream_pdf_zip(TrabajoRenderPDF.TipoDocumento.COTIZACION, ids, 'es') if chunk]
+
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(len(zipfile.ZipFile(io.BytesIO(b''.join(chunks))).namelist()), 2)
+
+    def test_documento_con_error_no_interrumpe_la_exportacion(self):
+        """Un documento que falla se lista en ERRORES.txt y el resto se exporta"""
+        buena = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1)
+        ids = [buena.pk, 999999]
+
+        zf = zipfile.ZipFile(io.BytesIO(b''.join(
+            stream_pdf_zip(TrabajoRenderPDF.TipoDocumento.COTIZACION, ids, 'es')
+        )))
+
+        self.assertIn(ERRORES_FILENAME, zf.namelist())
+        self.assertIn(b'999999', zf.read(ERRORES_FILENAME))
+        self.assertEqual(len(zf.namelist()), 2)
+
+    def test_la_respuesta_no_renderiza(self):
+        """El worker web solo encola y espera: los PDFs los genera el consumidor"""
+        ids = [crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1).pk for _ in range(2)]
+        renders = []
+
+        def _render(*args):
+            renders.append(self.en_consumidor)
+            return render_document(*args)
+
+        with mock.patch('common.pdf_jobs.render_document', side_effect=_render):
+            zf = zipfile.ZipFile(io.BytesIO(b''.join(
+                stream_pdf_zip(TrabajoRenderPDF.TipoDocumento.COTIZACION, ids, 'es', self.user)
+            )))
+
+        self.assertEqual(len(zf.namelist()), 2)
+        self.assertEqual(renders, [True, True])
+        self.assertEqual(TrabajoRenderPDF.objects.filter(objeto_id__in=ids, usuario_creacion=self.user).count(), 2)
+
+    def test_pdf_expulsado_antes_de_leer_se_regenera(self):
+        """Si la caché expulsa el PDF entre el render y la lectura, el trabajo se reencola"""
+        cotizacion = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1)
+
+        def _consumidor_con_expulsion():
+            procesar_siguiente()
+            if self.sleep_mock.call_count == 1:
+                get_pdf_cache().clear()
+
+        self.sleep_mock.side_effect = lambda segundos: _consumidor_con_expulsion()
+        with mock.patch('common.pdf_jobs.render_document', wraps=render_document) as render_mock:
+            zf = zipfile.ZipFile(io.BytesIO(b''.join(
+                stream_pdf_zip(TrabajoRenderPDF.TipoDocumento.COTIZACION, [cotizacion.pk], 'es')
+            )))
+
+        self.assertEqual(render_mock.call_count, 2)
+        nombre = f"Cotizacion_{Cotizacion.objects.get(pk=cotizacion.pk).numero}.pdf"
+        self.assertEqual(zf.namelist(), [nombre])
+        self.assertTrue(zf.read(nombre).startswith(b'%PDF'))
+
+    @override_settings(PDF_EXPORTAR_ESPERA=0)
+    def test_sin_consumidor_se_agota_la_espera(self):
+        """Si nadie procesa la cola, la exportación termina listando los documentos en ERRORES.txt"""
+        self.sleep_mock.side_effect = None
+        ids = [crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1).pk for _ in range(2)]
+
+        zf = zipfile.ZipFile(io.BytesIO(b''.join(
+            stream_pdf_zip(TrabajoRenderPDF.TipoDocumento.COTIZACION, ids, 'es')
+        )))
+
+        self.assertEqual(zf.namelist(), [ERRORES_FILENAME])
+        self.assertEqual(zf.read(ERRORES_FILENAME).decode().count('Tiempo de espera agotado'), 2)
+
+    @override_settings(PDF_EXPORTAR_MAX=2)
+    def test_rechaza_exportaciones_sobre_el_maximo(self):
+        for _ in range(3):
+            crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1)
+
+        response = self.client.get(reverse('cotizacion-exportar-pdf'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TrabajoRenderPDF.objects.exists())
+        self.assertIn('Máximo 2', response.data['detail'])
@@ -0,0 +1,73 @@
+# cotizaciones/tests/test_pdf_generator.py
+import tempfile
+
+import pytest
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from cotizaciones.models import Cotizacion
+from cotizaciones.pdf_generator import generate_cotizacion_pdf, prefetch_cotizacion_pdf
+from .factories import UserFactory, crear_cotizacion_completa
+
+
+def _render_con_plan(cotizacion_id):
+    cotizacion = prefetch_cotizacion_pdf(Cotizacion.objects.filter(pk=cotizacion_id)).get()
+    return generate_cotizacion_pdf(cotizacion)
+
+
+@pytest.mark.django_db
+@override_settings(PDF_CACHE_DIR=tempfile.mkdtemp(prefix='cotidomo-pdf-cache-'))
+class TestCotizacionPdfQueryPlan(TestCase):
+
+    def test_plan_uses_three_queries(self):
+        """Encabezado + ambientes + ítems (con producto) en 3 consultas"""
+        cotizacion = crear_cotizacion_completa(num_ambientes=2, items_por_ambiente=3)
+
+        with self.assertNumQueries(3):
+            buffer = _render_con_plan(cotizacion.pk)
+
+        self.assertTrue(buffer.getvalue().startswith(b'%PDF'))
+
+    def test_query_count_is_constant_for_large_quote(self):
+        """Una cotización de 20 ambientes / 500 ítems usa las mismas consultas que una pequeña"""
+        pequena = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1)
+        grande = crear_cotizacion_completa(num_ambientes=20, items_por_ambiente=25)
+
+        with CaptureQueriesContext(connection) as pequena_ctx:
+            _render_con_plan(pequena.pk)
+        with CaptureQueriesContext(connection) as grande_ctx:
+            _render_con_plan(grande.pk)
+
+        self.assertEqual(len(grande_ctx.captured_queries), len(pequena_ctx.captured_queries))
+        self.assertEqual(len(grande_ctx.captured_queries), 3)
+
+    def test_generator_loads_plan_when_not_prefetched(self):
+        """Si recibe una instancia sin el plan, la recarga con un número fijo de consultas"""
+        cotizacion = crear_cotizacion_completa(num_ambientes=3, items_por_ambiente=10)
+        cotizacion = Cotizacion.objects.get(pk=cotizacion.pk)
+
+        with self.assertNumQueries(3):
+            generate_cotizacion_pdf(cotizacion)
+
+    def test_generar_pdf_endpoint_query_count_is_constant(self):
+        """El endpoint generar-pdf no depende del tamaño del documento"""
+        user = UserFactory(is_superuser=True)
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        pequena = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1)
+        grande = crear_cotizacion_completa(num_ambientes=20, items_por_ambiente=25)
+
+        with CaptureQueriesContext(connection) as pequena_ctx:
+            response = client.get(reverse('cotizacion-generar-pdf', kwargs={'pk': pequena.pk}))
+        self.assertEqual(response.status_code, 200)
+
+        with CaptureQueriesContext(connection) as grande_ctx:
+            response = client.get(reverse('cotizacion-generar-pdf', kwargs={'pk': grande.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+        self.assertEqual(len(grande_ctx.captured_queries), len(pequena_ctx.captured_queries))
@@ -0,0 +1,196 @@
+# cotizaciones/tests/test_pdf_jobs.py
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from common.models import TrabajoRenderPDF
+from common.pdf_cache import get_pdf_cache
+from common.pdf_jobs import encolar_trabajo, render_document
+from .factories import UserFactory, crear_cotizacion_completa
+
+
+@pytest.mark.django_db
+@override_settings(
+    PDF_CACHE_DIR=tempfile.mkdtemp(prefix='cotidomo-pdf-cache-'),
+)
+class TestTrabajosRenderPDF(TestCase):
+
+    def setUp(self):
+        get_pdf_cache().clear()
+        self.user = UserFactory(is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.cotizacion = crear_cotizacion_completa(num_ambientes=2, items_por_ambiente=3)
+
+    def _encolar(self):
+        url = reverse('cotizacion-generar-pdf-async', kwargs={'pk': self.cotizacion.pk})
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 202)
+        return response.data
+
+    def _procesar(self, **options):
+        salida = StringIO()
+        call_command('procesar_trabajos_pdf', una_vez=True, stdout=salida, **options)
+        return salida.getvalue()
+
+    def test_encolar_y_descargar_pdf(self):
+        """POST encola el trabajo; el GET del trabajo devuelve el PDF cuando el consumidor termina"""
+        with mock.patch('common.pdf_jobs.render_document') as render_mock, \
+                self.captureOnCommitCallbacks() as callbacks:
+            data = self._encolar()
+        # El request solo inserta la fila: ni render ni trabajo diferido en el worker web
+        render_mock.assert_not_called()
+        self.assertEqual(callbacks, [])
+        self.assertEqual(data['estado'], TrabajoRenderPDF.Estado.PENDIENTE)
+
+        self._procesar()
+        trabajo = TrabajoRenderPDF.objects.get(pk=data['id'])
+        self.assertEqual(trabajo.estado, TrabajoRenderPDF.Estado.COMPLETADO)
+        self.assertEqual(trabajo.usuario_creacion, self.user)
+
+        response = self.client.get(reverse('trabajo-pdf-detail', kwargs={'pk': trabajo.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_descarga_del_trabajo_revalida_y_reanuda(self):
+        """La descarga del trabajo tiene ETag (304) y rangos (206), como la del PDF directo"""
+        data = self._encolar()
+        self._procesar()
+        url = reverse('trabajo-pdf-detail', kwargs={'pk': data['id']})
+        etag = self.client.get(url)['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        parcial = self.client.get(url, HTTP_RANGE='bytes=0-3')
+        self.assertEqual(parcial.status_code, 206)
+        self.assertEqual(b''.join(parcial.streaming_content), b'%PDF')
+
+    def test_trabajo_pendiente_responde_202(self):
+        """Mientras el trabajo no termina, el polling responde 202"""
+        data = self._encolar()
+        self.assertEqual(data['estado'], TrabajoRenderPDF.Estado.PENDIENTE)
+
+        response = self.client.get(reverse('trabajo-pdf-detail', kwargs={'pk': data['id']}))
+        self.assertEqual(response.status_code, 202)
+
+    def test_trabajo_en_curso_se_reutiliza(self):
+        """Encolar dos veces el mismo documento no crea trabajos duplicados"""
+        primero = self._encolar()
+        segundo = self._encolar()
+        self.assertEqual(primero['id'], segundo['id'])
+        self.assertEqual(TrabajoRenderPDF.objects.count(), 1)
+
+    def test_pdf_expulsado_se_reencola(self):
+        """Si el PDF ya no está en caché, el trabajo se vuelve a generar"""
+        data = self._encolar()
+        self._procesar()
+        get_pdf_cache().clear()
+
+        url = reverse('trabajo-pdf-detail', kwargs={'pk': data['id']})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+
+        self._procesar()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_otro_usuario_no_ve_el_trabajo(self):
+        data = self._encolar()
+        otro = APIClient()
+        otro.force_authenticate(user=UserFactory())
+
+        response = otro.get(reverse('trabajo-pdf-detail', kwargs={'pk': data['id']}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_comando_procesa_pendientes(self):
+        """procesar_trabajos_pdf --una-vez vacía la cola en orden de llegada y termina"""
+        otra = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1)
+        trabajos = [
+            encolar_trabajo(TrabajoRenderPDF.TipoDocumento.COTIZACION, cotizacion.pk, 'es', self.user)
+            for cotizacion in (self.cotizacion, otra)
+        ]
+
+        with mock.patch('common.pdf_jobs.render_document', wraps=render_document) as render_mock:
+            self.assertIn('✅ 2 trabajos procesados (0 con error)', self._procesar())
+
+        self.assertEqual([c.args[1] for c in render_mock.call_args_list], [self.cotizacion.pk, otra.pk])
+        for trabajo in trabajos:
+            trabajo.refresh_from_db()
+            self.assertEqual(trabajo.estado, TrabajoRenderPDF.Estado.COMPLETADO)
+            self.assertTrue(get_pdf_cache().path_for(trabajo.clave_cache).exists())
+
+    @override_settings(PDF_CONSUMIDOR_INTERVALO=5)
+    def test_consumidor_espera_trabajos_nuevos(self):
+        """Sin --una-vez el comando sigue corriendo: con la cola vacía espera y vuelve a consultar"""
+        encolados = []
+
+        def _dormir(segundos):
+            if encolados:
+                raise KeyboardInterrupt
+            encolados.append(encolar_trabajo(
+                TrabajoRenderPDF.TipoDocumento.COTIZACION, self.cotizacion.pk, 'es', self.user
+            ))
+
+        salida = StringIO()
+        with mock.patch('time.sleep', side_effect=_dormir) as sleep_mock:
+            call_command('procesar_trabajos_pdf', stdout=salida)
+
+        sleep_mock.assert_called_with(5)
+        self.assertEqual(sleep_mock.call_count, 2)
+        encolados[0].refresh_from_db()
+        self.assertEqual(encolados[0].estado, TrabajoRenderPDF.Estado.COMPLETADO)
+        self.assertIn('✅ 1 trabajos procesados', salida.getvalue())
+
+    def test_comando_respeta_el_limite(self):
+        otra = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1)
+        for cotizacion in (self.cotizacion, otra):
+            encolar_trabajo(TrabajoRenderPDF.TipoDocumento.COTIZACION, cotizacion.pk, 'es', self.user)
+
+        call_command('procesar_trabajos_pdf', limite=1, stdout=StringIO())
+
+        self.assertEqual(
+            TrabajoRenderPDF.objects.filter(estado=TrabajoRenderPDF.Estado.PENDIENTE).count(), 1
+        )
+
+    def _atascar(self, trabajo, minutos):
+        TrabajoRenderPDF.objects.filter(pk=trabajo.pk).update(
+            estado=TrabajoRenderPDF.Estado.PROCESANDO, fecha_inicio=timezone.now() - timedelta(minutes=minutos)
+        )
+
+    @override_settings(PDF_TRABAJO_ATASCADO_MINUTOS=10)
+    def test_encolar_reintenta_un_trabajo_atascado(self):
+        """Un trabajo que quedó en PROCESANDO (worker caído) se retoma al volver a pedirlo"""
+        data = self._encolar()
+        trabajo = TrabajoRenderPDF.objects.get(pk=data['id'])
+
+        self._atascar(trabajo, 5)
+        self.assertEqual(self._encolar()['estado'], TrabajoRenderPDF.Estado.PROCESANDO)
+
+        self._atascar(trabajo, 30)
+        data = self._encolar()
+        self.assertEqual((data['id'], data['estado']), (trabajo.pk, TrabajoRenderPDF.Estado.PENDIENTE))
+
+        self._procesar(reintentar_atascados=0)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoRenderPDF.Estado.COMPLETADO)
+        self.assertEqual(TrabajoRenderPDF.objects.count(), 1)
+
+    @override_settings(PDF_TRABAJO_ATASCADO_MINUTOS=10)
+    def test_comando_retoma_atascados_por_defecto(self):
+        data = self._encolar()
+        trabajo = TrabajoRenderPDF.objects.get(pk=data['id'])
+        self._atascar(trabajo, 30)
+
+        self.assertIn('↺ 1 trabajos atascados', self._procesar())
+
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoRenderPDF.Estado.COMPLETADO)
@@ -0,0 +1,113 @@
+# cotizaciones/tests/test_pdf_prerender.py
+import tempfile
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from common.models import TrabajoRenderPDF
+from common.pdf_cache import get_pdf_cache
+from cotizaciones import pdf_generator
+from cotizaciones.models import Cotizacion
+from pedidos_servicio import pdf_generator as pedido_pdf_generator
+from pedidos_servicio.models import PedidoServicio
+from .factories import ClienteFactory, UserFactory, crear_cotizacion_completa
+
+
+@pytest.mark.django_db
+@override_settings(
+    PDF_PRERENDER_ON_TRANSITION=True,
+    PDF_CACHE_DIR=tempfile.mkdtemp(prefix='cotidomo-pdf-cache-'),
+)
+class TestPrerenderPdf(TestCase):
+
+    def setUp(self):
+        get_pdf_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=UserFactory(is_superuser=True))
+        self.cotizacion = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=3)
+
+    def _cambiar_estado(self, estado):
+        url = reverse('cotizacion-cambiar-estado', kwargs={'pk': self.cotizacion.pk})
+        response = self.client.post(url, {'estado': estado}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def _procesar(self):
+        call_command('procesar_trabajos_pdf', una_vez=True, stdout=StringIO())
+
+    def _en_cache(self):
+        cotizacion = Cotizacion.objects.get(pk=self.cotizacion.pk)
+        key = pdf_generator.get_cotizacion_pdf_fingerprint(cotizacion, 'es')
+        return get_pdf_cache().path_for(key).exists()
+
+    def test_enviar_deja_el_pdf_en_cache(self):
+        """La descarga posterior al envío no vuelve a generar el PDF"""
+        self._cambiar_estado(Cotizacion.EstadoCotizacion.ENVIADA)
+        trabajo = TrabajoRenderPDF.objects.get()
+        self.assertEqual((trabajo.objeto_id, trabajo.usuario_creacion), (self.cotizacion.pk, None))
+
+        self._procesar()
+        self.assertTrue(self._en_cache())
+
+        with mock.patch.object(pdf_generator, 'generate_cotizacion_pdf') as generate:
+            response = self.client.get(reverse('cotizacion-generar-pdf', kwargs={'pk': self.cotizacion.pk}))
+
+        self.assertEqual(response.status_code, 200)
+        generate.assert_not_called()
+
+    def test_aceptar_deja_el_pdf_en_cache(self):
+        url = reverse('cotizacion-accept-cotizacion', kwargs={'pk': self.cotizacion.pk})
+        response = self.client.post(url)
+
+        self.assertEqual(response.status_code, 200)
+        self._procesar()
+        self.assertTrue(self._en_cache())
+
+    def test_otras_transiciones_no_prerenderizan(self):
+        self.cotizacion.estado = Cotizacion.EstadoCotizacion.ENVIADA
+        self.cotizacion.save()
+
+        self._cambiar_estado(Cotizacion.EstadoCotizacion.RECHAZADA)
+
+        self.assertFalse(TrabajoRenderPDF.objects.exists())
+
+    @override_settings(PDF_PRERENDER_ON_TRANSITION=False)
+    def test_desactivado_por_defecto(self):
+        self._cambiar_estado(Cotizacion.EstadoCotizacion.ENVIADA)
+
+        self.assertFalse(TrabajoRenderPDF.objects.exists())
+
+    def test_error_de_render_no_afecta_la_transicion(self):
+        self._cambiar_estado(Cotizacion.EstadoCotizacion.ENVIADA)
+        with mock.patch.object(pdf_generator, 'generate_cotizacion_pdf', side_effect=RuntimeError('boom')):
+            self._procesar()
+
+        self.assertEqual(TrabajoRenderPDF.objects.get().estado, TrabajoRenderPDF.Estado.ERROR)
+        self.assertEqual(
+            Cotizacion.objects.get(pk=self.cotizacion.pk).estado, Cotizacion.EstadoCotizacion.ENVIADA
+        )
+        self.assertFalse(self._en_cache())
+
+    def test_crear_pedido_con_items_deja_el_pdf_en_cache(self):
+        cliente = ClienteFactory(numero_documento='12345678')
+        payload = {
+            'pedido': {'cliente_id': cliente.pk, 'solicitante': 'Rita López'},
+            'items': [
+                {'ambiente': 'Sala', 'modelo': 'Roller', 'tejido': 'Screen 5%',
+                 'largura': '2.50', 'altura': '1.80', 'cantidad_piezas': 2,
+                 'lado_comando': 'DERECHO', 'acionamiento': 'MANUAL'},
+            ],
+        }
+        response = self.client.post(reverse('pedido-servicio-crear-con-items'), payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self._procesar()
+
+        pedido = PedidoServicio.objects.select_related(
+            'cliente', 'manufacturador', 'instalador', 'usuario_creacion'
+        ).get(pk=response.data['pedido']['id'])
+        key = pedido_pdf_generator.get_pedido_pdf_fingerprint(pedido, 'es')
+        self.assertTrue(get_pdf_cache().path_for(key).exists())
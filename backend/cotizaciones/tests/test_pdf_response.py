@@ -0,0 +1,116 @@
+# cotizaciones/tests/test_pdf_response.py
+import tempfile
+
+import pytest
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from common.pdf_cache import get_pdf_cache
+from common.pdf_response import RangoNoSatisfacible, parse_range
+from pedidos_servicio.tests.factories import crear_pedido_con_items
+from .factories import ClienteFactory, UserFactory, crear_cotizacion_completa
+
+
+class TestParseRange(SimpleTestCase):
+
+    def test_rangos_validos(self):
+        self.assertEqual(parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(parse_range('bytes=900-', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(parse_range('bytes=990-5000', 1000), (990, 999))
+        self.assertEqual(parse_range('bytes=-5000', 1000), (0, 999))
+
+    def test_encabezados_que_no_aplican(self):
+        """Sintaxis inválida o varios rangos: se entrega el archivo completo"""
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 1000))
+        self.assertIsNone(parse_range('items=0-1', 1000))
+        self.assertIsNone(parse_range('bytes=-', 1000))
+        self.assertIsNone(parse_range('bytes=50-10', 1000))
+
+    def test_rango_fuera_del_archivo(self):
+        with self.assertRaises(RangoNoSatisfacible):
+            parse_range('bytes=1000-', 1000)
+        with self.assertRaises(RangoNoSatisfacible):
+            parse_range('bytes=-0', 1000)
+
+
+@pytest.mark.django_db
+@override_settings(PDF_CACHE_DIR=tempfile.mkdtemp(prefix='cotidomo-pdf-cache-'))
+class TestDescargaPdf(TestCase):
+
+    def setUp(self):
+        get_pdf_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=UserFactory(is_superuser=True))
+        cotizacion = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=3)
+        self.url = reverse('cotizacion-generar-pdf', kwargs={'pk': cotizacion.pk})
+
+    def test_descarga_completa_en_streaming(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        contenido = response.getvalue()
+        self.assertTrue(contenido.startswith(b'%PDF'))
+        self.assertEqual(int(response['Content-Length']), len(contenido))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('attachment;', response['Content-Disposition'])
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_if_none_match_responde_304(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_rango_reanuda_la_descarga(self):
+        completo = self.client.get(self.url)
+        contenido = completo.getvalue()
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE=completo['ETag'])
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.getvalue(), contenido[100:])
+        self.assertEqual(response['Content-Range'], f'bytes 100-{len(contenido) - 1}/{len(contenido)}')
+        self.assertEqual(int(response['Content-Length']), len(contenido) - 100)
+
+    def test_if_range_distinto_entrega_el_archivo_completo(self):
+        contenido = self.client.get(self.url).getvalue()
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-', HTTP_IF_RANGE='"otro"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.getvalue(), contenido)
+
+    def test_rango_no_satisfacible(self):
+        contenido = self.client.get(self.url).getvalue()
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(contenido)}-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(contenido)}')
+
+    def test_re_render_cambia_el_etag(self):
+        """Si la entrada se expulsa y se vuelve a generar, el ETag anterior deja de valer"""
+        etag = self.client.get(self.url)['ETag']
+        get_pdf_cache().clear()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_pedido_tambien_soporta_rangos(self):
+        pedido = crear_pedido_con_items(3, cliente=ClienteFactory(numero_documento='12345678'))
+        url = reverse('pedido-servicio-pdf', kwargs={'pk': pedido.pk})
+        contenido = self.client.get(url).getvalue()
+
+        response = self.client.get(url, HTTP_RANGE='bytes=0-9')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.getvalue(), contenido[:10])
+        self.assertIn('Pedido_', response['Content-Disposition'])
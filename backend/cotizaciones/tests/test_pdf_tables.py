@@ -0,0 +1,133 @@
+# cotizaciones/tests/test_pdf_tables.py
+import tempfile
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from reportlab.lib import colors
+
+from common.pdf_tables import TableLayout
+from cotizaciones import pdf_generator
+from cotizaciones.models import Cotizacion
+from .factories import crear_cotizacion_completa
+
+
+def _layout_de_items(num_items, dense=False):
+    layout = TableLayout(
+        base=[('VALIGN', (0, 0), (-1, -1), 'TOP')],
+        row_styles={
+            'header': [('BACKGROUND', 0, -1, colors.grey)],
+            'desc': [('SPAN', 0, 1)],
+        },
+    )
+    if dense:
+        layout.add_row('header', ['A', 'B'])
+    for i in range(num_items):
+        layout.start_group()
+        if not dense:
+            layout.add_row('header', ['A', 'B'])
+        layout.add_row('data', [str(i), str(i)])
+        layout.add_row('desc', [f'desc {i}', ''])
+    return layout
+
+
+class TestTableLayout(SimpleTestCase):
+
+    def test_filas_contiguas_del_mismo_tipo_forman_un_tramo(self):
+        layout = _layout_de_items(0, dense=True)
+        for i in range(3):
+            layout.add_row('data', [str(i), str(i)])
+        layout.add_row('header', ['A', 'B'])
+
+        self.assertEqual(layout.runs(), [('header', 0, 0), ('data', 1, 3), ('header', 4, 4)])
+        self.assertEqual(layout.commands(), [
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('BACKGROUND', (0, 4), (-1, 4), colors.grey),
+        ])
+
+    def test_span_se_emite_por_fila(self):
+        layout = _layout_de_items(0, dense=True)
+        layout.add_row('desc', ['a', ''])
+        layout.add_row('desc', ['b', ''])
+
+        spans = [cmd for cmd in layout.commands() if cmd[0] == 'SPAN']
+        self.assertEqual(spans, [('SPAN', (0, 1), (1, 1)), ('SPAN', (0, 2), (1, 2))])
+
+    def test_tabla_corta_no_se_trocea(self):
+        tablas = _layout_de_items(10).build_chunks(max_rows=150, colWidths=[50, 50])
+
+        self.assertEqual(len(tablas), 1)
+        self.assertEqual(len(tablas[0]._cellvalues), 30)
+
+    def test_trozos_cortan_entre_grupos(self):
+        layout = _layout_de_items(100)
+        tablas = layout.build_chunks(max_rows=40, colWidths=[50, 50])
+
+        filas = [len(tabla._cellvalues) for tabla in tablas]
+        self.assertEqual(sum(filas), len(layout))
+        self.assertTrue(all(n <= 40 and n % 3 == 0 for n in filas))
+        # Cada trozo empieza con el encabezado de un ítem
+        self.assertTrue(all(tabla._cellvalues[0] == ['A', 'B'] for tabla in tablas))
+
+    def test_trozos_repiten_el_encabezado(self):
+        layout = _layout_de_items(100, dense=True)
+        tablas = layout.build_chunks(max_rows=41, colWidths=[50, 50], repeatRows=1)
+
+        self.assertGreater(len(tablas), 1)
+        self.assertEqual(sum(len(tabla._cellvalues) - 1 for tabla in tablas), len(layout) - 1)
+        for tabla in tablas:
+            self.assertEqual(tabla._cellvalues[0], ['A', 'B'])
+            self.assertEqual(tabla.repeatRows, 1)
+            # Ningún trozo separa un ítem de su descripción
+            self.assertTrue(tabla._cellvalues[1][0].isdigit())
+
+
+@pytest.mark.django_db
+@override_settings(PDF_CACHE_DIR=tempfile.mkdtemp(prefix='cotidomo-pdf-cache-'))
+class TestCotizacionPdfDenso(TestCase):
+
+    def _cargar(self, cotizacion):
+        return pdf_generator.prefetch_cotizacion_pdf(Cotizacion.objects.filter(pk=cotizacion.pk)).get()
+
+    def test_modo_denso_genera_un_pdf_mas_liviano(self):
+        cotizacion = self._cargar(crear_cotizacion_completa(num_ambientes=2, items_por_ambiente=30))
+
+        estandar = pdf_generator.generate_cotizacion_pdf(cotizacion, language='es', dense=False).getvalue()
+        denso = pdf_generator.generate_cotizacion_pdf(cotizacion, language='es', dense=True).getvalue()
+
+        self.assertTrue(denso.startswith(b'%PDF'))
+        self.assertLess(len(denso), len(estandar))
+        self.assertLess(denso.count(b'/Type /Page\n'), estandar.count(b'/Type /Page\n'))
+
+    def test_umbral_de_modo_denso(self):
+        with override_settings(PDF_DENSE_MIN_ITEMS=0):
+            self.assertFalse(pdf_generator.use_dense_layout(10000))
+        with override_settings(PDF_DENSE_MIN_ITEMS=200):
+            self.assertFalse(pdf_generator.use_dense_layout(199))
+            self.assertTrue(pdf_generator.use_dense_layout(200))
+
+    def test_cambiar_el_umbral_invalida_la_cache(self):
+        cotizacion = self._cargar(crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=2))
+
+        with override_settings(PDF_DENSE_MIN_ITEMS=0):
+            huella_estandar = pdf_generator.get_cotizacion_pdf_fingerprint(cotizacion, 'es')
+        with override_settings(PDF_DENSE_MIN_ITEMS=1):
+            huella_densa = pdf_generator.get_cotizacion_pdf_fingerprint(cotizacion, 'es')
+
+        self.assertNotEqual(huella_estandar, huella_densa)
+
+
+@pytest.mark.django_db
+class TestBenchmarkPdfTablas(TestCase):
+
+    def test_comando_compara_ambos_modos_y_no_deja_datos(self):
+        out = StringIO()
+        call_command('benchmark_pdf_tablas', items=5, repeticiones=1, stdout=out)
+
+        salida = out.getvalue()
+        self.assertIn('Cotización', salida)
+        self.assertIn('Pedido', salida)
+        self.assertEqual(salida.count('denso:'), 2)
+        self.assertFalse(Cotizacion.objects.exists())
@@ -0,0 +1,158 @@
+# cotizaciones/tests/test_revisiones.py
+import json
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from cotizaciones.models import CotizacionRevision
+from cotizaciones.revisiones import RevisionService, aplicar_delta, calcular_delta, foto_cotizacion
+from cotizaciones.serializers import CotizacionSerializer
+from .factories import ClienteFactory, CorrelativoCotizacionFactory, ProductoFactory, UserFactory
+from .test_cotizacion_create import _payload
+from .test_cotizacion_update import _payload_desde
+
+
+class TestDeltas(SimpleTestCase):
+
+    def test_ida_y_vuelta(self):
+        antes = {
+            'encabezado': {'cliente': 1, 'vendedor': None, 'descuento_total': '0.00'},
+            'ambientes': {
+                '1': {'nombre': 'Sala', 'items': {'10': {'cantidad': '1.00', 'atributos': {'tejido': 'Linho'}}}},
+                '2': {'nombre': 'Cocina', 'items': {}},
+            },
+        }
+        despues = {
+            'encabezado': {'cliente': 1, 'vendedor': 4, 'descuento_total': '0.00'},
+            'ambientes': {
+                '1': {'nombre': 'Sala', 'items': {'10': {'cantidad': '2.00', 'atributos': {}}, '11': {'cantidad': '1.00'}}},
+            },
+        }
+
+        delta = calcular_delta(antes, despues)
+
+        self.assertEqual(aplicar_delta(antes, delta), despues)
+        anidados = delta['anidados']
+        self.assertEqual(anidados['encabezado'], {'valores': {'vendedor': 4}})
+        self.assertEqual(anidados['ambientes']['eliminadas'], ['2'])
+        sala = anidados['ambientes']['anidados']['1']
+        self.assertEqual(set(sala), {'anidados'})
+        self.assertEqual(sala['anidados']['items']['anidados']['10']['anidados']['atributos'], {'eliminadas': ['tejido']})
+
+    def test_claves_del_usuario_no_se_confunden_con_el_formato(self):
+        antes = {'atributos': {'$del': ['x'], 'eliminadas': 1, 'valores': {'a': 1}}}
+        despues = {'atributos': {'$del': ['y'], 'valores': {'a': 2}, 'anidados': {}}}
+
+        self.assertEqual(aplicar_delta(antes, calcular_delta(antes, despues)), despues)
+        self.assertEqual(aplicar_delta(despues, calcular_delta(despues, antes)), antes)
+
+    def test_sin_cambios_delta_vacio(self):
+        foto = {'a': {'b': [1, 2]}, 'c': None}
+        self.assertEqual(calcular_delta(foto, json.loads(json.dumps(foto))), {})
+
+    def test_aplicar_no_modifica_la_foto(self):
+        foto = {'a': {'b': 1}}
+        aplicar_delta(foto, {'anidados': {'a': {'valores': {'b': 2}}}})
+        self.assertEqual(foto, {'a': {'b': 1}})
+
+
+@pytest.mark.django_db
+@override_settings(COTIZACION_REVISION_CHECKPOINT=3)
+class TestHistorialDeRevisiones(TestCase):
+
+    def setUp(self):
+        CorrelativoCotizacionFactory()
+        self.user = UserFactory(is_superuser=True)
+        self.request = type('Request', (), {'user': self.user})()
+        serializer = CotizacionSerializer(
+            data=_payload(ClienteFactory(), ProductoFactory.create_batch(2), 2, 5),
+            context={'request': self.request},
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.cotizacion = serializer.save()
+
+    def _editar(self, modificar):
+        payload = _payload_desde(self.cotizacion)
+        modificar(payload)
+        serializer = CotizacionSerializer(self.cotizacion, data=payload, context={'request': self.request})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        return foto_cotizacion(self.cotizacion)
+
+    def _cambiar_cantidad(self, cantidad):
+        def modificar(payload):
+            payload['ambientes'][0]['items'][0]['cantidad'] = cantidad
+        return modificar
+
+    def test_crear_registra_un_checkpoint(self):
+        revision = CotizacionRevision.objects.get(cotizacion=self.cotizacion)
+
+        self.assertEqual(revision.numero, 1)
+        self.assertTrue(revision.es_checkpoint)
+        self.assertEqual(revision.usuario_creacion, self.user)
+        self.assertEqual(revision.datos, foto_cotizacion(self.cotizacion))
+
+    def test_la_edicion_guarda_solo_el_delta(self):
+        self._editar(self._cambiar_cantidad('7.00'))
+
+        revision = CotizacionRevision.objects.get(cotizacion=self.cotizacion, numero=2)
+        self.assertFalse(revision.es_checkpoint)
+        cambios = revision.datos['anidados']
+        ambiente, = cambios['ambientes']['anidados'].values()
+        item, = ambiente['anidados']['items']['anidados'].values()
+        self.assertEqual(set(item['valores']), {'cantidad', 'precio_total'})
+        self.assertEqual(set(cambios['encabezado']['valores']), {'total_neto', 'total_general'})
+
+        checkpoint = CotizacionRevision.objects.get(cotizacion=self.cotizacion, numero=1)
+        self.assertLess(len(json.dumps(revision.datos)) * 5, len(json.dumps(checkpoint.datos)))
+
+    def test_guardar_sin_cambios_no_crea_revision(self):
+        self._editar(lambda payload: None)
+
+        self.assertEqual(CotizacionRevision.objects.filter(cotizacion=self.cotizacion).count(), 1)
+
+    def test_reconstruye_cualquier_revision_con_checkpoints(self):
+        fotos = {1: foto_cotizacion(self.cotizacion)}
+        fotos[2] = self._editar(self._cambiar_cantidad('4.00'))
+        fotos[3] = self._editar(lambda p: p['ambientes'][1]['items'].pop())
+        fotos[4] = self._editar(lambda p: p['ambientes'].reverse())
+        fotos[5] = self._editar(lambda p: p['ambientes'][0].update(nombre='Terraza'))
+        fotos[6] = self._editar(lambda p: p.update(descuento_total='5.00'))
+        fotos[7] = self._editar(self._cambiar_cantidad('9.00'))
+
+        checkpoints = CotizacionRevision.objects.filter(
+            cotizacion=self.cotizacion, es_checkpoint=True
+        ).values_list('numero', flat=True)
+        self.assertEqual(list(checkpoints), [1, 4, 7])
+
+        for numero, esperada in fotos.items():
+            with CaptureQueriesContext(connection) as ctx:
+                revision, foto = RevisionService.reconstruir(self.cotizacion, numero)
+            self.assertEqual(len(ctx.captured_queries), 1)
+            self.assertEqual(revision.numero, numero)
+            self.assertEqual(foto, esperada, f'revisión {numero}')
+
+        self.assertEqual(fotos[6]['encabezado']['descuento_total'], str(Decimal('5.00')))
+        self.assertEqual(RevisionService.reconstruir(self.cotizacion, 99), (None, None))
+
+    def test_endpoints(self):
+        self._editar(self._cambiar_cantidad('3.00'))
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        lista = client.get(reverse('cotizacion-revisiones', kwargs={'pk': self.cotizacion.pk}))
+        self.assertEqual(lista.status_code, 200)
+        self.assertEqual([r['numero'] for r in lista.data], [2, 1])
+
+        detalle = client.get(reverse('cotizacion-revision', kwargs={'pk': self.cotizacion.pk, 'numero': 2}))
+        self.assertEqual(detalle.status_code, 200)
+        self.assertEqual(detalle.data['numero'], 2)
+        self.assertEqual(detalle.data['datos'], foto_cotizacion(self.cotizacion))
+
+        inexistente = client.get(reverse('cotizacion-revision', kwargs={'pk': self.cotizacion.pk, 'numero': 9}))
+        self.assertEqual(inexistente.status_code, 404)
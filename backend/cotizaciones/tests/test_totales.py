@@ -0,0 +1,273 @@
+# cotizaciones/tests/test_totales.py
+from decimal import Decimal
+from unittest import mock
+
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from cotizaciones.models import Cotizacion, CotizacionItem, recalculo_diferido
+from .factories import CotizacionFactory, ProductoFactory, crear_cotizacion_completa
+
+
+def _suma_items(cotizacion):
+    return sum(
+        CotizacionItem.objects.filter(ambiente__cotizacion=cotizacion).values_list('precio_total', flat=True)
+    )
+
+
+@pytest.mark.django_db
+class TestRecalculoDeTotales(TestCase):
+
+    def test_un_solo_aggregate_sin_importar_los_items(self):
+        cotizacion = crear_cotizacion_completa(num_ambientes=4, items_por_ambiente=25)
+        cotizacion.descuento_total = Decimal('10.00')
+
+        with CaptureQueriesContext(connection) as ctx:
+            cotizacion.recalculate_totals()
+
+        # Un SELECT SUM(...) y el UPDATE del encabezado
+        self.assertEqual(len(ctx.captured_queries), 2)
+        esperado = _suma_items(cotizacion)
+        cotizacion.refresh_from_db()
+        self.assertEqual(cotizacion.total_neto, esperado)
+        self.assertEqual(cotizacion.total_general, esperado - Decimal('10.00'))
+
+    def test_cotizacion_sin_items_queda_en_cero(self):
+        cotizacion = CotizacionFactory()
+
+        cotizacion.recalculate_totals()
+
+        cotizacion.refresh_from_db()
+        self.assertEqual(cotizacion.total_neto, Decimal('0.00'))
+        self.assertEqual(cotizacion.total_general, Decimal('0.00'))
+
+    def test_no_suma_items_de_otras_cotizaciones(self):
+        cotizacion = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=2)
+        otra = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=5)
+
+        cotizacion.recalculate_totals()
+        otra.recalculate_totals()
+
+        self.assertLess(cotizacion.total_neto, otra.total_neto)
+
+
+@pytest.mark.django_db
+class TestRecalculoDiferido(TestCase):
+
+    def setUp(self):
+        self.cotizacion = crear_cotizacion_completa(num_ambientes=2, items_por_ambiente=3)
+        self.items = list(
+            CotizacionItem.objects.filter(ambiente__cotizacion=self.cotizacion).select_related('ambiente', 'producto')
+        )
+
+    def test_sin_bloque_cada_save_aplica_su_delta(self):
+        with mock.patch.object(Cotizacion, 'aplicar_delta_totales') as aplicar:
+            for item in self.items:
+                item.cantidad = Decimal('2.00')
+                item.save()
+
+        self.assertEqual(aplicar.call_count, len(self.items))
+
+    def test_varios_saves_recalculan_una_sola_vez(self):
+        with mock.patch.object(
+            Cotizacion, 'recalculate_totals', autospec=True, side_effect=Cotizacion.recalculate_totals
+        ) as recalcular:
+            with recalculo_diferido():
+                for item in self.items:
+                    item.cantidad = Decimal('2.00')
+                    item.save()
+                self.assertEqual(recalcular.call_count, 0)
+
+        self.assertEqual(recalcular.call_count, 1)
+        self.cotizacion.refresh_from_db()
+        self.assertEqual(self.cotizacion.total_neto, sum(item.precio_total for item in self.items))
+
+    def test_bloques_anidados_recalculan_al_cerrar_el_externo(self):
+        otra = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=1)
+        item_otra = CotizacionItem.objects.get(ambiente__cotizacion=otra)
+
+        with mock.patch.object(Cotizacion, 'recalculate_totals', autospec=True) as recalcular:
+            with recalculo_diferido():
+                self.items[0].save()
+                with recalculo_diferido():
+                    self.items[1].save()
+                    item_otra.save()
+                self.assertEqual(recalcular.call_count, 0)
+
+        self.assertEqual(sorted(c.args[0].pk for c in recalcular.call_args_list), sorted([self.cotizacion.pk, otra.pk]))
+
+    def test_error_en_el_bloque_revierte_y_no_recalcula(self):
+        total_original = self.cotizacion.total_neto
+
+        with mock.patch.object(Cotizacion, 'recalculate_totals', autospec=True) as recalcular:
+            with self.assertRaises(RuntimeError):
+                with recalculo_diferido():
+                    self.items[0].cantidad = Decimal('9.00')
+                    self.items[0].save()
+                    raise RuntimeError('boom')
+
+        recalcular.assert_not_called()
+        self.items[0].refresh_from_db()
+        self.assertEqual(self.items[0].cantidad, Decimal('1.00'))
+        self.cotizacion.refresh_from_db()
+        self.assertEqual(self.cotizacion.total_neto, total_original)
+
+        # El bloque fallido no deja estado pendiente: el siguiente save actualiza de inmediato
+        with mock.patch.object(Cotizacion, 'aplicar_delta_totales') as aplicar:
+            self.items[1].cantidad = Decimal('4.00')
+            self.items[1].save()
+        aplicar.assert_called_once()
+
+
+@pytest.mark.django_db
+class TestTotalesIncrementales(TestCase):
+
+    def setUp(self):
+        self.cotizacion = crear_cotizacion_completa(
+            num_ambientes=2, items_por_ambiente=20, descuento_total=Decimal('15.00')
+        )
+
+    def _item(self):
+        return CotizacionItem.objects.filter(ambiente__cotizacion=self.cotizacion).select_related('producto').first()
+
+    def _assert_consistente(self):
+        cotizacion = Cotizacion.objects.get(pk=self.cotizacion.pk)
+        total = _suma_items(cotizacion)
+        self.assertEqual(cotizacion.total_neto, total)
+        self.assertEqual(cotizacion.total_general, total - Decimal('15.00'))
+
+    def test_editar_un_item_no_recorre_la_cotizacion(self):
+        item = self._item()
+        item.cantidad = Decimal('3.00')
+
+        with CaptureQueriesContext(connection) as ctx:
+            item.save()
+
+        sql = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('SUM(', sql.upper())
+        # SELECT del ambiente, UPDATE del ítem y UPDATE ... SET total_neto = total_neto + delta
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self._assert_consistente()
+
+    def test_alta_y_baja_aplican_el_delta(self):
+        item = self._item()
+        nuevo = CotizacionItem(
+            ambiente=item.ambiente, producto=ProductoFactory(), numero_item=999,
+            cantidad=Decimal('2.00'), ancho=Decimal('1.000'), alto=Decimal('1.000'),
+            precio_unitario=Decimal('33.33'), porcentaje_descuento=Decimal('0.00'),
+        )
+        nuevo.save()
+        self._assert_consistente()
+
+        nuevo.delete()
+        item.delete()
+        self._assert_consistente()
+
+    def test_baja_con_precio_diferido_recalcula(self):
+        item = CotizacionItem.objects.defer('precio_total').get(pk=self._item().pk)
+
+        item.delete()
+
+        self._assert_consistente()
+
+    def test_ediciones_desde_instancias_distintas_no_se_pisan(self):
+        """El UPDATE con F() suma sobre el valor actual de la fila, no sobre una copia en memoria"""
+        primero, segundo = CotizacionItem.objects.filter(ambiente__cotizacion=self.cotizacion)[:2]
+        primero.cantidad = Decimal('4.00')
+        segundo.porcentaje_descuento = Decimal('12.50')
+
+        primero.save()
+        segundo.save()
+
+        self._assert_consistente()
+
+    def test_la_cotizacion_en_memoria_se_actualiza(self):
+        cotizacion = Cotizacion.objects.get(pk=self.cotizacion.pk)
+        item = CotizacionItem.objects.filter(ambiente__cotizacion=cotizacion).first()
+        item.ambiente.cotizacion = cotizacion
+        item.cantidad = Decimal('6.00')
+
+        item.save()
+
+        self.assertEqual(cotizacion.total_neto, _suma_items(cotizacion))
+
+    def test_cambio_de_ambiente_recalcula_ambas_cotizaciones(self):
+        otra = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=2)
+        item = self._item()
+        item.ambiente = otra.ambientes.get()
+        item.numero_item = 99
+
+        item.save()
+
+        self._assert_consistente()
+        otra.refresh_from_db()
+        self.assertEqual(otra.total_neto, _suma_items(otra))
+
+
+    def test_update_fields_sin_precio_no_mueve_los_totales(self):
+        item = self._item()
+        item.cantidad = Decimal('8.00')
+
+        item.save(update_fields=['descripcion_tecnica'])
+
+        # La fila conserva su precio_total y el encabezado no se mueve
+        self._assert_consistente()
+        item.save()
+        self._assert_consistente()
+
+    def test_update_fields_con_precio_aplica_el_delta(self):
+        item = self._item()
+        item.cantidad = Decimal('5.00')
+
+        item.save(update_fields=['cantidad', 'precio_total', 'ambiente'])
+
+        self._assert_consistente()
+
+    def test_update_fields_parcial_recalcula(self):
+        otra = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=2)
+        item = self._item()
+        item.ambiente = otra.ambientes.get()
+        item.numero_item = 99
+        item.cantidad = Decimal('7.00')
+
+        item.save(update_fields=['cantidad', 'precio_total'])
+        self._assert_consistente()
+
+        # El cambio de ambiente no se guardó: el siguiente save lo trata como tal
+        item.save()
+        self._assert_consistente()
+        otra.refresh_from_db()
+        self.assertEqual(otra.total_neto, _suma_items(otra))
+
+@pytest.mark.django_db
+class TestComandoReconciliarTotales(TestCase):
+
+    def setUp(self):
+        self.cotizacion = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=4)
+        self.sana = crear_cotizacion_completa(num_ambientes=1, items_por_ambiente=2)
+        # Un borrado masivo no pasa por CotizacionItem.delete(): los totales quedan desviados
+        CotizacionItem.objects.filter(ambiente__cotizacion=self.cotizacion, numero_item=1).delete()
+
+    def test_solo_verificar_informa_sin_corregir(self):
+        salida = StringIO()
+        call_command('reconciliar_totales', solo_verificar=True, stdout=salida)
+
+        self.assertIn(self.cotizacion.numero, salida.getvalue())
+        self.assertNotIn(self.sana.numero, salida.getvalue())
+        self.cotizacion.refresh_from_db()
+        self.assertNotEqual(self.cotizacion.total_neto, _suma_items(self.cotizacion))
+
+    def test_corrige_el_desvio(self):
+        call_command('reconciliar_totales', stdout=StringIO())
+
+        self.cotizacion.refresh_from_db()
+        self.assertEqual(self.cotizacion.total_neto, _suma_items(self.cotizacion))
+
+        salida = StringIO()
+        call_command('reconciliar_totales', stdout=salida)
+        self.assertIn('✅ Totales consistentes', salida.getvalue())
@@ -0,0 +1,92 @@
+# cotizaciones/tests/test_vencimiento.py
+from datetime import date, timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from cotizaciones.models import Cotizacion
+from cotizaciones.services import CotizacionService
+from .factories import CotizacionFactory
+
+HOY = date(2030, 6, 15)
+Estado = Cotizacion.EstadoCotizacion
+
+
+def _crear(estado, dias, **kwargs):
+    return CotizacionFactory(estado=estado, fecha_validez=HOY + timedelta(days=dias), **kwargs)
+
+
+@pytest.mark.django_db
+class TestVencimientoDeCotizaciones(TestCase):
+
+    def setUp(self):
+        self.vencidas = [_crear(Estado.BORRADOR, -1) for _ in range(3)] + [_crear(Estado.ENVIADA, -30) for _ in range(2)]
+        self.vigentes = [
+            _crear(Estado.BORRADOR, 0),                   # vence hoy: sigue vigente
+            _crear(Estado.ENVIADA, 10),
+            _crear(Estado.ACEPTADA, -5),                  # estados finales no se tocan
+            _crear(Estado.RECHAZADA, -5),
+            _crear(Estado.BORRADOR, -5, is_active=False),  # eliminada lógicamente
+        ]
+
+    def _estados(self, cotizaciones):
+        return set(Cotizacion.objects.filter(pk__in=[c.pk for c in cotizaciones]).values_list('estado', flat=True))
+
+    def test_vence_solo_las_expiradas_abiertas(self):
+        antes = {c.pk: c.estado for c in self.vigentes}
+
+        resultado = CotizacionService.vencer_cotizaciones(hoy=HOY)
+
+        self.assertEqual(resultado, {Estado.BORRADOR: 3, Estado.ENVIADA: 2})
+        self.assertEqual(self._estados(self.vencidas), {Estado.VENCIDA})
+        self.assertEqual(
+            dict(Cotizacion.objects.filter(pk__in=antes).values_list('pk', 'estado')), antes
+        )
+
+    def test_un_update_por_lote(self):
+        with CaptureQueriesContext(connection) as ctx:
+            CotizacionService.vencer_cotizaciones(hoy=HOY, lote=2)
+
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        # BORRADOR: 3 filas en lotes de 2 -> 2 UPDATE; ENVIADA: 2 filas -> 1 UPDATE
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(self._estados(self.vencidas), {Estado.VENCIDA})
+
+    def test_no_pisa_cambios_concurrentes(self):
+        """Una cotización aceptada entre el SELECT del lote y su UPDATE conserva su estado"""
+        aceptada = self.vencidas[0]
+        ya_aceptada = []
+
+        def aceptar_tras_el_select(execute, sql, params, many, context):
+            resultado = execute(sql, params, many, context)
+            if sql.startswith('SELECT') and 'LIMIT' in sql and not ya_aceptada:
+                ya_aceptada.append(True)
+                Cotizacion.objects.filter(pk=aceptada.pk).update(estado=Estado.ACEPTADA)
+            return resultado
+
+        with connection.execute_wrapper(aceptar_tras_el_select):
+            resultado = CotizacionService.vencer_cotizaciones(hoy=HOY)
+
+        self.assertEqual(resultado[Estado.BORRADOR], 2)
+        aceptada.refresh_from_db()
+        self.assertEqual(aceptada.estado, Estado.ACEPTADA)
+
+    def test_comando_simular_y_ejecutar(self):
+        salida = StringIO()
+        call_command('vencer_cotizaciones', fecha=HOY.isoformat(), simular=True, stdout=salida)
+        self.assertIn('5 cotizaciones vencerían', salida.getvalue())
+        self.assertEqual(self._estados(self.vencidas), {Estado.BORRADOR, Estado.ENVIADA})
+
+        salida = StringIO()
+        call_command('vencer_cotizaciones', fecha=HOY.isoformat(), lote=2, stdout=salida)
+        self.assertIn('✅ 5 cotizaciones pasadas a VENCIDA', salida.getvalue())
+        self.assertEqual(self._estados(self.vencidas), {Estado.VENCIDA})
+
+        # Idempotente: una segunda pasada no encuentra nada
+        salida = StringIO()
+        call_command('vencer_cotizaciones', fecha=HOY.isoformat(), stdout=salida)
+        self.assertIn('✅ 0 cotizaciones', salida.getvalue())
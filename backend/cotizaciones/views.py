@@ -2,21 +2,35 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework import serializers
-from django.http import HttpResponse
+from django.db.models import Count
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 
 # Importamos todos los modelos relacionados
-from .models import Cotizacion, CotizacionAmbiente, CotizacionItem
-from .serializers import CotizacionSerializer
+from .models import Cotizacion
+from .revisiones import RevisionService
+from .serializers import (
+    ClonarLoteSerializer, CotizacionListSerializer, CotizacionRevisionSerializer, CotizacionSerializer,
+)
+from .services import CotizacionService
 from .filters import CotizacionFilter
 from clientes.models import Cliente
 # Asumimos que Manufactura es el modelo de usuario
 from manufactura.models import Manufactura
-from .pdf_generator import generate_cotizacion_pdf
+from .pdf_generator import open_cotizacion_pdf
 from common.pagination import StandardPagination
+from common.pdf_assets import get_pdf_language
+from common.models import TrabajoRenderPDF
+from common.pdf_export import stream_pdf_zip
+from common.pdf_jobs import encolar_trabajo, prerenderizar
+from common.pdf_response import pdf_file_response
+from common.serializers import TrabajoRenderPDFSerializer
 
 
 # --- VIEWSET PRINCIPAL ---
@@ -32,8 +46,13 @@ class CotizacionViewSet(viewsets.ModelViewSet):
     - PUT/PATCH /gestion/cotizaciones/{id}/ - Actualizar cotización
     - DELETE /gestion/cotizaciones/{id}/ - Eliminar (soft delete)
     - POST /gestion/cotizaciones/{id}/clonar/ - Clonar cotización
+    - POST /gestion/cotizaciones/{id}/clonar-lote/ - Clonar la cotización para varios clientes
+    - GET /gestion/cotizaciones/{id}/revisiones/ - Historial de revisiones
+    - GET /gestion/cotizaciones/{id}/revisiones/{numero}/ - Revisión reconstruida
     - POST /gestion/cotizaciones/{id}/cambiar_estado/ - Cambiar estado
     - GET /gestion/cotizaciones/{id}/generar-pdf/ - Generar PDF
+    - POST /gestion/cotizaciones/{id}/generar-pdf-async/ - Encolar PDF (ver /trabajos-pdf/{job_id}/)
+    - GET /gestion/cotizaciones/exportar-pdf/ - ZIP con los PDFs filtrados (mismos filtros que el listado)
     
     Parámetros de consulta:
     - ?search= : Busca en numero y cliente__nombre
@@ -81,6 +100,26 @@ class CotizacionViewSet(viewsets.ModelViewSet):
     ]
     ordering = ['-created_at']  # Ordenamiento por defecto
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        # El PDF se sirve desde caché o se genera con su propio plan de carga
+        # (ambientes -> items -> producto); no necesita el árbol anidado aquí.
+        if self.action in ['generar_pdf', 'generar_pdf_async', 'exportar_pdf', 'revisiones', 'revision']:
+            return queryset.prefetch_related(None)
+
+        # El listado solo muestra el encabezado: sin árbol anidado, con la
+        # cantidad de ítems calculada en la misma consulta
+        if self.action == 'list':
+            return queryset.prefetch_related(None).annotate(total_items=Count('ambientes__items'))
+
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return CotizacionListSerializer
+        return CotizacionSerializer
+
     def retrieve(self, request, *args, **kwargs):
         """
         Obtener el detalle de una cotización específica.
@@ -141,14 +180,7 @@ class CotizacionViewSet(viewsets.ModelViewSet):
         nuevo_cliente_id = request.data.get('cliente_id')
 
         # Determinar el vendedor para la nueva cotización
-        vendedor_nueva_cotizacion = original.vendedor
-        if request.user.is_authenticated:
-            try:
-                vendedor_actual = Manufactura.objects.get(usuario=request.user, cargo='COMERCIAL')
-                vendedor_nueva_cotizacion = vendedor_actual
-            except Manufactura.DoesNotExist:
-                # Si el usuario actual no es un vendedor, se mantiene el vendedor original.
-                pass
+        vendedor_nueva_cotizacion = self._vendedor_para_copia(request, original)
 
         # Determinar el cliente para la nueva cotización
         cliente_nueva_cotizacion = original.cliente
@@ -158,56 +190,91 @@ class CotizacionViewSet(viewsets.ModelViewSet):
             except Cliente.DoesNotExist:
                 raise serializers.ValidationError({"cliente_id": "El ID de cliente proporcionado no es válido."})
 
-        with transaction.atomic():
-            # 1. Crear una NUEVA instancia para la cabecera de la cotización.
-            # No se modifica el 'original'.
-            nueva_cotizacion = Cotizacion.objects.create(
-                cliente=cliente_nueva_cotizacion,
-                vendedor=vendedor_nueva_cotizacion,
-                estado=Cotizacion.EstadoCotizacion.BORRADOR,
-                fecha_validez=original.fecha_validez,
-                descuento_total=original.descuento_total,
-                # El 'numero' se generará automáticamente en el save()
-                # Los totales se recalcularán al final
-            )
+        # Copia completa con inserciones masivas (un INSERT por nivel), atómica
+        nueva_cotizacion, = CotizacionService.clonar_cotizacion(
+            original, [cliente_nueva_cotizacion],
+            vendedor=vendedor_nueva_cotizacion, usuario=request.user,
+        )
 
-            # 2. Iterar sobre los ambientes del original para crear nuevas copias
-            ambientes_originales = original.ambientes.all()
-            for ambiente_original in ambientes_originales:
-                nuevo_ambiente = CotizacionAmbiente.objects.create(
-                    cotizacion=nueva_cotizacion,
-                    nombre=ambiente_original.nombre,
-                    orden=ambiente_original.orden,
-                )
-
-                # 3. Iterar sobre los items del ambiente original para crear nuevas copias
-                items_originales = ambiente_original.items.all()
-                for item_original in items_originales:
-                    # Crear el item con skip_recalculate=True para evitar múltiples saves
-                    nuevo_item = CotizacionItem(
-                        ambiente=nuevo_ambiente,
-                        producto=item_original.producto,
-                        numero_item=item_original.numero_item,
-                        cantidad=item_original.cantidad,
-                        ancho=item_original.ancho,
-                        alto=item_original.alto,
-                        precio_unitario=item_original.precio_unitario,  # Mantenemos histórico
-                        porcentaje_descuento=item_original.porcentaje_descuento,
-                        atributos_seleccionados=item_original.atributos_seleccionados,
-                        # El 'precio_total' y 'descripcion_tecnica' se calculan automáticamente en el save()
-                    )
-                    nuevo_item.save(skip_recalculate=True)
-            
-            # 4. Recalcular los totales UNA SOLA VEZ al final, asegurando atomicidad
-            nueva_cotizacion.recalculate_totals()
-            
-            # Refrescar la instancia desde la BD para obtener todas las relaciones anidadas
-            # para una correcta serialización en la respuesta.
-            nueva_cotizacion.refresh_from_db()
+        # Releer con la estructura anidada para una correcta serialización en la respuesta
+        nueva_cotizacion = self.get_queryset().get(pk=nueva_cotizacion.pk)
 
         serializer = self.get_serializer(nueva_cotizacion)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    # --- ACCIÓN: CLONAR COTIZACIÓN EN LOTE ---
+    @action(detail=True, methods=['post'], url_path='clonar-lote')
+    def clonar_lote(self, request, pk=None):
+        """
+        Clona una cotización plantilla para varios clientes en un solo request
+        (p. ej. unidades idénticas de un mismo edificio).
+        Recibe: { "clientes": [id, id, ...] }
+        Retorna la lista de cotizaciones creadas (id, número y cliente), en el
+        mismo orden que los clientes recibidos.
+        """
+        original = self.get_object()
+        serializer = ClonarLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cliente_ids = serializer.validated_data['clientes']
+
+        # Resolver todos los clientes con una sola consulta
+        clientes_por_id = Cliente.objects.in_bulk(cliente_ids)
+        invalidos = [pk for pk in cliente_ids if pk not in clientes_por_id]
+        if invalidos:
+            raise serializers.ValidationError(
+                {"clientes": f"IDs de cliente no válidos: {', '.join(map(str, invalidos))}"}
+            )
+
+        copias = CotizacionService.clonar_cotizacion(
+            original, [clientes_por_id[pk] for pk in cliente_ids],
+            vendedor=self._vendedor_para_copia(request, original), usuario=request.user,
+        )
+
+        return Response(
+            [
+                {'id': copia.id, 'numero': copia.numero, 'cliente': copia.cliente_id,
+                 'cliente_nombre': copia.cliente.nombre}
+                for copia in copias
+            ],
+            status=status.HTTP_201_CREATED
+        )
+
+    @staticmethod
+    def _vendedor_para_copia(request, original):
+        """
+        Vendedor de una copia: el usuario actual si es COMERCIAL; si no, se
+        mantiene el vendedor original.
+        """
+        if request.user.is_authenticated:
+            try:
+                return Manufactura.objects.get(usuario=request.user, cargo='COMERCIAL')
+            except Manufactura.DoesNotExist:
+                pass
+        return original.vendedor
+
+    # --- ACCIÓN: HISTORIAL DE REVISIONES ---
+    @action(detail=True, methods=['get'], url_path='revisiones')
+    def revisiones(self, request, pk=None):
+        """
+        Lista las revisiones de la cotización (metadatos, sin el contenido).
+        """
+        cotizacion = self.get_object()
+        revisiones = cotizacion.revisiones.select_related('usuario_creacion').order_by('-numero')
+        return Response(CotizacionRevisionSerializer(revisiones, many=True).data)
+
+    @action(detail=True, methods=['get'], url_path=r'revisiones/(?P<numero>\d+)')
+    def revision(self, request, pk=None, numero=None):
+        """
+        Retorna una revisión reconstruida a partir del checkpoint anterior y
+        los deltas siguientes.
+        """
+        cotizacion = self.get_object()
+        revision, foto = RevisionService.reconstruir(cotizacion, int(numero))
+        if revision is None:
+            return Response({"detail": "Revisión no encontrada."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({**CotizacionRevisionSerializer(revision).data, 'datos': foto})
+
     # --- ACCIÓN: ACEPTAR COTIZACIÓN (Sección 5.2) ---
 
     @action(detail=True, methods=['post'], url_path='aceptar')
@@ -221,17 +288,33 @@ class CotizacionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        if cotizacion.estado not in [Cotizacion.EstadoCotizacion.ENVIADA, Cotizacion.EstadoCotizacion.BORRADOR]:
+        # ACEPTADA también se admite: reintentar la aceptación devuelve el mismo pedido
+        if cotizacion.estado not in [
+            Cotizacion.EstadoCotizacion.ENVIADA,
+            Cotizacion.EstadoCotizacion.BORRADOR,
+            Cotizacion.EstadoCotizacion.ACEPTADA,
+        ]:
             return Response({"detail": "La cotización debe estar en estado ENVIADA o BORRADOR para ser aceptada."},
                             status=status.HTTP_400_BAD_REQUEST)
 
         with transaction.atomic():
-            # [NOTA FUTURA: Aquí se debe llamar al servicio que genera el PedidoServicio - Sección 7.3]
+            # Estado + Pedido de Servicio (Sección 7.3) en la misma transacción
+            try:
+                pedido, creado = CotizacionService.aceptar_cotizacion(cotizacion, usuario=request.user)
+            except DjangoValidationError as e:
+                return Response({"detail": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
 
-            cotizacion.estado = Cotizacion.EstadoCotizacion.ACEPTADA
-            cotizacion.save()
+            # La descarga del PDF aceptado suele venir a continuación
+            if creado:
+                prerenderizar(TrabajoRenderPDF.TipoDocumento.COTIZACION, cotizacion.pk, get_pdf_language(request))
 
-        return Response(self.serializer_class(cotizacion).data)
+        return Response(self._respuesta_aceptacion(cotizacion, pedido))
+
+    def _respuesta_aceptacion(self, cotizacion, pedido):
+        """Cotización serializada más la referencia al pedido generado"""
+        data = self.serializer_class(cotizacion).data
+        data['pedido_servicio'] = {'id': pedido.pk, 'numero_pedido': pedido.numero_pedido}
+        return data
 
     # --- ACCIÓN: CAMBIAR ESTADO DE COTIZACIÓN ---
     @action(detail=True, methods=['post'], url_path='cambiar_estado')
@@ -258,6 +341,13 @@ class CotizacionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Aceptar genera el Pedido de Servicio: mismo permiso que accept_cotizacion
+        if nuevo_estado == 'ACEPTADA' and not request.user.has_perm('cotizaciones.can_change_status_accepted'):
+            return Response(
+                {"detail": "No tiene permiso para aprobar cotizaciones."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
         if nuevo_estado == 'ACEPTADA' and cotizacion.estado not in ['ENVIADA', 'BORRADOR']:
             return Response(
                 {"detail": "Solo se puede aceptar una cotización en estado ENVIADA o BORRADOR."},
@@ -278,8 +368,19 @@ class CotizacionViewSet(viewsets.ModelViewSet):
 
         # Cambiar estado
         with transaction.atomic():
-            cotizacion.estado = nuevo_estado
-            cotizacion.save()
+            if nuevo_estado == Cotizacion.EstadoCotizacion.ACEPTADA:
+                # Aceptar genera el Pedido de Servicio (mismo flujo que accept_cotizacion)
+                try:
+                    CotizacionService.aceptar_cotizacion(cotizacion, usuario=request.user)
+                except DjangoValidationError as e:
+                    return Response({"detail": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+            else:
+                cotizacion.estado = nuevo_estado
+                cotizacion.save()
+
+            # Tras enviar o aceptar, el PDF se descarga casi siempre
+            if nuevo_estado in [Cotizacion.EstadoCotizacion.ENVIADA, Cotizacion.EstadoCotizacion.ACEPTADA]:
+                prerenderizar(TrabajoRenderPDF.TipoDocumento.COTIZACION, cotizacion.pk, get_pdf_language(request))
 
         return Response(
             CotizacionSerializer(cotizacion, context={'request': request}).data
@@ -294,21 +395,62 @@ class CotizacionViewSet(viewsets.ModelViewSet):
         cotizacion = self.get_object()
 
         try:
-            # Generar el PDF usando el generador
-            pdf_buffer = generate_cotizacion_pdf(cotizacion, request)
-            
-            # Crear el nombre del archivo
-            filename = f"Cotizacion_{cotizacion.numero}.pdf"
-            
-            # Preparar la respuesta HTTP
-            response = HttpResponse(pdf_buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            return response
-            
+            # Obtener el PDF desde la caché (se genera solo si el documento cambió)
+            # y entregarlo por bloques desde el archivo, con ETag y rangos
+            pdf_file = open_cotizacion_pdf(cotizacion, request)
+            return pdf_file_response(request, pdf_file, f"Cotizacion_{cotizacion.numero}.pdf")
+
         except Exception as e:
             return Response(
                 {"detail": f"Error al generar el PDF: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
         return Response(self.serializer_class(cotizacion).data)
+
+    @action(detail=True, methods=['post'], url_path='generar-pdf-async')
+    def generar_pdf_async(self, request, pk=None):
+        """
+        Encola la generación del PDF en el pool de render en segundo plano.
+        Retorna el trabajo; su URL devuelve el estado o el PDF cuando termina.
+        """
+        cotizacion = self.get_object()
+        trabajo = encolar_trabajo(
+            TrabajoRenderPDF.TipoDocumento.COTIZACION,
+            cotizacion.pk,
+            get_pdf_language(request),
+            usuario=request.user
+        )
+        serializer = TrabajoRenderPDFSerializer(trabajo, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path='exportar-pdf')
+    def exportar_pdf(self, request):
+        """
+        Descarga un ZIP con los PDFs de todas las cotizaciones que cumplen los
+        filtros del listado (estado, cliente, vendedor, fechas, totales, search).
+        Los PDFs los genera el consumidor de la cola de render y el ZIP se
+        envía en streaming. Máximo PDF_EXPORTAR_MAX cotizaciones por exportación.
+        Endpoint: /gestion/cotizaciones/exportar-pdf/?estado=ENVIADA
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        # Solo los IDs: el consumidor carga cada documento con el plan de PDF
+        maximo = settings.PDF_EXPORTAR_MAX
+        cotizacion_ids = list(queryset.values_list('pk', flat=True)[:maximo + 1])
+        if len(cotizacion_ids) > maximo:
+            return Response(
+                {"detail": f"Máximo {maximo} cotizaciones por exportación. Acote los filtros."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = StreamingHttpResponse(
+            stream_pdf_zip(
+                TrabajoRenderPDF.TipoDocumento.COTIZACION,
+                cotizacion_ids,
+                get_pdf_language(request),
+                usuario=request.user
+            ),
+            content_type='application/zip'
+        )
+        filename = f"Cotizaciones_{timezone.localdate().strftime('%Y%m%d')}.zip"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
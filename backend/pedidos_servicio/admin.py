@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import PedidoServicio, ItemPedidoServicio
+from .models import PedidoServicio, ItemPedidoServicio, HistorialEstadoPedido
 
 
 class ItemPedidoServicioInline(admin.TabularInline):
@@ -21,6 +21,19 @@ class ItemPedidoServicioInline(admin.TabularInline):
     ]
 
 
+class HistorialEstadoPedidoInline(admin.TabularInline):
+    """Historial de transiciones (solo lectura: el registro es append-only)"""
+    model = HistorialEstadoPedido
+    extra = 0
+    can_delete = False
+    fields = ['fecha', 'estado_anterior', 'estado_nuevo', 'usuario']
+    readonly_fields = fields
+    ordering = ['-fecha']
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(PedidoServicio)
 class PedidoServicioAdmin(admin.ModelAdmin):
     """
@@ -59,7 +72,7 @@ class PedidoServicioAdmin(admin.ModelAdmin):
         'created_at',
         'updated_at',
     ]
-    inlines = [ItemPedidoServicioInline]
+    inlines = [ItemPedidoServicioInline, HistorialEstadoPedidoInline]
     
     fieldsets = (
         ('Información General', {
@@ -0,0 +1,282 @@
+"""
+Analítica del flujo de pedidos: permanencia por etapa (percentiles),
+throughput semanal y trabajo en curso (WIP) por manufacturador / instalador.
+
+Permanencia y throughput se leen de ResumenSemanalEtapa, un rollup por
+(semana, estado) que se alimenta incrementalmente desde HistorialEstadoPedido:
+cada actualización procesa solo las transiciones nuevas desde la marca de
+agua (ProgresoAnaliticaPedidos). Ni la actualización ni la consulta crecen
+con el historial total:
+
+- actualizar: transiciones nuevas + el historial de esos pedidos (unas
+  pocas filas por pedido, índice (pedido, fecha))
+- consultar: semanas x estados filas del rollup (solo lectura: la
+  actualización la corre el comando actualizar_analitica_pedidos)
+
+Los percentiles se estiman desde un histograma por tramos
+(TRAMOS_PERMANENCIA_HORAS), interpolando dentro del tramo.
+
+El WIP es el estado actual (no historial): un GROUP BY sobre los índices
+(manufacturador, estado) e (instalador, estado) de PedidoServicio.
+"""
+
+import logging
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .constants import (
+    ANALITICA_LOTE,
+    ANALITICA_MARGEN_SEGUNDOS,
+    ANALITICA_SEMANAS_DEFAULT,
+    ESTADO_THROUGHPUT,
+    ETAPAS_ANALITICA,
+    ETAPAS_WIP_INSTALADOR,
+    ETAPAS_WIP_MANUFACTURADOR,
+    TRAMOS_PERMANENCIA_HORAS,
+)
+from .models import HistorialEstadoPedido, PedidoServicio, ProgresoAnaliticaPedidos, ResumenSemanalEtapa
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = [50, 90, 95]
+
+
+def inicio_semana(fecha_hora):
+    """Lunes (fecha local) de la semana de un datetime"""
+    dia = timezone.localtime(fecha_hora).date()
+    return dia - timedelta(days=dia.weekday())
+
+
+def tramo_permanencia(segundos):
+    """Índice del tramo del histograma para una duración"""
+    return bisect_left(TRAMOS_PERMANENCIA_HORAS, segundos / 3600)
+
+
+def percentil_histograma(histograma, percentil, maximo_horas):
+    """
+    Estima un percentil (en horas) desde un histograma {tramo: cantidad},
+    interpolando linealmente dentro del tramo. El último tramo (abierto) y
+    cualquier tramo que lo supere se acotan con la duración máxima observada.
+    """
+    total = sum(histograma.values())
+    if not total:
+        return None
+
+    objetivo = total * percentil / 100
+    acumulado = 0
+    for tramo in range(len(TRAMOS_PERMANENCIA_HORAS) + 1):
+        cantidad = histograma.get(str(tramo), 0)
+        if cantidad and acumulado + cantidad >= objetivo:
+            inferior = TRAMOS_PERMANENCIA_HORAS[tramo - 1] if tramo else 0
+            superior = TRAMOS_PERMANENCIA_HORAS[tramo] if tramo < len(TRAMOS_PERMANENCIA_HORAS) else maximo_horas
+            superior = max(min(superior, maximo_horas), inferior)
+            return round(inferior + (superior - inferior) * (objetivo - acumulado) / cantidad, 1)
+        acumulado += cantidad
+    return round(maximo_horas, 1)
+
+
+class AnaliticaPedidosService:
+    """Actualización incremental y consulta de la analítica de pedidos"""
+
+    @staticmethod
+    def actualizar(lote=ANALITICA_LOTE, ahora=None):
+        """
+        Vuelca en ResumenSemanalEtapa las transiciones posteriores a la marca
+        de agua, por lotes; cada lote y su marca se confirman juntos (una
+        transición nunca se cuenta dos veces). La marca se bloquea, así que
+        dos actualizaciones simultáneas no procesan el mismo lote.
+
+        Solo se toman transiciones con ANALITICA_MARGEN_SEGUNDOS de
+        antigüedad: los ids se asignan al insertar, y una transacción aún
+        abierta podría confirmar un id menor que otros ya visibles.
+
+        Args:
+            lote: Transiciones por lote
+            ahora: Momento de referencia (por defecto timezone.now())
+
+        Returns:
+            int: Transiciones procesadas
+        """
+        limite = (ahora or timezone.now()) - timedelta(seconds=ANALITICA_MARGEN_SEGUNDOS)
+        procesadas = 0
+
+        while True:
+            with transaction.atomic():
+                ProgresoAnaliticaPedidos.objects.get_or_create(pk=1)
+                progreso = ProgresoAnaliticaPedidos.objects.select_for_update().get(pk=1)
+
+                nuevas = []
+                for transicion in HistorialEstadoPedido.objects.filter(
+                    id__gt=progreso.ultimo_historial_id
+                ).order_by('id')[:lote]:
+                    if transicion.fecha >= limite:
+                        break
+                    nuevas.append(transicion)
+
+                if not nuevas:
+                    break
+
+                AnaliticaPedidosService._volcar(nuevas)
+                progreso.ultimo_historial_id = nuevas[-1].id
+                progreso.save(update_fields=['ultimo_historial_id', 'actualizado'])
+
+            procesadas += len(nuevas)
+            if len(nuevas) < lote:
+                break
+
+        if procesadas:
+            logger.info(f"Analítica de pedidos: {procesadas} transiciones volcadas en los resúmenes semanales")
+        return procesadas
+
+    @staticmethod
+    def _volcar(nuevas):
+        """
+        Suma un lote de transiciones a los resúmenes: cada transición es una
+        entrada a su estado nuevo y, si el pedido tenía una transición previa,
+        cierra la permanencia en el estado anterior (medida desde esa
+        transición). Un SELECT del historial de los pedidos del lote, un
+        SELECT de los resúmenes afectados y un INSERT / UPDATE masivo.
+        """
+        ids_nuevas = {transicion.id for transicion in nuevas}
+
+        secuencias = defaultdict(list)
+        for transicion in HistorialEstadoPedido.objects.filter(
+            pedido_id__in={transicion.pedido_id for transicion in nuevas},
+            id__lte=nuevas[-1].id,
+        ).only('id', 'pedido_id', 'estado_nuevo', 'fecha').order_by('pedido_id', 'fecha', 'id'):
+            secuencias[transicion.pedido_id].append(transicion)
+
+        deltas = defaultdict(lambda: {'entradas': 0, 'salidas': 0, 'total': 0.0, 'max': 0.0, 'histograma': Counter()})
+        for secuencia in secuencias.values():
+            for anterior, actual in zip([None] + secuencia, secuencia):
+                if actual.id not in ids_nuevas:
+                    continue
+                semana = inicio_semana(actual.fecha)
+                deltas[(semana, actual.estado_nuevo)]['entradas'] += 1
+
+                if anterior is not None:
+                    segundos = (actual.fecha - anterior.fecha).total_seconds()
+                    delta = deltas[(semana, anterior.estado_nuevo)]
+                    delta['salidas'] += 1
+                    delta['total'] += segundos
+                    delta['max'] = max(delta['max'], segundos)
+                    delta['histograma'][str(tramo_permanencia(segundos))] += 1
+
+        existentes = {
+            (resumen.semana, resumen.estado): resumen
+            for resumen in ResumenSemanalEtapa.objects.filter(
+                semana__in={semana for semana, _ in deltas},
+                estado__in={estado for _, estado in deltas},
+            )
+        }
+        nuevos = []
+        for clave, delta in deltas.items():
+            resumen = existentes.get(clave)
+            if resumen is None:
+                resumen = ResumenSemanalEtapa(semana=clave[0], estado=clave[1], histograma={})
+                nuevos.append(resumen)
+            resumen.entradas += delta['entradas']
+            resumen.salidas += delta['salidas']
+            resumen.duracion_total_segundos += delta['total']
+            resumen.duracion_max_segundos = max(resumen.duracion_max_segundos, delta['max'])
+            resumen.histograma = dict(Counter(resumen.histograma) + delta['histograma'])
+
+        ResumenSemanalEtapa.objects.bulk_create(nuevos)
+        ResumenSemanalEtapa.objects.bulk_update(
+            [existentes[clave] for clave in deltas if clave in existentes],
+            ['entradas', 'salidas', 'duracion_total_segundos', 'duracion_max_segundos', 'histograma'],
+        )
+
+    @staticmethod
+    def reconstruir(lote=ANALITICA_LOTE):
+        """Descarta los resúmenes y vuelve a procesar todo el historial"""
+        with transaction.atomic():
+            ResumenSemanalEtapa.objects.all().delete()
+            ProgresoAnaliticaPedidos.objects.update_or_create(pk=1, defaults={'ultimo_historial_id': 0})
+        return AnaliticaPedidosService.actualizar(lote=lote)
+
+    @staticmethod
+    def consultar(semanas=ANALITICA_SEMANAS_DEFAULT, ahora=None):
+        """
+        Métricas de las últimas `semanas` semanas (incluida la actual).
+
+        Returns:
+            dict: {
+                'desde': lunes de la primera semana,
+                'actualizado': última actualización de los resúmenes (None si nunca),
+                'permanencia': {estado: {cantidad, promedio_horas, max_horas, p50_horas, ...}},
+                'throughput': [{'semana', 'completados'}, ...],
+                'wip': {'manufacturadores': [...], 'instaladores': [...]},
+            }
+        """
+        semana_actual = inicio_semana(ahora or timezone.now())
+        desde = semana_actual - timedelta(weeks=semanas - 1)
+        resumenes = list(ResumenSemanalEtapa.objects.filter(
+            semana__gte=desde,
+            estado__in=[*ETAPAS_ANALITICA, ESTADO_THROUGHPUT],
+        ))
+
+        permanencia = {}
+        for estado in ETAPAS_ANALITICA:
+            filas = [resumen for resumen in resumenes if resumen.estado == estado]
+            cantidad = sum(resumen.salidas for resumen in filas)
+            histograma = sum((Counter(resumen.histograma) for resumen in filas), Counter())
+            maximo_horas = max((resumen.duracion_max_segundos for resumen in filas), default=0) / 3600
+            metricas = {
+                'cantidad': cantidad,
+                'promedio_horas': (
+                    round(sum(resumen.duracion_total_segundos for resumen in filas) / cantidad / 3600, 1)
+                    if cantidad else None
+                ),
+                'max_horas': round(maximo_horas, 1) if cantidad else None,
+            }
+            for percentil in PERCENTILES:
+                metricas[f'p{percentil}_horas'] = percentil_histograma(histograma, percentil, maximo_horas)
+            permanencia[estado] = metricas
+
+        completados = {
+            resumen.semana: resumen.entradas
+            for resumen in resumenes if resumen.estado == ESTADO_THROUGHPUT
+        }
+        throughput = [
+            {'semana': semana, 'completados': completados.get(semana, 0)}
+            for semana in (desde + timedelta(weeks=n) for n in range(semanas))
+        ]
+
+        return {
+            'desde': desde,
+            'actualizado': ProgresoAnaliticaPedidos.objects.filter(pk=1).values_list('actualizado', flat=True).first(),
+            'permanencia': permanencia,
+            'throughput': throughput,
+            'wip': {
+                'manufacturadores': AnaliticaPedidosService._wip('manufacturador', ETAPAS_WIP_MANUFACTURADOR),
+                'instaladores': AnaliticaPedidosService._wip('instalador', ETAPAS_WIP_INSTALADOR),
+            },
+        }
+
+    @staticmethod
+    def _wip(rol, estados):
+        """Pedidos en curso por colaborador asignado en `rol`, desglosados por estado"""
+        filas = PedidoServicio.objects.filter(
+            estado__in=estados, **{f'{rol}__isnull': False}
+        ).values(
+            f'{rol}_id', f'{rol}__nombre', f'{rol}__apellido', 'estado'
+        ).annotate(cantidad=Count('id')).order_by()
+
+        colaboradores = {}
+        for fila in filas:
+            colaborador = colaboradores.setdefault(fila[f'{rol}_id'], {
+                'id': fila[f'{rol}_id'],
+                'nombre': f"{fila[f'{rol}__nombre']} {fila[f'{rol}__apellido']}".strip(),
+                'total': 0,
+                'por_estado': {},
+            })
+            colaborador['por_estado'][fila['estado']] = fila['cantidad']
+            colaborador['total'] += fila['cantidad']
+
+        return sorted(colaboradores.values(), key=lambda c: (-c['total'], c['nombre']))
@@ -21,6 +21,20 @@ TRANSICIONES_ESTADO_VALIDAS = {
     'COMPLETADO': [],  # Estado terminal
 }
 
+# Permiso requerido para mover un pedido a cada estado
+PERMISOS_POR_ESTADO = {
+    'ACEPTADO': 'pedidos_servicio.can_change_to_aceptado',
+    'EN_FABRICACION': 'pedidos_servicio.can_change_to_en_fabricacion',
+    'LISTO_INSTALAR': 'pedidos_servicio.can_change_to_listo_instalar',
+    'INSTALADO': 'pedidos_servicio.can_change_to_instalado',
+    'COMPLETADO': 'pedidos_servicio.can_change_to_completado',
+    'RECHAZADO': 'pedidos_servicio.can_change_to_rechazado',
+    'CANCELADO': 'pedidos_servicio.can_change_to_cancelado',
+}
+
+# Máximo de pedidos por solicitud de cambio de estado en lote
+CAMBIO_ESTADO_LOTE_MAX = 200
+
 # Estados que requieren notificación por email al fabricador
 ESTADOS_NOTIFICACION_FABRICADOR = ['EN_FABRICACION', 'CANCELADO']
 
@@ -52,3 +66,31 @@ PEDIDOS_MAX_PER_PAGE = 100
 
 # Días para considerar "próximamente" en el endpoint
 DIAS_PROXIMAMENTE = 7
+
+# Conversión de cotización aceptada a pedido: valores de atributos_seleccionados
+# (texto libre del formulario) que se traducen a las opciones de ItemPedidoServicio
+LADO_COMANDO_DESDE_ATRIBUTO = {
+    'IZQ': 'IZQUIERDO',
+    'DER': 'DERECHO',
+    'AMB': 'AMBOS',
+}
+LADO_COMANDO_POR_DEFECTO = 'DERECHO'
+CAIDAS_INVERSAS = ['INVERTIDA', 'INVERSA', 'INVERSO']
+
+# Analítica del flujo de pedidos (ver analitica.py)
+# Etapas cuya permanencia se mide
+ETAPAS_ANALITICA = ['ACEPTADO', 'EN_FABRICACION', 'LISTO_INSTALAR']
+# Estado cuya entrada cuenta como pedido terminado (throughput)
+ESTADO_THROUGHPUT = 'COMPLETADO'
+# Estados que cuentan como trabajo en curso de cada colaborador
+ETAPAS_WIP_MANUFACTURADOR = ['ACEPTADO', 'EN_FABRICACION']
+ETAPAS_WIP_INSTALADOR = ['LISTO_INSTALAR']
+# Límites superiores (horas) de los tramos del histograma de permanencia;
+# el último tramo es abierto
+TRAMOS_PERMANENCIA_HORAS = [1, 4, 8, 24, 48, 72, 120, 168, 240, 336, 504, 720, 1080, 1440]
+# Solo se procesan transiciones con al menos esta antigüedad (segundos), para
+# no saltear las de transacciones que aún no confirmaron
+ANALITICA_MARGEN_SEGUNDOS = 60
+ANALITICA_LOTE = 1000
+ANALITICA_SEMANAS_DEFAULT = 12
+ANALITICA_SEMANAS_MAX = 104
@@ -0,0 +1,31 @@
+# pedidos_servicio/management/commands/actualizar_analitica_pedidos.py
+from django.core.management.base import BaseCommand, CommandError
+
+from pedidos_servicio.analitica import AnaliticaPedidosService
+from pedidos_servicio.constants import ANALITICA_LOTE
+
+
+class Command(BaseCommand):
+    help = (
+        'Vuelca las transiciones de estado nuevas de los pedidos en los resúmenes '
+        'semanales de la analítica (incremental). Pensado para ejecutarse periódicamente '
+        '(cron) para que la consulta de /pedidos-servicio/analitica/ no tenga pendientes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=ANALITICA_LOTE, help='Transiciones por lote')
+        parser.add_argument(
+            '--reconstruir', action='store_true',
+            help='Descarta los resúmenes y reprocesa todo el historial'
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que 0')
+
+        if options['reconstruir']:
+            procesadas = AnaliticaPedidosService.reconstruir(lote=options['lote'])
+        else:
+            procesadas = AnaliticaPedidosService.actualizar(lote=options['lote'])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {procesadas} transiciones procesadas'))
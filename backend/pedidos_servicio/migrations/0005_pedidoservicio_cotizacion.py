@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-17 21:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cotizaciones', '0005_cotizacionrevision'),
+        ('pedidos_servicio', '0004_pedidoservicio_fecha_emision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedidoservicio',
+            name='cotizacion',
+            field=models.OneToOneField(blank=True, help_text='Cotización aceptada que generó el pedido (un pedido por cotización)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pedido_servicio', to='cotizaciones.cotizacion', verbose_name='Cotización de Origen'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def registrar_estado_actual(apps, schema_editor):
+    """
+    Una transición por pedido existente (creación -> estado actual), fechada en
+    updated_at: la actividad reciente del dashboard se lee del historial.
+    """
+    PedidoServicio = apps.get_model('pedidos_servicio', 'PedidoServicio')
+    HistorialEstadoPedido = apps.get_model('pedidos_servicio', 'HistorialEstadoPedido')
+
+    pedidos = PedidoServicio.objects.order_by('pk').values_list(
+        'pk', 'estado', 'updated_at', 'usuario_modificacion_id', 'usuario_creacion_id'
+    )
+    HistorialEstadoPedido.objects.bulk_create(
+        (
+            HistorialEstadoPedido(
+                pedido_id=pedido_id,
+                estado_anterior='',
+                estado_nuevo=estado,
+                fecha=updated_at,
+                usuario_id=usuario_modificacion_id or usuario_creacion_id,
+            )
+            for pedido_id, estado, updated_at, usuario_modificacion_id, usuario_creacion_id in pedidos.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos_servicio', '0005_pedidoservicio_cotizacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorialEstadoPedido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(blank=True, choices=[('ENVIADO', 'Enviado'), ('ACEPTADO', 'Aceptado'), ('EN_FABRICACION', 'En Fabricación'), ('LISTO_INSTALAR', 'Listo para Instalar'), ('INSTALADO', 'Instalado'), ('COMPLETADO', 'Completado'), ('RECHAZADO', 'Rechazado'), ('CANCELADO', 'Cancelado')], max_length=20, verbose_name='Estado Anterior')),
+                ('estado_nuevo', models.CharField(choices=[('ENVIADO', 'Enviado'), ('ACEPTADO', 'Aceptado'), ('EN_FABRICACION', 'En Fabricación'), ('LISTO_INSTALAR', 'Listo para Instalar'), ('INSTALADO', 'Instalado'), ('COMPLETADO', 'Completado'), ('RECHAZADO', 'Rechazado'), ('CANCELADO', 'Cancelado')], max_length=20, verbose_name='Estado Nuevo')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('pedido', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historial_estados', to='pedidos_servicio.pedidoservicio', verbose_name='Pedido')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transiciones_pedido', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Transición de Estado de Pedido',
+                'verbose_name_plural': 'Historial de Estados de Pedidos',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['pedido', 'fecha'], name='pedidos_ser_pedido__f096ba_idx'), models.Index(fields=['-fecha'], name='pedidos_ser_fecha_3f4667_idx'), models.Index(fields=['estado_nuevo', 'fecha'], name='pedidos_ser_estado__7111ee_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_estado_actual, migrations.RunPython.noop),
+    ]
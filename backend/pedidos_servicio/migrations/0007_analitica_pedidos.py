@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos_servicio', '0006_historialestadopedido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgresoAnaliticaPedidos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_historial_id', models.BigIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Progreso de Analítica de Pedidos',
+                'verbose_name_plural': 'Progreso de Analítica de Pedidos',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenSemanalEtapa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semana', models.DateField(verbose_name='Semana (lunes)')),
+                ('estado', models.CharField(choices=[('ENVIADO', 'Enviado'), ('ACEPTADO', 'Aceptado'), ('EN_FABRICACION', 'En Fabricación'), ('LISTO_INSTALAR', 'Listo para Instalar'), ('INSTALADO', 'Instalado'), ('COMPLETADO', 'Completado'), ('RECHAZADO', 'Rechazado'), ('CANCELADO', 'Cancelado')], max_length=20)),
+                ('entradas', models.PositiveIntegerField(default=0)),
+                ('salidas', models.PositiveIntegerField(default=0)),
+                ('duracion_total_segundos', models.FloatField(default=0)),
+                ('duracion_max_segundos', models.FloatField(default=0)),
+                ('histograma', models.JSONField(blank=True, default=dict, help_text='{índice de tramo: cantidad de permanencias} (ver TRAMOS_PERMANENCIA_HORAS)')),
+            ],
+            options={
+                'verbose_name': 'Resumen Semanal de Etapa',
+                'verbose_name_plural': 'Resúmenes Semanales de Etapas',
+                'ordering': ['semana', 'estado'],
+                'unique_together': {('semana', 'estado')},
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.conf import settings
 from clientes.models import Cliente
 from manufactura.models import Manufactura
@@ -107,10 +108,33 @@ class PedidoServicio(BaseModel):
         blank=True
     )
 
+    # --- ORIGEN ---
+    cotizacion = models.OneToOneField(
+        'cotizaciones.Cotizacion',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='pedido_servicio',
+        verbose_name="Cotización de Origen",
+        help_text="Cotización aceptada que generó el pedido (un pedido por cotización)"
+    )
+
     def __str__(self):
         return f"Pedido {self.numero_pedido} - {self.cliente.nombre}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estado persistido: base para registrar la transición al guardar
+        instance._estado_guardado = instance.__dict__.get('estado')
+        return instance
+
     def save(self, *args, **kwargs):
+        """
+        Guarda el pedido y, si es nuevo o cambió su estado, registra la
+        transición en HistorialEstadoPedido dentro de la misma transacción.
+        El usuario de la transición es usuario_modificacion (o el de creación).
+        """
         if not self.numero_pedido:
             from common.models import TablaCorrelativos
 
@@ -127,7 +151,34 @@ class PedidoServicio(BaseModel):
 
             self.numero_pedido = correlativo.obtener_siguiente_codigo()
 
-        super().save(*args, **kwargs)
+        # Solo hay transición si este save escribe el estado: no si update_fields
+        # lo excluye ni si sigue diferido (Django no guarda campos diferidos)
+        update_fields = kwargs.get('update_fields')
+        guarda_estado = self._state.adding or (
+            'estado' in update_fields if update_fields is not None
+            else 'estado' not in self.get_deferred_fields()
+        )
+
+        with transaction.atomic():
+            estado_anterior = ''
+            if guarda_estado and not self._state.adding:
+                estado_anterior = getattr(self, '_estado_guardado', None)
+                if estado_anterior is None:
+                    # Instancia cargada con el estado diferido: se lee el valor guardado
+                    estado_anterior = type(self)._base_manager.filter(
+                        pk=self.pk
+                    ).values_list('estado', flat=True).first() or ''
+
+            super().save(*args, **kwargs)
+            if guarda_estado and self.estado != estado_anterior:
+                HistorialEstadoPedido.objects.create(
+                    pedido=self,
+                    estado_anterior=estado_anterior,
+                    estado_nuevo=self.estado,
+                    usuario=self.usuario_modificacion or self.usuario_creacion,
+                )
+        if guarda_estado:
+            self._estado_guardado = self.estado
 
     class Meta:
         ordering = ['-created_at']
@@ -208,3 +259,103 @@ class ItemPedidoServicio(BaseModel):
     class Meta:
         ordering = ['numero_item']
         unique_together = ['pedido_servicio', 'numero_item']
+
+
+class HistorialEstadoPedido(models.Model):
+    """
+    Registro append-only de las transiciones de estado de un pedido
+    (incluida la creación, con estado_anterior vacío).
+
+    Índices pensados para la línea de tiempo de un pedido (pedido, fecha),
+    el feed global de actividad (-fecha) y los reportes por etapa
+    (estado_nuevo, fecha): todos se resuelven como rangos indexados.
+    """
+
+    pedido = models.ForeignKey(
+        PedidoServicio,
+        on_delete=models.CASCADE,
+        related_name='historial_estados',
+        verbose_name="Pedido"
+    )
+    estado_anterior = models.CharField(
+        max_length=20,
+        choices=PedidoServicio.EstadoPedido.choices,
+        blank=True,
+        verbose_name="Estado Anterior"
+    )
+    estado_nuevo = models.CharField(
+        max_length=20,
+        choices=PedidoServicio.EstadoPedido.choices,
+        verbose_name="Estado Nuevo"
+    )
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='transiciones_pedido',
+        verbose_name="Usuario"
+    )
+    fecha = models.DateTimeField(default=timezone.now, verbose_name="Fecha")
+
+    def __str__(self):
+        return f"{self.pedido_id}: {self.estado_anterior or '-'} → {self.estado_nuevo}"
+
+    class Meta:
+        ordering = ['-fecha']
+        verbose_name = "Transición de Estado de Pedido"
+        verbose_name_plural = "Historial de Estados de Pedidos"
+        indexes = [
+            models.Index(fields=['pedido', 'fecha']),
+            models.Index(fields=['-fecha']),
+            models.Index(fields=['estado_nuevo', 'fecha']),
+        ]
+
+
+class ResumenSemanalEtapa(models.Model):
+    """
+    Rollup semanal por estado, alimentado incrementalmente desde
+    HistorialEstadoPedido (ver pedidos_servicio/analitica.py).
+
+    - entradas: pedidos que entraron al estado en la semana
+    - salidas: permanencias en el estado que terminaron en la semana, con su
+      duración total, máxima e histograma por tramos (para percentiles)
+
+    Las consultas de analítica leen semanas x estados filas, sin importar
+    cuánto historial exista.
+    """
+
+    semana = models.DateField(verbose_name="Semana (lunes)")
+    estado = models.CharField(max_length=20, choices=PedidoServicio.EstadoPedido.choices)
+    entradas = models.PositiveIntegerField(default=0)
+    salidas = models.PositiveIntegerField(default=0)
+    duracion_total_segundos = models.FloatField(default=0)
+    duracion_max_segundos = models.FloatField(default=0)
+    histograma = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="{índice de tramo: cantidad de permanencias} (ver TRAMOS_PERMANENCIA_HORAS)"
+    )
+
+    def __str__(self):
+        return f"{self.semana} {self.estado}"
+
+    class Meta:
+        ordering = ['semana', 'estado']
+        unique_together = ['semana', 'estado']
+        verbose_name = "Resumen Semanal de Etapa"
+        verbose_name_plural = "Resúmenes Semanales de Etapas"
+
+
+class ProgresoAnaliticaPedidos(models.Model):
+    """
+    Marca de agua (fila única) de la analítica: último HistorialEstadoPedido
+    ya volcado en ResumenSemanalEtapa.
+    """
+
+    ultimo_historial_id = models.BigIntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Progreso de Analítica de Pedidos"
+        verbose_name_plural = "Progreso de Analítica de Pedidos"
@@ -6,10 +6,16 @@ from reportlab.lib.units import cm, mm
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from django.utils import translation
+from django.utils import timezone, translation
+from django.conf import settings
 from django.utils.translation import get_language
+import functools
 import logging
 
+from common.pdf_assets import get_pdf_language, new_paragraph, parse_paragraph, stamp_form
+from common.pdf_cache import PDF_TEMPLATE_VERSION, build_cache_key, get_pdf_cache
+from common.pdf_tables import TableLayout
+
 logger = logging.getLogger(__name__)
 
 # --- CONFIGURACIÓN DE COLORES Y FUENTES ---
@@ -59,7 +65,7 @@ TRANSLATIONS = {
         'system': 'Sistema',
         'observations': 'Observaciones:',
         'no_items': 'No hay ítems registrados en este pedido.',
-        'generated': 'Generado:',
+        'updated': 'Actualizado:',
         'page': 'Pág.',
     },
     'pt': {
@@ -95,7 +101,7 @@ TRANSLATIONS = {
         'system': 'Sistema',
         'observations': 'Observações:',
         'no_items': 'Não há itens registrados neste pedido.',
-        'generated': 'Gerado:',
+        'updated': 'Atualizado:',
         'page': 'Pág.',
     },
     'en': {
@@ -131,7 +137,7 @@ TRANSLATIONS = {
         'system': 'System',
         'observations': 'Observations:',
         'no_items': 'No items registered in this order.',
-        'generated': 'Generated:',
+        'updated': 'Updated:',
         'page': 'Page',
     }
 }
@@ -151,21 +157,221 @@ def get_translation(key, lang_code=None):
     
     return TRANSLATIONS[lang_code].get(key, TRANSLATIONS['es'].get(key, key))
 
-def generate_pedido_pdf(pedido, request=None):
+# --- REGISTRO DE RECURSOS ESTÁTICOS (una vez por proceso) ---
+@functools.lru_cache(maxsize=None)
+def get_pdf_styles():
+    """Estilos del PDF de pedido. Se construyen una vez por proceso."""
+    styles = getSampleStyleSheet()
+
+    style_table_cell = ParagraphStyle('TableCellStyle', parent=styles['Normal'], fontName=FONT_MAIN, fontSize=7.5, textColor=colors.black, alignment=TA_CENTER, leading=9)
+
+    return {
+        'title': ParagraphStyle('TitleStyle', parent=styles['Normal'], fontName=FONT_BOLD, fontSize=18, leading=22, textColor=CORPORATE_BLUE, spaceAfter=1*mm),
+        'subtitle': ParagraphStyle('SubtitleStyle', parent=styles['Normal'], fontName=FONT_MAIN, fontSize=9, textColor=colors.black),
+        'section_header': ParagraphStyle('SectionHeaderStyle', parent=styles['Normal'], fontName=FONT_BOLD, fontSize=11, leading=13, textColor=CORPORATE_BLUE, textTransform='uppercase', spaceBefore=2*mm, spaceAfter=1*mm),
+        'label': ParagraphStyle('LabelStyle', parent=styles['Normal'], fontName=FONT_BOLD, fontSize=7.5, textColor=TEXT_GRAY, spaceAfter=0.5*mm),
+        'value': ParagraphStyle('ValueStyle', parent=styles['Normal'], fontName=FONT_MAIN, fontSize=8.5, textColor=colors.black, spaceAfter=1.5*mm),
+        # Estilos Tabla
+        'table_header': ParagraphStyle('TableHeaderStyle', parent=styles['Normal'], fontName=FONT_BOLD, fontSize=7.5, textColor=colors.white, alignment=TA_CENTER),
+        'table_cell': style_table_cell,
+        'table_cell_left': ParagraphStyle('TableCellLeftStyle', parent=style_table_cell, alignment=TA_LEFT),
+        # Estilo para observación expandida
+        'obs_row': ParagraphStyle(
+            'ObsRowStyle',
+            parent=styles['Normal'],
+            fontName=FONT_ITALIC,
+            fontSize=6.5,
+            textColor=TEXT_GRAY,
+            alignment=TA_LEFT,
+            leftIndent=3
+        ),
+    }
+
+
+# Claves de las etiquetas fijas del documento (parseadas una vez por idioma)
+_LABEL_KEYS = {
+    'title': ('service_order',),
+    'subtitle': ('official_document',),
+    'section_header': ('client_data', 'assignments_deadlines', 'items_detail'),
+    'label': (
+        'order_number', 'status', 'date', 'requester', 'name_company', 'id_document', 'email',
+        'phone', 'contact_phone', 'address', 'supervisor', 'start_date', 'fabricator',
+        'current_status', 'end_date', 'installer',
+    ),
+    'table_header': ('environment', 'model', 'fabric', 'width', 'height', 'quantity', 'command', 'system'),
+    'value': ('no_items',),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_static_blocks(lang_code):
+    """
+    Etiquetas fijas ya parseadas para un idioma.
+    Retorna {(estilo, clave): fragmentos}.
+    """
+    styles = get_pdf_styles()
+    return {
+        (style_name, key): parse_paragraph(get_translation(key, lang_code), styles[style_name])
+        for style_name, keys in _LABEL_KEYS.items()
+        for key in keys
+    }
+
+
+# --- TABLA DE ÍTEMS ---
+ITEMS_TABLE_BASE = (
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+)
+
+# Comandos por tipo de fila: (nombre, columna_inicio, columna_fin, *args)
+_ITEMS_HEADER_STYLE = [
+    ('BACKGROUND', 0, -1, HEADER_TABLE_GRAY),
+    ('LINEABOVE', 0, -1, 1, HEADER_TABLE_GRAY),
+    ('TOPPADDING', 0, -1, 6),
+    ('BOTTOMPADDING', 0, -1, 6),
+]
+
+
+def _obs_row_style(bg_color):
+    return [
+        ('SPAN', 0, -1),
+        ('BACKGROUND', 0, -1, bg_color),
+        ('BOTTOMPADDING', 0, -1, 8),
+        ('TOPPADDING', 0, -1, 2),
+        ('LINEBELOW', 0, -1, 1, CORPORATE_BLUE),  # Línea divisoria entre items
+    ]
+
+
+# Estándar: encabezado por item y fondo alternado en datos + observaciones
+ITEMS_ROW_STYLES = {
+    'header': _ITEMS_HEADER_STYLE,
+    'main_par': [('BACKGROUND', 0, -1, HEADER_GRAY)],
+    'main_impar': [('BACKGROUND', 0, -1, colors.white)],
+    'obs_par': _obs_row_style(HEADER_GRAY),
+    'obs_impar': _obs_row_style(colors.white),
+}
+
+# Denso: un encabezado, filas de datos seguidas y observación solo si existe
+ITEMS_ROW_STYLES_DENSE = {
+    'header': _ITEMS_HEADER_STYLE,
+    'main': [
+        ('LINEBELOW', 0, -1, 0.5, HEADER_TABLE_GRAY),
+    ],
+    'obs': [
+        ('SPAN', 0, -1),
+        ('TOPPADDING', 0, -1, 0),
+        ('BOTTOMPADDING', 0, -1, 4),
+        ('LINEBELOW', 0, -1, 0.5, HEADER_TABLE_GRAY),
+    ],
+}
+
+
+def get_items_table_layout(dense=False):
+    """Motor de tabla para los ítems del pedido (ver common.pdf_tables)."""
+    return TableLayout(
+        base=ITEMS_TABLE_BASE,
+        row_styles=ITEMS_ROW_STYLES_DENSE if dense else ITEMS_ROW_STYLES,
+    )
+
+
+def get_items_col_widths(available_width):
+    return [
+        available_width * 0.18, # Ambiente
+        available_width * 0.14, # Modelo
+        available_width * 0.18, # Tejido
+        available_width * 0.08, # Ancho
+        available_width * 0.08, # Alto
+        available_width * 0.06, # Cant
+        available_width * 0.14, # Comando
+        available_width * 0.14  # Sistema
+    ]
+
+
+def use_dense_layout(num_items):
+    """
+    Indica si el pedido se genera en modo denso (un solo encabezado de tabla)
+    según PDF_DENSE_MIN_ITEMS. 0 desactiva el modo denso automático.
+    """
+    threshold = settings.PDF_DENSE_MIN_ITEMS
+    return bool(threshold) and num_items >= threshold
+
+
+def warm_pdf_assets():
+    """Precarga estilos y etiquetas de todos los idiomas (al iniciar un worker)."""
+    get_pdf_styles()
+    for lang_code in TRANSLATIONS:
+        get_static_blocks(lang_code)
+
+
+def get_pedido_pdf_fingerprint(pedido, language):
+    """
+    Huella del documento para la caché de PDFs.
+
+    Combina la versión del pedido, del cliente, de las personas asignadas y
+    de cada ítem (usa los ítems precargados si el queryset los trae).
+    """
+    items = [(item.pk, item.updated_at.isoformat()) for item in pedido.items.all()]
+
+    def _version(obj):
+        return obj.updated_at.isoformat() if obj else None
+
+    return build_cache_key(
+        'pedido',
+        PDF_TEMPLATE_VERSION,
+        language,
+        pedido.pk,
+        pedido.updated_at.isoformat(),
+        _version(pedido.cliente),
+        _version(pedido.manufacturador),
+        _version(pedido.instalador),
+        pedido.usuario_creacion.get_full_name() if pedido.usuario_creacion else None,
+        settings.PDF_DENSE_MIN_ITEMS,
+        items,
+    )
+
+
+def open_pedido_pdf(pedido, request=None, language=None):
+    """
+    Retorna el PDF del pedido como archivo abierto (modo binario),
+    sirviéndolo desde la caché en disco cuando el documento no cambió.
+    """
+    language = language or get_pdf_language(request)
+    key = get_pedido_pdf_fingerprint(pedido, language)
+    return get_pdf_cache().get_or_render(
+        key, lambda: generate_pedido_pdf(pedido, language=language)
+    )
+
+
+def render_pedido_to_cache(pedido_id, language):
+    """
+    Genera (si hace falta) el PDF del pedido en la caché.
+    Usado por la cola de render en segundo plano (common.pdf_jobs).
+    Retorna (clave_cache, nombre_archivo).
+    """
+    from .models import PedidoServicio
+
+    pedido = PedidoServicio.objects.select_related(
+        'cliente', 'manufacturador', 'instalador', 'usuario_creacion'
+    ).prefetch_related('items').get(pk=pedido_id)
+    key = get_pedido_pdf_fingerprint(pedido, language)
+    get_pdf_cache().ensure(key, lambda: generate_pedido_pdf(pedido, language=language))
+    return key, f"Pedido_{pedido.numero_pedido}.pdf"
+
+
+def generate_pedido_pdf(pedido, request=None, language=None, dense=None):
     """
     Genera un PDF profesional del pedido de servicio.
     Argumentos:
         pedido: Instancia del modelo Pedido de Django.
         request: (Opcional) Request object para obtener el idioma del usuario.
+        language: (Opcional) Idioma explícito; tiene prioridad sobre el del request.
+        dense: (Opcional) Fuerza el modo denso de la tabla de ítems; por defecto
+            se decide con PDF_DENSE_MIN_ITEMS.
     Retorna:
         Buffer (BytesIO) con el PDF generado.
     """
     
     # Determinar el idioma a usar
-    user_language = 'es'  # Por defecto español
-    if request and hasattr(request, 'user') and request.user.is_authenticated:
-        # Obtener el idioma del usuario si está disponible
-        user_language = getattr(request.user, 'language', 'es') or 'es'
+    user_language = language or get_pdf_language(request)
     
     # Activar el idioma para esta generación de PDF
     old_language = get_language()
@@ -191,33 +397,23 @@ def generate_pedido_pdf(pedido, request=None):
     )
     
     story = []
-    styles = getSampleStyleSheet()
-    
-    # --- DEFINICIÓN DE ESTILOS ---
-    style_title = ParagraphStyle('TitleStyle', parent=styles['Normal'], fontName=FONT_BOLD, fontSize=18, leading=22, textColor=CORPORATE_BLUE, spaceAfter=1*mm)
-    style_subtitle = ParagraphStyle('SubtitleStyle', parent=styles['Normal'], fontName=FONT_MAIN, fontSize=9, textColor=colors.black)
-    style_section_header = ParagraphStyle('SectionHeaderStyle', parent=styles['Normal'], fontName=FONT_BOLD, fontSize=11, leading=13, textColor=CORPORATE_BLUE, textTransform='uppercase', spaceBefore=2*mm, spaceAfter=1*mm)
-    style_label = ParagraphStyle('LabelStyle', parent=styles['Normal'], fontName=FONT_BOLD, fontSize=7.5, textColor=TEXT_GRAY, spaceAfter=0.5*mm)
-    style_value = ParagraphStyle('ValueStyle', parent=styles['Normal'], fontName=FONT_MAIN, fontSize=8.5, textColor=colors.black, spaceAfter=1.5*mm)
     
-    # Estilos Tabla
-    style_table_header = ParagraphStyle('TableHeaderStyle', parent=styles['Normal'], fontName=FONT_BOLD, fontSize=7.5, textColor=colors.white, alignment=TA_CENTER)
-    style_table_cell = ParagraphStyle('TableCellStyle', parent=styles['Normal'], fontName=FONT_MAIN, fontSize=7.5, textColor=colors.black, alignment=TA_CENTER, leading=9)
-    style_table_cell_left = ParagraphStyle('TableCellLeftStyle', parent=style_table_cell, alignment=TA_LEFT)
-    
-    # Estilo para observación expandida
-    style_obs_row = ParagraphStyle(
-        'ObsRowStyle', 
-        parent=styles['Normal'], 
-        fontName=FONT_ITALIC, 
-        fontSize=6.5, 
-        textColor=TEXT_GRAY, 
-        alignment=TA_LEFT,
-        leftIndent=3
-    )
+    # --- ESTILOS Y ETIQUETAS (registro del proceso) ---
+    styles = get_pdf_styles()
+    blocks = get_static_blocks(user_language)
+    style_section_header = styles['section_header']
+    style_label = styles['label']
+    style_value = styles['value']
+    style_table_cell = styles['table_cell']
+    style_table_cell_left = styles['table_cell_left']
+    style_obs_row = styles['obs_row']
+
+    def static(style_name, key):
+        """Paragraph de una etiqueta fija, sin volver a parsear su marcado."""
+        return new_paragraph(blocks[(style_name, key)], styles[style_name])
 
     # ================= ENCABEZADO PRINCIPAL (CORREGIDO) =================
-    header_left_content = [Paragraph(get_translation('service_order'), style_title), Paragraph(get_translation('official_document'), style_subtitle)]
+    header_left_content = [static('title', 'service_order'), static('subtitle', 'official_document')]
     
     estado_display = pedido.get_estado_display()
     try: 
@@ -226,10 +422,10 @@ def generate_pedido_pdf(pedido, request=None):
         fecha_registro = str(pedido.created_at)
 
     header_right_data = [
-        [Paragraph(get_translation('order_number'), style_label), Paragraph(f"#{pedido.numero_pedido}", style_value)],
-        [Paragraph(get_translation('status'), style_label), Paragraph(f'<font color="{STATUS_GREEN.hexval()}"><b>{estado_display}</b></font>', style_value)],
-        [Paragraph(get_translation('date'), style_label), Paragraph(fecha_registro, style_value)],
-        [Paragraph(get_translation('requester'), style_label), Paragraph(f"{pedido.usuario_creacion.get_full_name() if pedido.usuario_creacion else '-'}", style_value)],
+        [static('label', 'order_number'), Paragraph(f"#{pedido.numero_pedido}", style_value)],
+        [static('label', 'status'), Paragraph(f'<font color="{STATUS_GREEN.hexval()}"><b>{estado_display}</b></font>', style_value)],
+        [static('label', 'date'), Paragraph(fecha_registro, style_value)],
+        [static('label', 'requester'), Paragraph(f"{pedido.usuario_creacion.get_full_name() if pedido.usuario_creacion else '-'}", style_value)],
     ]
     
     # Ancho de la tabla derecha (3cm + 4cm = 7cm)
@@ -263,7 +459,7 @@ def generate_pedido_pdf(pedido, request=None):
     story.append(Spacer(1, 0.15*cm))
     
     # ================= DATOS DEL CLIENTE =================
-    story.append(Paragraph(get_translation('client_data'), style_section_header))
+    story.append(static('section_header', 'client_data'))
     # Usamos available_width
     story.append(Table([['']], colWidths=[available_width], rowHeights=[1], style=TableStyle([('BACKGROUND', (0, 0), (-1, -1), CORPORATE_BLUE)])))
     story.append(Spacer(1, 0.1*cm))
@@ -272,12 +468,12 @@ def generate_pedido_pdf(pedido, request=None):
     num_contacto = cliente.num_contacto if cliente and hasattr(cliente, 'num_contacto') else ''
     
     client_data = [
-        [[Paragraph(get_translation('name_company'), style_label), Paragraph(cliente.nombre if cliente else 'N/A', style_value)],
-         [Paragraph(get_translation('id_document'), style_label), Paragraph(cliente.numero_documento if cliente else 'N/A', style_value)]],
-        [[Paragraph(get_translation('email'), style_label), Paragraph(cliente.email if cliente else 'N/A', style_value)],
-         [Paragraph(get_translation('phone'), style_label), Paragraph(cliente.telefono if cliente else 'N/A', style_value)]],
-        [[Paragraph(get_translation('contact_phone'), style_label), Paragraph(num_contacto or 'N/A', style_value)],
-         [Paragraph(get_translation('address'), style_label), Paragraph(cliente.direccion if hasattr(cliente, 'direccion') and cliente.direccion else 'N/A', style_value)]]
+        [[static('label', 'name_company'), Paragraph(cliente.nombre if cliente else 'N/A', style_value)],
+         [static('label', 'id_document'), Paragraph(cliente.numero_documento if cliente else 'N/A', style_value)]],
+        [[static('label', 'email'), Paragraph(cliente.email if cliente else 'N/A', style_value)],
+         [static('label', 'phone'), Paragraph(cliente.telefono if cliente else 'N/A', style_value)]],
+        [[static('label', 'contact_phone'), Paragraph(num_contacto or 'N/A', style_value)],
+         [static('label', 'address'), Paragraph(cliente.direccion if hasattr(cliente, 'direccion') and cliente.direccion else 'N/A', style_value)]]
     ]
     # Ajustamos ancho columnas
     client_table = Table(client_data, colWidths=[available_width / 2.0] * 2)
@@ -286,7 +482,7 @@ def generate_pedido_pdf(pedido, request=None):
     story.append(Spacer(1, 0.1*cm))
     
     # ================= ASIGNACIONES Y PLAZOS =================
-    story.append(Paragraph(get_translation('assignments_deadlines'), style_section_header))
+    story.append(static('section_header', 'assignments_deadlines'))
     story.append(Table([['']], colWidths=[available_width], rowHeights=[1], style=TableStyle([('BACKGROUND', (0, 0), (-1, -1), CORPORATE_BLUE)])))
     story.append(Spacer(1, 0.1*cm))
     
@@ -307,12 +503,12 @@ def generate_pedido_pdf(pedido, request=None):
         logger.info(f"PDF - Instalador: N/A")
     
     assignments_data = [
-        [[Paragraph(get_translation('supervisor'), style_label), Paragraph(pedido.supervisor or 'N/A', style_value)],
-         [Paragraph(get_translation('start_date'), style_label), Paragraph(pedido.fecha_inicio.strftime('%d/%m/%Y') if pedido.fecha_inicio else 'N/A', style_value)],
-         [Paragraph(get_translation('fabricator'), style_label), Paragraph(fabricador_nombre, style_value)]],
-        [[Paragraph(get_translation('current_status'), style_label), Paragraph(estado_display, style_value)],
-         [Paragraph(get_translation('end_date'), style_label), Paragraph(pedido.fecha_fin.strftime('%d/%m/%Y') if pedido.fecha_fin else 'N/A', style_value)],
-         [Paragraph(get_translation('installer'), style_label), Paragraph(instalador_nombre, style_value)]]
+        [[static('label', 'supervisor'), Paragraph(pedido.supervisor or 'N/A', style_value)],
+         [static('label', 'start_date'), Paragraph(pedido.fecha_inicio.strftime('%d/%m/%Y') if pedido.fecha_inicio else 'N/A', style_value)],
+         [static('label', 'fabricator'), Paragraph(fabricador_nombre, style_value)]],
+        [[static('label', 'current_status'), Paragraph(estado_display, style_value)],
+         [static('label', 'end_date'), Paragraph(pedido.fecha_fin.strftime('%d/%m/%Y') if pedido.fecha_fin else 'N/A', style_value)],
+         [static('label', 'installer'), Paragraph(instalador_nombre, style_value)]]
     ]
     # Ajuste dinámico de columnas para llenar el ancho
     assignments_table = Table(assignments_data, colWidths=[3.0*cm, 3.0*cm, available_width - 6*cm])
@@ -324,27 +520,28 @@ def generate_pedido_pdf(pedido, request=None):
     story.append(Spacer(1, 0.1*cm))
     
     # ================= DETALLE DE ÍTEMS =================
-    story.append(Paragraph(get_translation('items_detail'), style_section_header))
+    story.append(static('section_header', 'items_detail'))
     story.append(Table([['']], colWidths=[available_width], rowHeights=[1], style=TableStyle([('BACKGROUND', (0, 0), (-1, -1), CORPORATE_BLUE)])))
     story.append(Spacer(1, 0.1*cm))
     
-    if pedido.items.exists():
-        items_data = []
-        
-        # Iteración de Items - Cada item tiene su propio encabezado
-        for item in pedido.items.all():
-            # Encabezado repetido para cada item
-            row_header = [
-                Paragraph(get_translation('environment'), style_table_header),
-                Paragraph(get_translation('model'), style_table_header),
-                Paragraph(get_translation('fabric'), style_table_header),
-                Paragraph(get_translation('width'), style_table_header),
-                Paragraph(get_translation('height'), style_table_header),
-                Paragraph(get_translation('quantity'), style_table_header),
-                Paragraph(get_translation('command'), style_table_header),
-                Paragraph(get_translation('system'), style_table_header),
-            ]
-            
+    items = list(pedido.items.all())
+    if items:
+        if dense is None:
+            dense = use_dense_layout(len(items))
+
+        layout = get_items_table_layout(dense)
+
+        # Encabezado de la tabla (parseado una vez por idioma)
+        row_header = [
+            static('table_header', key)
+            for key in ('environment', 'model', 'fabric', 'width', 'height', 'quantity', 'command', 'system')
+        ]
+
+        if dense:
+            # Modo denso: un único encabezado (se repite al cortar página)
+            layout.add_row('header', row_header)
+
+        for i, item in enumerate(items):
             lado_comando = item.get_lado_comando_display() if item.lado_comando else '-'
             obs_text = item.observaciones if item.observaciones else ""
             
@@ -365,63 +562,32 @@ def generate_pedido_pdf(pedido, request=None):
                 row_obs = [Paragraph(f"<b>{get_translation('observations')}</b> {obs_text}", style_obs_row)] + [''] * 7
             else:
                 row_obs = [Paragraph("", style_obs_row)] + [''] * 7
-            
-            items_data.append(row_header)
-            items_data.append(row_main)
-            items_data.append(row_obs)
-        
-        item_col_widths = [
-            available_width * 0.18, # Ambiente
-            available_width * 0.14, # Modelo
-            available_width * 0.18, # Tejido
-            available_width * 0.08, # Ancho
-            available_width * 0.08, # Alto
-            available_width * 0.06, # Cant
-            available_width * 0.14, # Comando
-            available_width * 0.14  # Sistema
-        ]
-        
-        items_table = Table(items_data, colWidths=item_col_widths)
-        
-        # Estilos para cada bloque (encabezado + datos + observaciones)
-        table_style_cmds = [
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]
-        
-        num_items = len(pedido.items.all())
-        
-        for i in range(num_items):
-            # Cada item ocupa 3 filas: encabezado, datos, observaciones
-            row_header_idx = i * 3
-            row_main_idx = row_header_idx + 1
-            row_obs_idx = row_header_idx + 2
-            
-            # Estilo del encabezado
-            table_style_cmds.append(('BACKGROUND', (0, row_header_idx), (-1, row_header_idx), HEADER_TABLE_GRAY))
-            table_style_cmds.append(('LINEABOVE', (0, row_header_idx), (-1, row_header_idx), 1, HEADER_TABLE_GRAY))
-            table_style_cmds.append(('TOPPADDING', (0, row_header_idx), (-1, row_header_idx), 6))
-            table_style_cmds.append(('BOTTOMPADDING', (0, row_header_idx), (-1, row_header_idx), 6))
-            
-            # Fondo alternado para datos del item
-            bg_color = HEADER_GRAY if (i % 2 == 0) else colors.white
-            table_style_cmds.append(('BACKGROUND', (0, row_main_idx), (-1, row_main_idx), bg_color))
-            
-            # Unir celdas de observación (span completo)
-            table_style_cmds.append(('SPAN', (0, row_obs_idx), (-1, row_obs_idx)))
-            table_style_cmds.append(('BACKGROUND', (0, row_obs_idx), (-1, row_obs_idx), bg_color))
-            table_style_cmds.append(('BOTTOMPADDING', (0, row_obs_idx), (-1, row_obs_idx), 8))
-            table_style_cmds.append(('TOPPADDING', (0, row_obs_idx), (-1, row_obs_idx), 2))
-            
-            # Línea divisoria entre items
-            table_style_cmds.append(('LINEBELOW', (0, row_obs_idx), (-1, row_obs_idx), 1, CORPORATE_BLUE))
 
-        items_table.setStyle(TableStyle(table_style_cmds))
-        story.append(items_table)
+            layout.start_group()
+            if dense:
+                # Sin fila de observación vacía ni fondo alternado
+                if obs_text:
+                    layout.add_row('main_obs', row_main)
+                    layout.add_row('obs', row_obs)
+                else:
+                    layout.add_row('main', row_main)
+            else:
+                # Cada item: encabezado + datos + observaciones, con fondo alternado
+                paridad = 'par' if i % 2 == 0 else 'impar'
+                layout.add_row('header', row_header)
+                layout.add_row(f'main_{paridad}', row_main)
+                layout.add_row(f'obs_{paridad}', row_obs)
+        
+        story.extend(layout.build_chunks(
+            colWidths=get_items_col_widths(available_width), repeatRows=1 if dense else 0
+        ))
         
     else:
-        story.append(Paragraph(get_translation('no_items'), style_value))
+        story.append(static('value', 'no_items'))
     
-    doc.build(story, onFirstPage=_footer_fn, onLaterPages=_footer_fn)
+    # La fecha del pie sale del pedido (parte de la huella de la caché), no del reloj
+    footer = functools.partial(_footer_fn, fecha=timezone.localtime(pedido.updated_at))
+    doc.build(story, onFirstPage=footer, onLaterPages=footer)
     buffer.seek(0)
     
     # Restaurar el idioma anterior
@@ -429,8 +595,16 @@ def generate_pedido_pdf(pedido, request=None):
     
     return buffer
 
-def _footer_fn(canvas, doc):
-    """Genera el pie de página con fecha, título y numeración."""
+# Nombre del form XObject con la parte estática del pie del pedido
+FOOTER_FORM_NAME = 'PedidoFooter'
+
+
+def _draw_static_footer(canvas, doc, fecha):
+    """
+    Dibuja la parte del pie que no cambia entre páginas (línea, fecha de
+    última actualización del pedido y título). Se captura una vez por
+    documento como form XObject.
+    """
     canvas.saveState()
     font_size = 8
     line_y = 2 * cm
@@ -443,15 +617,29 @@ def _footer_fn(canvas, doc):
     canvas.setFont(FONT_MAIN, font_size)
     canvas.setFillColor(colors.grey)
     
-    fecha_gen = datetime.now().strftime("%d/%m/%Y %H:%M")
-    canvas.drawString(doc.leftMargin, text_y, f"{get_translation('generated')} {fecha_gen}")
+    canvas.drawString(doc.leftMargin, text_y, f"{get_translation('updated')} {fecha.strftime('%d/%m/%Y %H:%M')}")
     
     title_text = "Pedido de Servicio - Cotidomo"
     text_width = canvas.stringWidth(title_text, FONT_MAIN, font_size)
     canvas.drawString((A4[0] - text_width) / 2.0, text_y, title_text)
     
+    canvas.restoreState()
+
+
+def _footer_fn(canvas, doc, fecha):
+    """Genera el pie de página con fecha, título y numeración."""
+    # Parte estática: se dibuja en la primera página y se reutiliza
+    stamp_form(canvas, FOOTER_FORM_NAME, lambda c: _draw_static_footer(c, doc, fecha))
+
+    canvas.saveState()
+    font_size = 8
+    text_y = 2 * cm - 10
+
+    canvas.setFont(FONT_MAIN, font_size)
+    canvas.setFillColor(colors.grey)
+    
     page_num_text = f"{get_translation('page')}. {doc.page}"
     page_num_width = canvas.stringWidth(page_num_text, FONT_MAIN, font_size)
     canvas.drawString(A4[0] - doc.rightMargin - page_num_width, text_y, page_num_text)
     
-    canvas.restoreState()
\ No newline at end of file
+    canvas.restoreState()
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import PedidoServicio, ItemPedidoServicio
+from .models import PedidoServicio, ItemPedidoServicio, HistorialEstadoPedido
+from .constants import CAMBIO_ESTADO_LOTE_MAX
 from clientes.models import Cliente
 from manufactura.models import Manufactura
 
@@ -149,10 +150,13 @@ class PedidoServicioSerializer(serializers.ModelSerializer):
 # LISTADO
 # -------------------------
 class PedidoServicioListSerializer(serializers.ModelSerializer):
+    """
+    `total_items` viene anotado en SQL (Count) por el queryset del listado.
+    """
 
     cliente_nombre = serializers.CharField(source='cliente.nombre', read_only=True)
     estado_display = serializers.CharField(source='get_estado_display', read_only=True)
-    total_items = serializers.IntegerField(source='items.count', read_only=True)
+    total_items = serializers.IntegerField(read_only=True)
 
     manufacturador_nombre = serializers.SerializerMethodField()
     instalador_nombre = serializers.SerializerMethodField()
@@ -256,3 +260,77 @@ class PedidoServicioDetailSerializer(serializers.ModelSerializer):
             'created_at',
             'updated_at',
         ]
+
+
+# -------------------------
+# HISTORIAL DE ESTADOS
+# -------------------------
+class HistorialEstadoPedidoSerializer(serializers.ModelSerializer):
+
+    estado_anterior_display = serializers.CharField(source='get_estado_anterior_display', read_only=True)
+    estado_nuevo_display = serializers.CharField(source='get_estado_nuevo_display', read_only=True)
+    usuario_nombre = serializers.SerializerMethodField()
+    fecha = serializers.SerializerMethodField()
+
+    def get_fecha(self, obj):
+        return timezone.localtime(obj.fecha).isoformat()
+
+    def get_usuario_nombre(self, obj):
+        if obj.usuario:
+            return obj.usuario.get_full_name() or obj.usuario.username
+        return None
+
+    class Meta:
+        model = HistorialEstadoPedido
+        fields = [
+            'id', 'fecha',
+            'estado_anterior', 'estado_anterior_display',
+            'estado_nuevo', 'estado_nuevo_display',
+            'usuario_nombre',
+        ]
+        read_only_fields = fields
+
+
+# -------------------------
+# CAMBIO DE ESTADO EN LOTE
+# -------------------------
+class TransicionPedidoSerializer(serializers.Serializer):
+    pedido = serializers.IntegerField()
+    estado = serializers.ChoiceField(choices=PedidoServicio.EstadoPedido.choices)
+
+
+class CambioEstadoLoteSerializer(serializers.Serializer):
+    """
+    Acepta dos formas:
+    - {"pedidos": [1, 2, 3], "estado": "EN_FABRICACION"}: todos al mismo estado
+    - {"transiciones": [{"pedido": 1, "estado": "EN_FABRICACION"}, ...]}
+
+    `validated_data['cambios']` queda como {pedido_id: nuevo_estado}.
+    """
+
+    pedidos = serializers.ListField(child=serializers.IntegerField(), required=False)
+    estado = serializers.ChoiceField(choices=PedidoServicio.EstadoPedido.choices, required=False)
+    transiciones = TransicionPedidoSerializer(many=True, required=False)
+
+    def validate(self, attrs):
+        if 'transiciones' in attrs:
+            pares = [(t['pedido'], t['estado']) for t in attrs['transiciones']]
+        elif 'pedidos' in attrs and 'estado' in attrs:
+            pares = [(pedido_id, attrs['estado']) for pedido_id in attrs['pedidos']]
+        else:
+            raise serializers.ValidationError(
+                "Debe enviar 'transiciones' o bien 'pedidos' junto con 'estado'."
+            )
+
+        if not pares:
+            raise serializers.ValidationError("Debe incluir al menos un pedido.")
+        if len(pares) > CAMBIO_ESTADO_LOTE_MAX:
+            raise serializers.ValidationError(
+                f"Máximo {CAMBIO_ESTADO_LOTE_MAX} pedidos por solicitud."
+            )
+
+        cambios = dict(pares)
+        if len(cambios) != len(pares):
+            raise serializers.ValidationError("Un pedido no puede aparecer más de una vez.")
+
+        return {'cambios': cambios}
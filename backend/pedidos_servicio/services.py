@@ -7,13 +7,19 @@ Incluye funciones para validaciones, cálculos y operaciones con reintentos.
 
 import time
 import logging
-from django.db import transaction, OperationalError
+from decimal import Decimal, ROUND_UP
+from django.core.exceptions import ValidationError
+from django.db import transaction, IntegrityError, OperationalError
 from django.db.models import Max
-from .models import ItemPedidoServicio
+from django.utils import timezone
+from .models import HistorialEstadoPedido, ItemPedidoServicio, PedidoServicio
 from .constants import (
     TRANSICIONES_ESTADO_VALIDAS,
     DB_LOCK_MAX_RETRIES,
-    DB_LOCK_RETRY_BASE_DELAY
+    DB_LOCK_RETRY_BASE_DELAY,
+    LADO_COMANDO_DESDE_ATRIBUTO,
+    LADO_COMANDO_POR_DEFECTO,
+    CAIDAS_INVERSAS,
 )
 
 logger = logging.getLogger(__name__)
@@ -64,6 +70,63 @@ class PedidoServicioService:
         
         return True, None
     
+    @staticmethod
+    def aplicar_cambios_estado(pedidos, cambios, usuario=None):
+        """
+        Aplica cambios de estado ya validados con un UPDATE por estado
+        destino y registra todas las transiciones en HistorialEstadoPedido
+        con un solo INSERT (no dispara post_save: las notificaciones las
+        agrupa el llamador). Debe llamarse dentro de una transacción.
+
+        Cada UPDATE vuelve a exigir que el pedido esté en un estado desde el
+        que la transición es válida; si alguno cambió entretanto, lanza
+        ValidationError y el llamador revierte todo el lote.
+
+        Args:
+            pedidos: PedidoServicio afectados, con su estado actual (se
+                actualiza en memoria)
+            cambios: dict {pedido_id: nuevo_estado}
+            usuario: Usuario que realiza el cambio (opcional)
+
+        Returns:
+            dict: {nuevo_estado: [pedido_id, ...]}
+        """
+        por_estado = {}
+        for pedido_id, nuevo_estado in cambios.items():
+            por_estado.setdefault(nuevo_estado, []).append(pedido_id)
+
+        ahora = timezone.now()
+        for nuevo_estado, ids in por_estado.items():
+            origenes = [
+                origen for origen, destinos in TRANSICIONES_ESTADO_VALIDAS.items()
+                if nuevo_estado in destinos
+            ]
+            actualizados = PedidoServicio.objects.filter(pk__in=ids, estado__in=origenes).update(
+                estado=nuevo_estado,
+                updated_at=ahora,
+                usuario_modificacion=usuario,
+            )
+            if actualizados != len(ids):
+                raise ValidationError(
+                    f"Algunos pedidos cambiaron de estado durante la operación; no se pudo pasar a {nuevo_estado}."
+                )
+
+        historial = []
+        for pedido in pedidos:
+            historial.append(HistorialEstadoPedido(
+                pedido=pedido,
+                estado_anterior=pedido.estado,
+                estado_nuevo=cambios[pedido.pk],
+                usuario=usuario,
+                fecha=ahora,
+            ))
+            pedido.estado = pedido._estado_guardado = cambios[pedido.pk]
+        HistorialEstadoPedido.objects.bulk_create(historial)
+
+        resumen = {estado: len(ids) for estado, ids in por_estado.items()}
+        logger.info(f"✅ Cambio de estado en lote: {resumen}")
+        return por_estado
+
     @staticmethod
     def save_with_retry(serializer, max_retries=None, retry_delay=None):
         """
@@ -102,6 +165,113 @@ class PedidoServicioService:
                 raise
 
 
+class ConversionCotizacionService:
+    """Genera el Pedido de Servicio de una cotización aceptada"""
+
+    @staticmethod
+    def crear_desde_cotizacion(cotizacion, usuario=None):
+        """
+        Crea el pedido y sus ítems a partir de los ambientes e ítems de la
+        cotización: un INSERT para el encabezado y un bulk_create para todos
+        los ítems, dentro de la transacción del llamador.
+
+        Es idempotente: si la cotización ya tiene pedido, lo retorna sin
+        crear otro. La unicidad de PedidoServicio.cotizacion protege además
+        contra dos aceptaciones simultáneas (la segunda recibe el pedido de
+        la primera). Los emails del pedido (signals) salen al confirmar.
+
+        Solo se trasladan los ítems fabricables (productos que requieren
+        medidas); servicios y accesorios quedan en la cotización.
+
+        Args:
+            cotizacion: Cotizacion aceptada
+            usuario: Usuario de creación (opcional)
+
+        Returns:
+            tuple: (PedidoServicio, creado: bool)
+        """
+        existente = PedidoServicio.objects.filter(cotizacion=cotizacion).first()
+        if existente is not None:
+            return existente, False
+
+        from cotizaciones.models import CotizacionItem
+
+        items = CotizacionItem.objects.filter(
+            ambiente__cotizacion=cotizacion,
+            producto__requiere_medidas=True,
+        ).select_related('ambiente', 'producto').order_by('ambiente__orden', 'numero_item')
+
+        vendedor = cotizacion.vendedor
+        try:
+            with transaction.atomic():
+                pedido = PedidoServicio(
+                    cotizacion=cotizacion,
+                    cliente_id=cotizacion.cliente_id,
+                    solicitante=vendedor.get_full_name() if vendedor else '',
+                    fecha_emision=timezone.localdate(),
+                    observaciones=f"Generado desde la cotización {cotizacion.numero}",
+                    usuario_creacion=usuario,
+                )
+                pedido.save()
+        except IntegrityError:
+            # Otra aceptación concurrente ganó la carrera
+            existente = PedidoServicio.objects.filter(cotizacion=cotizacion).first()
+            if existente is None:
+                raise
+            return existente, False
+
+        items_pedido = ItemPedidoServicio.objects.bulk_create([
+            ConversionCotizacionService.construir_item(pedido, item, numero_item, usuario)
+            for numero_item, item in enumerate(items, start=1)
+        ])
+
+        logger.info(
+            f"✅ Pedido {pedido.numero_pedido} generado desde la cotización "
+            f"{cotizacion.numero} ({len(items_pedido)} ítems)"
+        )
+        return pedido, True
+
+    @staticmethod
+    def construir_item(pedido, item, numero_item, usuario=None):
+        """
+        Traduce un CotizacionItem a ItemPedidoServicio (sin guardar).
+
+        Los atributos del formulario de cotización son texto libre
+        ('tejido', 'mando'/'lado_comando', 'caida', 'acionamiento'); lo que
+        no se reconoce toma el valor por defecto.
+        """
+        atributos = item.atributos_seleccionados or {}
+
+        lado = str(atributos.get('lado_comando') or atributos.get('mando') or atributos.get('comando') or '')
+        lado_comando = LADO_COMANDO_DESDE_ATRIBUTO.get(lado.strip().upper()[:3], LADO_COMANDO_POR_DEFECTO)
+
+        caida = str(atributos.get('caida') or atributos.get('posicion_tejido') or '').strip().upper()
+        acionamiento = str(atributos.get('acionamiento') or '').strip().upper()
+
+        return ItemPedidoServicio(
+            pedido_servicio=pedido,
+            numero_item=numero_item,
+            ambiente=item.ambiente.nombre[:200],
+            modelo=item.producto.nombre[:100],
+            tejido=str(atributos.get('tejido') or '')[:150],
+            largura=item.ancho.quantize(Decimal('0.01')),
+            altura=item.alto.quantize(Decimal('0.01')),
+            cantidad_piezas=max(int(item.cantidad.to_integral_value(ROUND_UP)), 1),
+            posicion_tejido=(
+                ItemPedidoServicio.PosicionTejido.INVERSO if caida in CAIDAS_INVERSAS
+                else ItemPedidoServicio.PosicionTejido.NORMAL
+            ),
+            lado_comando=lado_comando,
+            acionamiento=(
+                ItemPedidoServicio.Acionamiento.MOTORIZADO
+                if acionamiento == ItemPedidoServicio.Acionamiento.MOTORIZADO
+                else ItemPedidoServicio.Acionamiento.MANUAL
+            ),
+            observaciones=item.descripcion_tecnica,
+            usuario_creacion=usuario,
+        )
+
+
 class ItemPedidoServicioService:
     """Servicio con lógica de negocio para Items de Pedidos"""
     
@@ -5,6 +5,7 @@ Dispara acciones automáticas cuando ocurren eventos como:
 - Cambiar estado de PedidoServicio → Notificar cambios por email
 """
 
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.core.mail import send_mail
@@ -28,14 +29,21 @@ def notificar_cambio_pedido(sender, instance, created, **kwargs):
     
     - Si es CREACIÓN: Envía email de NUEVO PEDIDO a fabricador e instalador
     - Si es ACTUALIZACIÓN: Envía email de CAMBIO DE ESTADO
+
+    Los emails se envían al confirmar la transacción: si se revierte (p. ej.
+    falla la conversión de una cotización a pedido) no sale ninguno, y el
+    envío SMTP no retiene los bloqueos de la transacción.
     """
-    try:
-        if created:
-            enviar_email_nuevo_pedido(instance)
-        else:
-            enviar_email_cambio_estado_pedido(instance)
-    except Exception as e:
-        logger.error(f"Error al enviar email de PedidoServicio {instance.numero_pedido}: {str(e)}")
+    def _notificar():
+        try:
+            if created:
+                enviar_email_nuevo_pedido(instance)
+            else:
+                enviar_email_cambio_estado_pedido(instance)
+        except Exception as e:
+            logger.error(f"Error al enviar email de PedidoServicio {instance.numero_pedido}: {str(e)}")
+
+    transaction.on_commit(_notificar)
 
 
 def enviar_email_nuevo_pedido(pedido):
@@ -134,6 +142,52 @@ Sistema Cotidomo
         enviar_email(instalador.email, asunto, mensaje)
 
 
+def notificar_cambios_estado_lote(pedidos):
+    """
+    Notifica un cambio de estado en lote con UN email por destinatario que
+    lista todos sus pedidos afectados (en lugar de un email por pedido).
+    Mismas reglas que enviar_email_cambio_estado_pedido: el manufacturador
+    recibe los estados de fabricación y el instalador los de instalación.
+
+    Se envía al confirmar la transacción en curso.
+
+    Args:
+        pedidos: PedidoServicio con el nuevo estado y manufacturador/instalador cargados
+    """
+    por_destinatario = {}
+    for pedido in pedidos:
+        if pedido.estado in ESTADOS_NOTIFICACION_FABRICADOR and pedido.manufacturador:
+            por_destinatario.setdefault(pedido.manufacturador, []).append(pedido)
+        if pedido.estado in ESTADOS_NOTIFICACION_INSTALADOR and pedido.instalador:
+            por_destinatario.setdefault(pedido.instalador, []).append(pedido)
+
+    def _enviar():
+        for persona, sus_pedidos in por_destinatario.items():
+            if not persona.email:
+                continue
+            lineas = "\n".join(
+                f"- {pedido.numero_pedido}: {MENSAJES_ESTADO.get(pedido.estado, pedido.estado)}"
+                for pedido in sus_pedidos
+            )
+            asunto = f"Actualización de {len(sus_pedidos)} pedido(s)"
+            mensaje = f"""
+Estimado/a {persona.get_full_name()},
+
+Los siguientes pedidos cambiaron de estado:
+
+{lineas}
+
+Por favor revisar los detalles en el sistema.
+
+Saludos,
+Sistema Cotidomo
+        """
+            enviar_email(persona.email, asunto, mensaje)
+
+    if por_destinatario:
+        transaction.on_commit(_enviar)
+
+
 def enviar_email(destinatario, asunto, mensaje):
     """
     Función auxiliar para enviar emails.
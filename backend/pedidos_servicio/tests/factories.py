@@ -0,0 +1,64 @@
+# pedidos_servicio/tests/factories.py
+from decimal import Decimal
+
+import factory
+from factory.django import DjangoModelFactory
+
+from cotizaciones.tests.factories import ClienteFactory, UserFactory, VendedorFactory
+from pedidos_servicio.models import ItemPedidoServicio, PedidoServicio
+
+__all__ = [
+    'ClienteFactory',
+    'UserFactory',
+    'VendedorFactory',
+    'PedidoServicioFactory',
+    'ItemPedidoServicioFactory',
+    'crear_pedido_con_items',
+]
+
+
+class PedidoServicioFactory(DjangoModelFactory):
+    class Meta:
+        model = PedidoServicio
+
+    cliente = factory.SubFactory(ClienteFactory)
+    solicitante = 'Rita López'
+    supervisor = 'Supervisor Test'
+
+
+class ItemPedidoServicioFactory(DjangoModelFactory):
+    class Meta:
+        model = ItemPedidoServicio
+
+    pedido_servicio = factory.SubFactory(PedidoServicioFactory)
+    numero_item = factory.Sequence(lambda n: n + 1)
+    ambiente = factory.Sequence(lambda n: f'Ambiente {n}')
+    modelo = 'Roller'
+    tejido = 'Blackout'
+    largura = Decimal('1.50')
+    altura = Decimal('2.00')
+    cantidad_piezas = 1
+    lado_comando = ItemPedidoServicio.LadoComando.IZQUIERDO
+    acionamiento = ItemPedidoServicio.Acionamiento.MANUAL
+
+
+def crear_pedido_con_items(num_items, **kwargs):
+    """Crea un pedido con `num_items` ítems usando una inserción masiva."""
+    pedido = PedidoServicioFactory(**kwargs)
+    ItemPedidoServicio.objects.bulk_create([
+        ItemPedidoServicio(
+            pedido_servicio=pedido,
+            numero_item=i + 1,
+            ambiente=f'Ambiente {i + 1}',
+            modelo='Roller',
+            tejido='Blackout',
+            largura=Decimal('1.50'),
+            altura=Decimal('2.00'),
+            cantidad_piezas=1,
+            lado_comando=ItemPedidoServicio.LadoComando.IZQUIERDO,
+            acionamiento=ItemPedidoServicio.Acionamiento.MANUAL,
+            observaciones='Instalar por dentro del vano' if i % 2 == 0 else '',
+        )
+        for i in range(num_items)
+    ])
+    return pedido
@@ -0,0 +1,221 @@
+# pedidos_servicio/tests/test_analitica.py
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from pedidos_servicio.analitica import AnaliticaPedidosService, inicio_semana, percentil_histograma
+from pedidos_servicio.models import HistorialEstadoPedido, PedidoServicio, ResumenSemanalEtapa
+from .factories import PedidoServicioFactory, UserFactory, VendedorFactory
+
+Estado = PedidoServicio.EstadoPedido
+FLUJO = [Estado.ENVIADO, Estado.ACEPTADO, Estado.EN_FABRICACION, Estado.LISTO_INSTALAR, Estado.INSTALADO, Estado.COMPLETADO]
+
+
+def _historial(pedido, inicio, horas):
+    """Transiciones sintéticas: creación en `inicio` y luego cada estado de FLUJO tras `horas[i]`"""
+    filas, fecha, anterior = [], inicio, ''
+    for estado, espera in zip(FLUJO, [0, *horas]):
+        fecha += timedelta(hours=espera)
+        filas.append(HistorialEstadoPedido(pedido=pedido, estado_anterior=anterior, estado_nuevo=estado, fecha=fecha))
+        anterior = estado
+    return filas
+
+
+class TestPercentilHistograma(SimpleTestCase):
+
+    def test_interpola_dentro_del_tramo(self):
+        # 10 permanencias en el tramo 8-24 h
+        self.assertEqual(percentil_histograma({'3': 10}, 50, 30), 16.0)
+        self.assertEqual(percentil_histograma({'3': 10}, 100, 30), 24.0)
+
+    def test_acota_con_el_maximo(self):
+        self.assertEqual(percentil_histograma({'3': 4}, 100, 10), 10.0)
+        # Tramo abierto (> 1440 h)
+        self.assertEqual(percentil_histograma({'14': 1}, 50, 2000), 1720.0)
+
+    def test_vacio(self):
+        self.assertIsNone(percentil_histograma({}, 50, 0))
+
+
+@pytest.mark.django_db
+class TestAnaliticaPedidos(TestCase):
+
+    def setUp(self):
+        self.ahora = timezone.now()
+        self.inicio = self.ahora - timedelta(weeks=3)
+        self.pedidos = PedidoServicioFactory.create_batch(10)
+        # Se reemplaza el historial de la creación por uno con fechas controladas
+        HistorialEstadoPedido.objects.all().delete()
+        filas = []
+        for n, pedido in enumerate(self.pedidos):
+            # ACEPTADO: 2 h; EN_FABRICACION: 10..100 h; LISTO_INSTALAR: 30 h
+            filas += _historial(pedido, self.inicio, [1, 2, 10 * (n + 1), 30, 5, 1])
+        HistorialEstadoPedido.objects.bulk_create(filas)
+
+    def _consultar(self, semanas=8):
+        metricas = AnaliticaPedidosService.consultar(semanas=semanas, ahora=self.ahora)
+        # La marca de tiempo cambia con cada actualización; se comparan las métricas
+        metricas.pop('actualizado')
+        return metricas
+
+    def test_permanencia_por_etapa(self):
+        self.assertEqual(AnaliticaPedidosService.actualizar(ahora=self.ahora), 60)
+
+        permanencia = self._consultar()['permanencia']
+
+        aceptado = permanencia[Estado.ACEPTADO]
+        self.assertEqual(aceptado['cantidad'], 10)
+        self.assertEqual(aceptado['promedio_horas'], 2.0)
+        self.assertEqual(aceptado['max_horas'], 2.0)
+        self.assertTrue(1 <= aceptado['p50_horas'] <= 2)
+
+        fabricacion = permanencia[Estado.EN_FABRICACION]
+        self.assertEqual(fabricacion['promedio_horas'], 55.0)
+        self.assertEqual(fabricacion['max_horas'], 100.0)
+        # Reales: p50 = 50-60 h, p90 = 90 h; la estimación cae en el tramo correcto
+        self.assertTrue(48 <= fabricacion['p50_horas'] <= 72)
+        self.assertTrue(72 <= fabricacion['p90_horas'] <= 100)
+        self.assertLessEqual(fabricacion['p50_horas'], fabricacion['p90_horas'])
+        self.assertLessEqual(fabricacion['p90_horas'], fabricacion['p95_horas'])
+
+        self.assertEqual(permanencia[Estado.LISTO_INSTALAR]['promedio_horas'], 30.0)
+
+    def test_throughput_semanal(self):
+        AnaliticaPedidosService.actualizar(ahora=self.ahora)
+
+        throughput = self._consultar(semanas=5)['throughput']
+
+        self.assertEqual(len(throughput), 5)
+        self.assertEqual(throughput[-1]['semana'], inicio_semana(self.ahora))
+        # Cada pedido completa 1 + 2 + 10 * (n + 1) + 30 + 5 + 1 horas después del inicio
+        esperados = Counter(inicio_semana(self.inicio + timedelta(hours=49 + 10 * n)) for n in range(10))
+        self.assertEqual({s['semana']: s['completados'] for s in throughput if s['completados']}, dict(esperados))
+
+    def test_incremental_igual_a_reconstruir(self):
+        # Primero en dos tandas: las transiciones recientes esperan el margen
+        pedido = PedidoServicioFactory()
+        HistorialEstadoPedido.objects.filter(pedido=pedido).delete()
+        HistorialEstadoPedido.objects.bulk_create(_historial(pedido, self.ahora - timedelta(hours=4), [1, 1, 1])[:4])
+
+        primera = AnaliticaPedidosService.actualizar(ahora=self.ahora - timedelta(hours=2))
+        segunda = AnaliticaPedidosService.actualizar(ahora=self.ahora)
+        self.assertEqual((primera, segunda), (62, 2))
+        self.assertEqual(AnaliticaPedidosService.actualizar(ahora=self.ahora), 0)
+
+        incremental = self._consultar()
+        resumenes = list(ResumenSemanalEtapa.objects.values_list('semana', 'estado', 'entradas', 'salidas', 'histograma'))
+
+        AnaliticaPedidosService.reconstruir()
+        self.assertEqual(self._consultar(), incremental)
+        self.assertEqual(
+            list(ResumenSemanalEtapa.objects.values_list('semana', 'estado', 'entradas', 'salidas', 'histograma')),
+            resumenes,
+        )
+
+    def test_lotes_chicos_dan_el_mismo_resultado(self):
+        AnaliticaPedidosService.actualizar(ahora=self.ahora, lote=7)
+        por_lotes = self._consultar()
+
+        AnaliticaPedidosService.reconstruir()
+        self.assertEqual(self._consultar(), por_lotes)
+
+    def test_costo_no_crece_con_el_historial(self):
+        AnaliticaPedidosService.actualizar(ahora=self.ahora)
+        with CaptureQueriesContext(connection) as ctx:
+            AnaliticaPedidosService.actualizar(ahora=self.ahora)
+            self._consultar()
+        pocas = len(ctx.captured_queries)
+
+        mas = PedidoServicioFactory.create_batch(30)
+        HistorialEstadoPedido.objects.filter(pedido__in=mas).delete()
+        HistorialEstadoPedido.objects.bulk_create(
+            [fila for pedido in mas for fila in _historial(pedido, self.inicio, [3, 3, 3, 3, 3, 3])]
+        )
+        AnaliticaPedidosService.actualizar(ahora=self.ahora)
+
+        with CaptureQueriesContext(connection) as ctx:
+            AnaliticaPedidosService.actualizar(ahora=self.ahora)
+            self._consultar()
+        self.assertEqual(len(ctx.captured_queries), pocas)
+
+    def test_wip_por_colaborador(self):
+        taller, otro_taller, instalador = VendedorFactory(), VendedorFactory(), VendedorFactory()
+        PedidoServicioFactory.create_batch(2, estado=Estado.EN_FABRICACION, manufacturador=taller)
+        PedidoServicioFactory(estado=Estado.ACEPTADO, manufacturador=taller)
+        PedidoServicioFactory(estado=Estado.ACEPTADO, manufacturador=otro_taller)
+        PedidoServicioFactory(estado=Estado.COMPLETADO, manufacturador=otro_taller)
+        PedidoServicioFactory.create_batch(3, estado=Estado.LISTO_INSTALAR, instalador=instalador)
+
+        wip = self._consultar()['wip']
+
+        self.assertEqual(
+            [(c['id'], c['total'], c['por_estado']) for c in wip['manufacturadores']],
+            [
+                (taller.pk, 3, {Estado.EN_FABRICACION: 2, Estado.ACEPTADO: 1}),
+                (otro_taller.pk, 1, {Estado.ACEPTADO: 1}),
+            ],
+        )
+        self.assertEqual(wip['instaladores'][0]['nombre'], instalador.get_full_name())
+        self.assertEqual(wip['instaladores'][0]['total'], 3)
+
+    def test_comando(self):
+        salida = StringIO()
+        call_command('actualizar_analitica_pedidos', lote=25, stdout=salida)
+        self.assertIn('✅ 60 transiciones procesadas', salida.getvalue())
+
+        salida = StringIO()
+        call_command('actualizar_analitica_pedidos', reconstruir=True, stdout=salida)
+        self.assertIn('✅ 60 transiciones procesadas', salida.getvalue())
+
+
+@pytest.mark.django_db
+class TestEndpointAnalitica(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('pedido-servicio-analitica')
+
+    def test_admin_obtiene_metricas(self):
+        self.client.force_authenticate(user=UserFactory(is_superuser=True))
+        pedido = PedidoServicioFactory()
+        HistorialEstadoPedido.objects.filter(pedido=pedido).update(fecha=timezone.now() - timedelta(days=1))
+
+        sin_actualizar = self.client.get(self.url, {'semanas': 4})
+        self.assertEqual(sin_actualizar.status_code, 200)
+        self.assertIsNone(sin_actualizar.data['actualizado'])
+
+        AnaliticaPedidosService.actualizar()
+        response = self.client.get(self.url, {'semanas': 4})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.data['actualizado'])
+        self.assertEqual(set(response.data['permanencia']), {Estado.ACEPTADO, Estado.EN_FABRICACION, Estado.LISTO_INSTALAR})
+        self.assertEqual(len(response.data['throughput']), 4)
+
+    def test_la_consulta_no_escribe(self):
+        self.client.force_authenticate(user=UserFactory(is_superuser=True))
+        pedido = PedidoServicioFactory()
+        HistorialEstadoPedido.objects.filter(pedido=pedido).update(fecha=timezone.now() - timedelta(days=1))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.assertFalse([q for q in ctx.captured_queries if not q['sql'].startswith('SELECT')])
+        self.assertFalse(ResumenSemanalEtapa.objects.exists())
+
+    def test_parametros_y_permisos(self):
+        self.client.force_authenticate(user=UserFactory(is_superuser=True))
+        self.assertEqual(self.client.get(self.url, {'semanas': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'semanas': 0}).status_code, 400)
+
+        self.client.force_authenticate(user=UserFactory())
+        self.assertEqual(self.client.get(self.url).status_code, 403)
@@ -0,0 +1,133 @@
+# pedidos_servicio/tests/test_cambio_estado_lote.py
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from pedidos_servicio.models import PedidoServicio
+from pedidos_servicio.services import PedidoServicioService
+from .factories import PedidoServicioFactory, UserFactory, VendedorFactory
+
+Estado = PedidoServicio.EstadoPedido
+URL = reverse('pedido-servicio-cambiar-estado-lote')
+
+
+@pytest.mark.django_db
+class TestCambioEstadoLote(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory(is_superuser=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.taller = VendedorFactory()
+        self.aceptados = PedidoServicioFactory.create_batch(5, estado=Estado.ACEPTADO, manufacturador=self.taller)
+
+    def _post(self, payload):
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(URL, payload, format='json')
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "pedidos_servicio_pedidoservicio"')]
+        return response, updates
+
+    def _estados(self, pedidos):
+        return set(PedidoServicio.objects.filter(pk__in=[p.pk for p in pedidos]).values_list('estado', flat=True))
+
+    def test_mismo_estado_un_update_y_un_email(self):
+        response, updates = self._post({'pedidos': [p.pk for p in self.aceptados], 'estado': Estado.EN_FABRICACION})
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self._estados(self.aceptados), {Estado.EN_FABRICACION})
+        self.assertEqual(response.data['por_estado'], {Estado.EN_FABRICACION: [p.pk for p in self.aceptados]})
+        self.assertEqual(
+            set(PedidoServicio.objects.filter(pk__in=[p.pk for p in self.aceptados]).values_list('usuario_modificacion', flat=True)),
+            {self.user.pk},
+        )
+
+        # Un solo email al taller con los 5 pedidos
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.taller.email])
+        for pedido in self.aceptados:
+            self.assertIn(pedido.numero_pedido, mail.outbox[0].body)
+
+    def test_un_update_por_estado_destino(self):
+        enviados = PedidoServicioFactory.create_batch(2, estado=Estado.ENVIADO)
+        transiciones = (
+            [{'pedido': p.pk, 'estado': Estado.EN_FABRICACION} for p in self.aceptados[:3]]
+            + [{'pedido': p.pk, 'estado': Estado.CANCELADO} for p in self.aceptados[3:]]
+            + [{'pedido': p.pk, 'estado': Estado.ACEPTADO} for p in enviados]
+        )
+
+        response, updates = self._post({'transiciones': transiciones})
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(self._estados(self.aceptados[:3]), {Estado.EN_FABRICACION})
+        self.assertEqual(self._estados(self.aceptados[3:]), {Estado.CANCELADO})
+        self.assertEqual(self._estados(enviados), {Estado.ACEPTADO})
+
+    def test_transicion_invalida_no_aplica_nada(self):
+        completado = PedidoServicioFactory(estado=Estado.COMPLETADO)
+        pedidos = self.aceptados + [completado]
+
+        response, updates = self._post({'pedidos': [p.pk for p in pedidos] + [999999], 'estado': Estado.EN_FABRICACION})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data['errors']), {completado.pk, 999999})
+        self.assertEqual(updates, [])
+        self.assertEqual(self._estados(self.aceptados), {Estado.ACEPTADO})
+        self.assertEqual(mail.outbox, [])
+
+    def test_validacion_del_payload(self):
+        pedido = self.aceptados[0]
+
+        for payload in [
+            {},
+            {'pedidos': [pedido.pk]},
+            {'pedidos': [], 'estado': Estado.EN_FABRICACION},
+            {'pedidos': [pedido.pk], 'estado': 'VOLANDO'},
+            {'transiciones': [{'pedido': pedido.pk, 'estado': Estado.EN_FABRICACION},
+                              {'pedido': pedido.pk, 'estado': Estado.CANCELADO}]},
+        ]:
+            response, _ = self._post(payload)
+            self.assertEqual(response.status_code, 400, payload)
+
+        with mock.patch('pedidos_servicio.serializers.CAMBIO_ESTADO_LOTE_MAX', 2):
+            response, _ = self._post({'pedidos': [p.pk for p in self.aceptados], 'estado': Estado.EN_FABRICACION})
+        self.assertEqual(response.status_code, 400)
+
+    def test_permisos_y_asignacion(self):
+        operario = UserFactory()
+        operario.user_permissions.add(Permission.objects.get(codename='can_change_to_en_fabricacion'))
+        self.taller.usuario = operario
+        self.taller.save()
+        ajeno = PedidoServicioFactory(estado=Estado.ACEPTADO)
+        self.client.force_authenticate(user=operario)
+
+        sin_permiso, _ = self._post({'pedidos': [self.aceptados[0].pk], 'estado': Estado.CANCELADO})
+        self.assertEqual(sin_permiso.status_code, 403)
+
+        con_ajeno, _ = self._post({'pedidos': [self.aceptados[0].pk, ajeno.pk], 'estado': Estado.EN_FABRICACION})
+        self.assertEqual(con_ajeno.status_code, 400)
+        self.assertEqual(list(con_ajeno.data['errors']), [ajeno.pk])
+
+        propios, updates = self._post({'pedidos': [p.pk for p in self.aceptados], 'estado': Estado.EN_FABRICACION})
+        self.assertEqual(propios.status_code, 200)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self._estados(self.aceptados), {Estado.EN_FABRICACION})
+
+    def test_update_exige_el_estado_de_origen(self):
+        """Si un pedido cambió entre la validación y el UPDATE, el lote falla"""
+        PedidoServicio.objects.filter(pk=self.aceptados[0].pk).update(estado=Estado.COMPLETADO)
+
+        with self.assertRaises(ValidationError):
+            PedidoServicioService.aplicar_cambios_estado(
+                self.aceptados, {p.pk: Estado.EN_FABRICACION for p in self.aceptados}
+            )
@@ -0,0 +1,100 @@
+# pedidos_servicio/tests/test_crear_con_items.py
+import pytest
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from pedidos_servicio.models import ItemPedidoServicio, PedidoServicio
+from .factories import ClienteFactory, UserFactory, VendedorFactory
+
+
+def _item(n):
+    return {
+        'ambiente': f'Ambiente {n}',
+        'modelo': 'Roller',
+        'tejido': 'Screen 5%',
+        'largura': '2.50',
+        'altura': '1.80',
+        'cantidad_piezas': 2,
+        'posicion_tejido': 'NORMAL',
+        'lado_comando': 'DERECHO',
+        'acionamiento': 'MANUAL',
+        'observaciones': '',
+    }
+
+
+@pytest.mark.django_db
+class TestCrearConItems(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=UserFactory(is_superuser=True))
+        self.cliente = ClienteFactory()
+        self.instalador = VendedorFactory()
+
+    def _crear(self, items):
+        payload = {
+            'pedido': {
+                'cliente_id': self.cliente.pk,
+                'instalador_id': self.instalador.pk,
+                'supervisor': 'María López',
+            },
+            'items': items,
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('pedido-servicio-crear-con-items'), payload, format='json')
+        return response, ctx.captured_queries
+
+    def test_crea_pedido_e_items_en_bloque(self):
+        response, consultas = self._crear([_item(n) for n in range(1, 4)])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        pedido = PedidoServicio.objects.get(pk=response.data['pedido']['id'])
+        self.assertEqual(
+            list(pedido.items.values_list('numero_item', 'ambiente')),
+            [(1, 'Ambiente 1'), (2, 'Ambiente 2'), (3, 'Ambiente 3')],
+        )
+        inserts = [q for q in consultas if q['sql'].startswith('INSERT INTO "pedidos_servicio_itempedidoservicio"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_respuesta_desde_memoria(self):
+        response, _ = self._crear([_item(1), _item(2)])
+
+        pedido = response.data['pedido']
+        self.assertEqual(pedido['cliente']['id'], self.cliente.pk)
+        self.assertEqual(pedido['instalador']['id'], self.instalador.pk)
+        self.assertEqual(pedido['supervisor'], 'María López')
+        self.assertEqual(len(pedido['items']), 2)
+
+        guardados = {item.pk: item for item in ItemPedidoServicio.objects.filter(pedido_servicio_id=pedido['id'])}
+        for item in pedido['items']:
+            self.assertEqual(item['numero_item'], guardados[item['id']].numero_item)
+            self.assertEqual(item['lado_comando_display'], 'Derecho')
+            self.assertIsNotNone(item['created_at'])
+
+    def test_consultas_no_crecen_con_los_items(self):
+        self._crear([_item(1)])  # el primer pedido crea el correlativo 'PED'
+        _, pocos = self._crear([_item(1)])
+        _, muchos = self._crear([_item(n) for n in range(1, 41)])
+
+        self.assertEqual(len(muchos), len(pocos))
+
+    def test_errores_por_item_sin_crear_nada(self):
+        invalido = dict(_item(2), lado_comando='ARRIBA')
+
+        response, _ = self._crear([_item(1), invalido, _item(3)])
+
+        self.assertEqual(response.status_code, 400)
+        errores = response.data['errors']['items']
+        self.assertIsNone(errores[0])
+        self.assertIn('lado_comando', errores[1])
+        self.assertIsNone(errores[2])
+        self.assertFalse(PedidoServicio.objects.exists())
+
+    def test_requiere_items(self):
+        response, _ = self._crear([])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PedidoServicio.objects.exists())
@@ -0,0 +1,148 @@
+# pedidos_servicio/tests/test_historial_estados.py
+import importlib
+from unittest import mock
+
+import pytest
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from pedidos_servicio.models import HistorialEstadoPedido, PedidoServicio
+from .factories import PedidoServicioFactory, UserFactory
+
+Estado = PedidoServicio.EstadoPedido
+
+
+def _transiciones(pedido):
+    return list(
+        HistorialEstadoPedido.objects.filter(pedido=pedido)
+        .order_by('fecha', 'id').values_list('estado_anterior', 'estado_nuevo')
+    )
+
+
+@pytest.mark.django_db
+class TestHistorialEstados(TestCase):
+
+    def setUp(self):
+        self.user = UserFactory(is_superuser=True, first_name='Rita', last_name='López')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.pedido = PedidoServicioFactory(usuario_creacion=self.user)
+
+    def _cambiar(self, pedido, estado):
+        return self.client.post(
+            reverse('pedido-servicio-cambiar-estado', kwargs={'pk': pedido.pk}), {'estado': estado}, format='json'
+        )
+
+    def test_creacion_y_cambios_quedan_registrados(self):
+        self.assertEqual(self._cambiar(self.pedido, Estado.ACEPTADO).status_code, 200)
+        self.assertEqual(self._cambiar(self.pedido, Estado.EN_FABRICACION).status_code, 200)
+
+        self.assertEqual(_transiciones(self.pedido), [
+            ('', Estado.ENVIADO),
+            (Estado.ENVIADO, Estado.ACEPTADO),
+            (Estado.ACEPTADO, Estado.EN_FABRICACION),
+        ])
+        self.assertEqual(
+            set(HistorialEstadoPedido.objects.filter(pedido=self.pedido).values_list('usuario', flat=True)),
+            {self.user.pk},
+        )
+
+    def test_guardar_sin_cambiar_estado_no_registra(self):
+        pedido = PedidoServicio.objects.get(pk=self.pedido.pk)
+        pedido.observaciones = 'Solo una nota'
+        pedido.save()
+
+        self.assertEqual(len(_transiciones(self.pedido)), 1)
+
+    def test_update_fields_sin_estado_no_registra(self):
+        pedido = PedidoServicio.objects.get(pk=self.pedido.pk)
+        pedido.estado = Estado.ACEPTADO
+        pedido.save(update_fields=['observaciones'])
+
+        self.assertEqual(len(_transiciones(self.pedido)), 1)
+
+        # El estado sigue pendiente de guardar: se registra cuando se persiste
+        pedido.save(update_fields=['estado'])
+        self.assertEqual(_transiciones(self.pedido)[-1], (Estado.ENVIADO, Estado.ACEPTADO))
+
+    def test_estado_diferido(self):
+        sin_estado = PedidoServicio.objects.defer('estado').get(pk=self.pedido.pk)
+        sin_estado.observaciones = 'Nota'
+        sin_estado.save()
+        self.assertEqual(len(_transiciones(self.pedido)), 1)
+
+        cambiado = PedidoServicio.objects.defer('estado').get(pk=self.pedido.pk)
+        cambiado.estado = Estado.ACEPTADO
+        cambiado.save()
+        self.assertEqual(_transiciones(self.pedido), [('', Estado.ENVIADO), (Estado.ENVIADO, Estado.ACEPTADO)])
+
+        igual = PedidoServicio.objects.defer('estado').get(pk=self.pedido.pk)
+        igual.estado = Estado.ACEPTADO
+        igual.save()
+        self.assertEqual(len(_transiciones(self.pedido)), 2)
+
+    def test_registro_en_la_misma_transaccion(self):
+        with mock.patch.object(HistorialEstadoPedido.objects, 'create', side_effect=RuntimeError('fallo')):
+            with self.assertRaises(RuntimeError):
+                pedido = PedidoServicio.objects.get(pk=self.pedido.pk)
+                pedido.estado = Estado.ACEPTADO
+                pedido.save()
+
+        self.pedido.refresh_from_db()
+        self.assertEqual(self.pedido.estado, Estado.ENVIADO)
+
+    def test_lote_registra_con_un_insert(self):
+        pedidos = PedidoServicioFactory.create_batch(4, estado=Estado.ACEPTADO)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                reverse('pedido-servicio-cambiar-estado-lote'),
+                {'pedidos': [p.pk for p in pedidos], 'estado': Estado.EN_FABRICACION}, format='json',
+            )
+
+        self.assertEqual(response.status_code, 200)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "pedidos_servicio_historialestadopedido"')]
+        self.assertEqual(len(inserts), 1)
+        for pedido in pedidos:
+            self.assertEqual(_transiciones(pedido)[-1], (Estado.ACEPTADO, Estado.EN_FABRICACION))
+
+    def test_endpoint_historial(self):
+        self._cambiar(self.pedido, Estado.ACEPTADO)
+
+        response = self.client.get(reverse('pedido-servicio-historial', kwargs={'pk': self.pedido.pk}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t['estado_nuevo'] for t in response.data], [Estado.ACEPTADO, Estado.ENVIADO])
+        self.assertEqual(response.data[0]['estado_anterior_display'], 'Enviado')
+        self.assertEqual(response.data[0]['usuario_nombre'], 'Rita López')
+
+    def test_actividad_reciente_del_dashboard(self):
+        otro = PedidoServicioFactory()
+        self._cambiar(self.pedido, Estado.ACEPTADO)
+        # Editar otro pedido sin cambiar su estado no es actividad de estados
+        PedidoServicio.objects.get(pk=otro.pk).save()
+
+        response = self.client.get(reverse('dashboard-metrics'))
+
+        actividad = response.data['recent_activity']
+        self.assertEqual(len(actividad), 3)
+        self.assertIn(self.pedido.numero_pedido, actividad[0]['description'])
+        self.assertIn('Aceptado', actividad[0]['description'])
+        self.assertEqual(actividad[0]['user'], 'Rita López')
+
+    def test_migracion_registra_los_pedidos_existentes(self):
+        """0006 deja una transición por pedido previo al historial (para el feed del dashboard)"""
+        otro = PedidoServicioFactory(estado=Estado.EN_FABRICACION)
+        HistorialEstadoPedido.objects.all().delete()
+        migracion = importlib.import_module('pedidos_servicio.migrations.0006_historialestadopedido')
+
+        migracion.registrar_estado_actual(apps, None)
+
+        self.assertEqual(_transiciones(self.pedido), [('', Estado.ENVIADO)])
+        transicion = HistorialEstadoPedido.objects.get(pedido=otro)
+        self.assertEqual((transicion.estado_nuevo, transicion.fecha), (Estado.EN_FABRICACION, otro.updated_at))
+        self.assertEqual(HistorialEstadoPedido.objects.get(pedido=self.pedido).usuario, self.user)
@@ -0,0 +1,48 @@
+# pedidos_servicio/tests/test_listado.py
+import pytest
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .factories import UserFactory, crear_pedido_con_items
+
+
+@pytest.mark.django_db
+class TestListadoPedidos(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=UserFactory(is_superuser=True))
+        self.pedidos = [crear_pedido_con_items(n % 4 + 1) for n in range(20)]
+
+    def _listar(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        # Los items solo se cuentan (JOIN en la consulta principal), nunca se cargan
+        self.assertFalse([q for q in ctx.captured_queries if 'FROM "pedidos_servicio_itempedidoservicio"' in q['sql']])
+        return response, len(ctx.captured_queries)
+
+    def test_total_items_anotado(self):
+        response, _ = self._listar(reverse('pedido-servicio-list'), page_size=100)
+
+        esperados = {pedido.pk: pedido.items.count() for pedido in self.pedidos}
+        self.assertEqual({fila['id']: fila['total_items'] for fila in response.data['results']}, esperados)
+
+    def test_consultas_independientes_del_tamano_de_pagina(self):
+        _, chica = self._listar(reverse('pedido-servicio-list'), page_size=2)
+        _, grande = self._listar(reverse('pedido-servicio-list'), page_size=20)
+
+        self.assertEqual(grande, chica)
+
+    def test_dashboard_mis_pedidos(self):
+        _, chica = self._listar(reverse('mis-pedidos'), page_size=2)
+        response, grande = self._listar(reverse('mis-pedidos'), page_size=20)
+
+        self.assertEqual(grande, chica)
+        self.assertEqual(
+            {fila['id']: fila['total_items'] for fila in response.data['results']},
+            {pedido.pk: pedido.items.count() for pedido in self.pedidos},
+        )
@@ -0,0 +1,87 @@
+# pedidos_servicio/tests/test_pdf_generator.py
+from unittest import mock
+
+import pytest
+from django.test import TestCase
+from django.utils import timezone
+
+from pedidos_servicio import pdf_generator
+from .factories import crear_pedido_con_items
+
+
+@pytest.mark.django_db
+class TestPedidoPdfRecursos(TestCase):
+
+    def setUp(self):
+        pdf_generator.get_pdf_styles.cache_clear()
+        pdf_generator.get_static_blocks.cache_clear()
+
+    def test_etiquetas_traducidas_por_idioma(self):
+        bloques_es = pdf_generator.get_static_blocks('es')
+        bloques_en = pdf_generator.get_static_blocks('en')
+
+        self.assertIs(bloques_es, pdf_generator.get_static_blocks('es'))
+        self.assertEqual(bloques_en[('title', 'service_order')][0].text, 'SERVICE ORDER')
+        self.assertEqual(bloques_es[('title', 'service_order')][0].text, 'PEDIDO DE SERVICIO')
+
+    def test_renders_sucesivos_no_reconstruyen_estilos(self):
+        pedido = crear_pedido_con_items(3, observaciones='Observación general')
+        pedido.cliente.numero_documento = '12345678'
+        pdf_generator.generate_pedido_pdf(pedido, language='pt')
+
+        with mock.patch.object(pdf_generator, 'getSampleStyleSheet') as sample_mock:
+            buffer = pdf_generator.generate_pedido_pdf(pedido, language='pt')
+
+        sample_mock.assert_not_called()
+        self.assertTrue(buffer.getvalue().startswith(b'%PDF'))
+
+    def test_pie_estatico_se_captura_una_vez(self):
+        """El pie (línea, fecha de actualización, título) se dibuja una vez y se reutiliza por página"""
+        pedido = crear_pedido_con_items(40)
+        pedido.cliente.numero_documento = '12345678'
+
+        with mock.patch.object(
+            pdf_generator, '_draw_static_footer', wraps=pdf_generator._draw_static_footer
+        ) as footer_mock:
+            contenido = pdf_generator.generate_pedido_pdf(pedido, language='es').getvalue()
+
+        self.assertGreater(contenido.count(b'/Type /Page\n'), 1)
+        self.assertEqual(footer_mock.call_count, 1)
+        self.assertEqual(contenido.count(b'/Subtype /Form'), 1)
+
+    def test_pie_usa_la_fecha_del_pedido(self):
+        """El pie no depende del reloj: el PDF cacheado por huella sigue siendo fiel"""
+        pedido = crear_pedido_con_items(2)
+        pedido.cliente.numero_documento = '12345678'
+
+        with mock.patch.object(
+            pdf_generator, '_draw_static_footer', wraps=pdf_generator._draw_static_footer
+        ) as footer_mock:
+            pdf_generator.generate_pedido_pdf(pedido, language='es')
+
+        self.assertEqual(footer_mock.call_args.args[2], timezone.localtime(pedido.updated_at))
+
+    def test_modo_denso_omite_encabezados_y_observaciones_vacias(self):
+        pedido = crear_pedido_con_items(60)
+        pedido.cliente.numero_documento = '12345678'
+
+        estandar = pdf_generator.generate_pedido_pdf(pedido, language='es', dense=False).getvalue()
+        denso = pdf_generator.generate_pedido_pdf(pedido, language='es', dense=True).getvalue()
+
+        self.assertTrue(denso.startswith(b'%PDF'))
+        self.assertLess(len(denso), len(estandar))
+        self.assertLess(denso.count(b'/Type /Page\n'), estandar.count(b'/Type /Page\n'))
+
+    def test_tabla_grande_se_entrega_en_trozos(self):
+        """Cada Table cubre como mucho CHUNK_ROWS filas; los cortes no separan un ítem"""
+        pedido = crear_pedido_con_items(120)
+        pedido.cliente.numero_documento = '12345678'
+
+        with mock.patch.object(pdf_generator.TableLayout, 'build', autospec=True,
+                               side_effect=pdf_generator.TableLayout.build) as build_mock:
+            pdf_generator.generate_pedido_pdf(pedido, language='es', dense=False)
+
+        filas = [len(call.args[0]) for call in build_mock.call_args_list]
+        self.assertGreater(len(filas), 1)
+        self.assertEqual(sum(filas), 120 * 3)
+        self.assertTrue(all(n % 3 == 0 for n in filas))
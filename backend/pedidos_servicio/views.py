@@ -5,16 +5,18 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Count
-from django.http import FileResponse
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
 from django.utils import timezone
 
-from .models import PedidoServicio, ItemPedidoServicio
+from .models import PedidoServicio, ItemPedidoServicio, HistorialEstadoPedido
 from .serializers import (
     PedidoServicioSerializer,
     PedidoServicioListSerializer,
     PedidoServicioDetailSerializer,
     ItemPedidoServicioSerializer,
+    CambioEstadoLoteSerializer,
+    HistorialEstadoPedidoSerializer,
 )
 
 from .permissions import (
@@ -25,9 +27,17 @@ from .permissions import (
 )
 
 from .services import PedidoServicioService
-from .pdf_generator import generate_pedido_pdf
+from .analitica import AnaliticaPedidosService
+from .signals import notificar_cambios_estado_lote
+from .constants import ANALITICA_SEMANAS_DEFAULT, ANALITICA_SEMANAS_MAX, PERMISOS_POR_ESTADO
+from .pdf_generator import open_pedido_pdf
 from .filters import PedidoServicioFilter
 from common.pagination import StandardPagination
+from common.pdf_assets import get_pdf_language
+from common.models import TrabajoRenderPDF
+from common.pdf_jobs import encolar_trabajo, prerenderizar
+from common.pdf_response import pdf_file_response
+from common.serializers import TrabajoRenderPDFSerializer
 
 import logging
 logger = logging.getLogger(__name__)
@@ -48,7 +58,11 @@ class PedidoServicioViewSet(viewsets.ModelViewSet):
     - PUT/PATCH /pedidos-servicio/{id}/ - Actualizar pedido
     - DELETE /pedidos-servicio/{id}/ - Eliminar pedido
     - POST /pedidos-servicio/{id}/cambiar_estado/ - Cambiar estado
+    - POST /pedidos-servicio/cambiar-estado-lote/ - Cambiar estado de varios pedidos
+    - GET /pedidos-servicio/{id}/historial/ - Transiciones de estado del pedido
+    - GET /pedidos-servicio/analitica/ - Permanencia por etapa, throughput y WIP (admin)
     - GET /pedidos-servicio/{id}/pdf/ - Generar PDF
+    - POST /pedidos-servicio/{id}/pdf-async/ - Encolar PDF (ver /trabajos-pdf/{job_id}/)
     
     Parámetros de consulta:
     - ?search= : Busca en numero_pedido, cliente__nombre y solicitante
@@ -92,7 +106,7 @@ class PedidoServicioViewSet(viewsets.ModelViewSet):
     # -------------------------
     def get_permissions(self):
 
-        if self.action in ['list', 'retrieve', 'mis_pedidos', 'estadisticas']:
+        if self.action in ['list', 'retrieve', 'mis_pedidos', 'estadisticas', 'historial']:
             permission_classes = [IsAuthenticated, CanViewPedidos]
 
         elif self.action == 'create':
@@ -101,7 +115,7 @@ class PedidoServicioViewSet(viewsets.ModelViewSet):
         elif self.action in ['update', 'partial_update']:
             permission_classes = [IsAuthenticated, CanEditPedidos]
         
-        elif self.action == 'cambiar_estado':
+        elif self.action in ['cambiar_estado', 'cambiar_estado_lote']:
             # Solo requiere autenticación, los permisos específicos se validan dentro del método
             permission_classes = [IsAuthenticated]
 
@@ -136,8 +150,15 @@ class PedidoServicioViewSet(viewsets.ModelViewSet):
         user = self.request.user
 
         queryset = PedidoServicio.objects.select_related(
-            'cliente', 'manufacturador', 'instalador'
-        ).prefetch_related('items')
+            'cliente', 'manufacturador', 'instalador', 'usuario_creacion'
+        )
+
+        # El listado solo muestra la cantidad de items: se cuenta en la misma
+        # consulta en vez de cargar todas las filas de items
+        if self.action == 'list':
+            queryset = queryset.annotate(total_items=Count('items'))
+        elif self.action != 'historial':
+            queryset = queryset.prefetch_related('items')
 
         # ✅ Admin/Superuser: ve TODO
         if user.is_superuser:
@@ -192,6 +213,11 @@ class PedidoServicioViewSet(viewsets.ModelViewSet):
         )
 
 
+    def perform_update(self, serializer):
+        # usuario_modificacion también queda como autor de la transición si cambia el estado
+        serializer.save(usuario_modificacion=self.request.user)
+
+
     # -------------------------
     # CREACIÓN ATÓMICA (PEDIDO + ITEMS)
     # -------------------------
@@ -240,68 +266,62 @@ class PedidoServicioViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # 1. Validar el pedido y TODOS los items antes de escribir nada
+        pedido_serializer = PedidoServicioSerializer(data=pedido_data)
+        if not pedido_serializer.is_valid():
+            return Response(
+                {'detail': 'Error en datos del pedido', 'errors': pedido_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Una sola pasada de validación para la lista (many=True)
+        items_serializer = ItemPedidoServicioSerializer(data=items_data, many=True)
+        if not items_serializer.is_valid():
+            errores = items_serializer.errors
+            if isinstance(errores, list):
+                # Mismo formato de siempre: None para los items válidos
+                errores = [error or None for error in errores]
+            return Response(
+                {
+                    'detail': 'Hay errores de validación en los items del pedido',
+                    'errors': {
+                        'items': errores
+                    }
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
             with transaction.atomic():
-                # 1. Validar y crear el pedido
-                pedido_serializer = PedidoServicioSerializer(data=pedido_data)
-                if not pedido_serializer.is_valid():
-                    return Response(
-                        {'detail': 'Error en datos del pedido', 'errors': pedido_serializer.errors},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                # Guardar pedido con usuario de creación
+                # 2. Guardar pedido con usuario de creación
                 pedido = pedido_serializer.save(
                     usuario_creacion=user,
                     solicitante=pedido_data.get('solicitante', user.get_full_name() or user.username),
                     fecha_emision=timezone.now().date()
                 )
-                
-                # 2. Validar TODOS los items primero (sin crear nada)
-                items_validados = []
-                items_errors = []
-                
-                for idx, item_data in enumerate(items_data):
-                    item_serializer = ItemPedidoServicioSerializer(data=item_data)
-                    if item_serializer.is_valid():
-                        items_validados.append(item_serializer.validated_data)
-                        items_errors.append(None)
-                    else:
-                        items_validados.append(None)
-                        items_errors.append(item_serializer.errors)
-                
-                # Si hay errores, retornar SIN crear nada (el pedido tampoco se crea por el rollback)
-                if any(items_errors):
-                    return Response(
-                        {
-                            'detail': 'Hay errores de validación en los items del pedido',
-                            'errors': {
-                                'items': items_errors
-                            }
-                        },
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                # 3. Si todo está OK, crear los items
-                items_creados = []
-                for idx, validated_data in enumerate(items_validados, start=1):
-                    item = ItemPedidoServicio.objects.create(
-                        pedido_servicio=pedido,
-                        numero_item=idx,
-                        **validated_data
-                    )
-                    items_creados.append(item)
-                
-                # 4. Retornar el pedido creado con sus items
-                response_serializer = PedidoServicioDetailSerializer(pedido)
-                return Response(
-                    {
-                        'detail': f'Pedido creado exitosamente con {len(items_creados)} item(s)',
-                        'pedido': response_serializer.data
-                    },
-                    status=status.HTTP_201_CREATED
-                )
-                
+
+                # 3. Crear todos los items con un solo INSERT (numero_item asignado en memoria)
+                items_creados = ItemPedidoServicio.objects.bulk_create([
+                    ItemPedidoServicio(pedido_servicio=pedido, numero_item=idx, **validated_data)
+                    for idx, validated_data in enumerate(items_serializer.validated_data, start=1)
+                ])
+
+                # El PDF del pedido recién creado se genera al confirmar la transacción
+                prerenderizar(TrabajoRenderPDF.TipoDocumento.PEDIDO, pedido.pk, get_pdf_language(request))
+
+            # 4. Retornar el pedido desde los objetos en memoria: cliente y
+            # colaboradores ya vienen resueltos de la validación y los items
+            # se exponen como prefetch para no volver a consultarlos
+            pedido._prefetched_objects_cache = {'items': items_creados}
+            response_serializer = PedidoServicioDetailSerializer(pedido)
+            return Response(
+                {
+                    'detail': f'Pedido creado exitosamente con {len(items_creados)} item(s)',
+                    'pedido': response_serializer.data
+                },
+                status=status.HTTP_201_CREATED
+            )
+
         except Exception as e:
             # Error inesperado
             logger.exception(f'Error creando pedido con items: {str(e)}')
@@ -360,21 +380,10 @@ class PedidoServicioViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Estado inválido'}, status=400)
 
         # ✅ VALIDACIÓN DE PERMISOS POR ESTADO
-        # Mapeo de estados a permisos requeridos
-        estado_permisos = {
-            'ACEPTADO': 'pedidos_servicio.can_change_to_aceptado',
-            'EN_FABRICACION': 'pedidos_servicio.can_change_to_en_fabricacion',
-            'LISTO_INSTALAR': 'pedidos_servicio.can_change_to_listo_instalar',
-            'INSTALADO': 'pedidos_servicio.can_change_to_instalado',
-            'COMPLETADO': 'pedidos_servicio.can_change_to_completado',
-            'RECHAZADO': 'pedidos_servicio.can_change_to_rechazado',
-            'CANCELADO': 'pedidos_servicio.can_change_to_cancelado',
-        }
-
         # Admin tiene todos los permisos
         if not user.is_superuser:
             # Verificar si tiene el permiso específico para este estado
-            permiso_requerido = estado_permisos.get(nuevo_estado)
+            permiso_requerido = PERMISOS_POR_ESTADO.get(nuevo_estado)
             if permiso_requerido and not user.has_perm(permiso_requerido):
                 return Response({
                     'detail': f'No tienes permiso para cambiar el estado a {nuevo_estado}'
@@ -404,12 +413,111 @@ class PedidoServicioViewSet(viewsets.ModelViewSet):
         if not is_valid:
             return Response({'detail': error}, status=400)
 
+        # El guardado registra la transición en el historial (misma transacción)
         pedido.estado = nuevo_estado
+        pedido.usuario_modificacion = user
         pedido.save()
 
         return Response(self.get_serializer(pedido).data)
 
 
+    # -------------------------
+    # HISTORIAL DE ESTADOS
+    # -------------------------
+    @action(detail=True, methods=['get'])
+    def historial(self, request, pk=None):
+        """Línea de tiempo de transiciones del pedido, de la más reciente a la más antigua"""
+        pedido = self.get_object()
+        transiciones = HistorialEstadoPedido.objects.filter(
+            pedido=pedido
+        ).select_related('usuario').order_by('-fecha', '-id')
+        return Response(HistorialEstadoPedidoSerializer(transiciones, many=True).data)
+
+
+    # -------------------------
+    # CAMBIO DE ESTADO EN LOTE
+    # -------------------------
+    @action(detail=False, methods=['post'], url_path='cambiar-estado-lote')
+    def cambiar_estado_lote(self, request):
+        """
+        Cambia el estado de varios pedidos en una sola solicitud, todo o nada.
+
+        Body:
+            {"pedidos": [1, 2, 3], "estado": "EN_FABRICACION"}
+            o {"transiciones": [{"pedido": 1, "estado": "EN_FABRICACION"}, ...]}
+
+        Mismas reglas que cambiar_estado, pero los permisos y grupos del
+        usuario se consultan una sola vez, se aplica un UPDATE por estado
+        destino (más un INSERT para el historial) y se envía un único email
+        por destinatario.
+        """
+        serializer = CambioEstadoLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cambios = serializer.validated_data['cambios']
+        user = request.user
+
+        # ✅ Permisos: una verificación por estado destino, no por pedido
+        if not user.is_superuser:
+            sin_permiso = sorted({
+                estado for estado in cambios.values()
+                if PERMISOS_POR_ESTADO.get(estado) and not user.has_perm(PERMISOS_POR_ESTADO[estado])
+            })
+            if sin_permiso:
+                return Response({
+                    'detail': f'No tienes permiso para cambiar el estado a {", ".join(sin_permiso)}'
+                }, status=403)
+
+        # ✅ Grupo y personal asignado: una consulta para todo el lote
+        es_comercial = user.groups.filter(name='Comercial').exists()
+        personal = getattr(user, 'personal_manufactura', None)
+        if not user.is_superuser and not es_comercial and personal is None:
+            return Response({'detail': 'Usuario sin manufactura asignada'}, status=403)
+
+        try:
+            with transaction.atomic():
+                pedidos = list(
+                    PedidoServicio.objects.select_for_update(of=('self',))
+                    .select_related('manufacturador', 'instalador')
+                    .filter(pk__in=cambios)
+                )
+                encontrados = {pedido.pk: pedido for pedido in pedidos}
+
+                errores = {}
+                for pedido_id, nuevo_estado in cambios.items():
+                    pedido = encontrados.get(pedido_id)
+                    if pedido is None:
+                        errores[pedido_id] = 'Pedido no encontrado'
+                    elif es_comercial and pedido.usuario_creacion_id != user.pk:
+                        errores[pedido_id] = 'No autorizado para este pedido'
+                    elif not es_comercial and not user.is_superuser and personal.pk not in (
+                        pedido.manufacturador_id, pedido.instalador_id
+                    ):
+                        errores[pedido_id] = 'No autorizado para este pedido'
+                    else:
+                        is_valid, error = PedidoServicioService.validate_state_transition(
+                            pedido.estado, nuevo_estado
+                        )
+                        if not is_valid:
+                            errores[pedido_id] = error
+
+                if errores:
+                    return Response({
+                        'detail': 'No se aplicó ningún cambio: hay pedidos con errores',
+                        'errors': errores,
+                    }, status=400)
+
+                por_estado = PedidoServicioService.aplicar_cambios_estado(pedidos, cambios, usuario=user)
+                notificar_cambios_estado_lote(pedidos)
+
+        except DjangoValidationError as e:
+            return Response({'detail': e.messages[0]}, status=409)
+
+        return Response({
+            'detail': f'{len(cambios)} pedido(s) actualizados',
+            'por_estado': por_estado,
+        })
+
+
     # -------------------------
     # ELIMINAR PEDIDO
     # -------------------------
@@ -503,6 +611,34 @@ class PedidoServicioViewSet(viewsets.ModelViewSet):
         })
 
 
+    # -------------------------
+    # ANALÍTICA DEL FLUJO
+    # -------------------------
+    @action(detail=False, methods=['get'])
+    def analitica(self, request):
+        """
+        Permanencia por etapa (promedio y percentiles en horas), pedidos
+        completados por semana y WIP por manufacturador / instalador.
+        Solo lee los resúmenes semanales: los alimenta el comando
+        actualizar_analitica_pedidos (cron); 'actualizado' indica hasta cuándo.
+
+        Parámetros: ?semanas= (default 12, máx 104)
+        """
+        user = request.user
+        # Métricas globales: solo administración
+        if not user.is_superuser and not user.groups.filter(name='Admin').exists():
+            return Response({'detail': 'No tienes permiso para ver la analítica de pedidos'}, status=403)
+
+        try:
+            semanas = int(request.query_params.get('semanas', ANALITICA_SEMANAS_DEFAULT))
+        except ValueError:
+            return Response({'detail': 'semanas debe ser un número entero'}, status=400)
+        if not 1 <= semanas <= ANALITICA_SEMANAS_MAX:
+            return Response({'detail': f'semanas debe estar entre 1 y {ANALITICA_SEMANAS_MAX}'}, status=400)
+
+        return Response(AnaliticaPedidosService.consultar(semanas=semanas))
+
+
     # -------------------------
     # PDF
     # -------------------------
@@ -512,15 +648,28 @@ class PedidoServicioViewSet(viewsets.ModelViewSet):
         pedido = self.get_object()
 
         try:
-            pdf_buffer = generate_pedido_pdf(pedido, request)
-
-            return FileResponse(
-                pdf_buffer,
-                as_attachment=True,
-                filename=f'Pedido_{pedido.numero_pedido}.pdf',
-                content_type='application/pdf'
-            )
+            # Se sirve desde la caché en disco si el pedido no cambió,
+            # por bloques y con ETag / rangos
+            pdf_file = open_pedido_pdf(pedido, request)
+            return pdf_file_response(request, pdf_file, f'Pedido_{pedido.numero_pedido}.pdf')
 
         except Exception as e:
             logger.exception(str(e))
             return Response({'detail': 'Error al generar PDF'}, status=500)
+
+
+    @action(detail=True, methods=['post'], url_path='pdf-async')
+    def pdf_async(self, request, pk=None):
+        """
+        Encola la generación del PDF en el pool de render en segundo plano.
+        Retorna el trabajo; su URL devuelve el estado o el PDF cuando termina.
+        """
+        pedido = self.get_object()
+        trabajo = encolar_trabajo(
+            TrabajoRenderPDF.TipoDocumento.PEDIDO,
+            pedido.pk,
+            get_pdf_language(request),
+            usuario=request.user
+        )
+        serializer = TrabajoRenderPDFSerializer(trabajo, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
@@ -14,6 +14,8 @@ Write-Host "[1/2] Iniciando Backend..." -ForegroundColor Yellow
 Push-Location "$PROJECT_PATH\backend"
 Start-Process powershell -ArgumentList "-NoExit", "-Command", "& '$PYTHON' manage.py runserver 0.0.0.0:8000"
 Write-Host "Backend iniciado en http://127.0.0.1:8000" -ForegroundColor Green
+Start-Process powershell -ArgumentList "-NoExit", "-Command", "& '$PYTHON' manage.py procesar_trabajos_pdf"
+Write-Host "Consumidor de PDFs iniciado" -ForegroundColor Green
 Pop-Location
 
 # Frontend
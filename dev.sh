@@ -10,6 +10,9 @@ cd backend
 python manage.py runserver 0.0.0.0:8000 &
 BACKEND_PID=$!
 echo "Backend iniciado (PID: $BACKEND_PID)"
+python manage.py procesar_trabajos_pdf &
+PDF_PID=$!
+echo "Consumidor de PDFs iniciado (PID: $PDF_PID)"
 
 # 2. Frontend  
 echo "[2/3] Iniciando Frontend..."